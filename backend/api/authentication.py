@@ -0,0 +1,136 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.permissions import SAFE_METHODS
+
+from api.checks import is_shared_cache
+from api.constants import (TOKEN_CACHE_SIZE, TOKEN_CACHE_TTL,
+                           TOKEN_CACHE_VERSION_KEY)
+
+
+class TokenCache:
+    """
+    Процессный LRU-кэш соответствия токена и пользователя с TTL.
+
+    Записи помечаются версией из общего кэша Django, прочитанной до
+    обращения к базе данных. Выход из системы, смена пароля, изменение
+    или удаление пользователя увеличивают версию, и каждый процесс
+    очищает свой кэш при следующем запросе. Поэтому кэш работает только
+    с общим для процессов кэшем Django по умолчанию (проверка api.W002):
+    в LocMemCache сброс увидел бы лишь обработавший его воркер.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._version = None
+
+    @property
+    def size(self):
+        return getattr(settings, 'TOKEN_CACHE_SIZE', TOKEN_CACHE_SIZE)
+
+    @property
+    def enabled(self):
+        return self.size > 0 and is_shared_cache('default')
+
+    @property
+    def ttl(self):
+        return getattr(settings, 'TOKEN_CACHE_TTL', TOKEN_CACHE_TTL)
+
+    def version(self):
+        """Текущая версия кэша; устаревшие записи сбрасываются."""
+        version = cache.get(TOKEN_CACHE_VERSION_KEY, 0)
+        with self._lock:
+            if version != self._version:
+                self._entries.clear()
+                self._version = version
+        return version
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, user, token, version):
+        with self._lock:
+            if version != self._version:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, (user, token))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self):
+        """Сбрасывает кэш токенов во всех процессах."""
+        try:
+            cache.incr(TOKEN_CACHE_VERSION_KEY)
+        except ValueError:
+            cache.set(TOKEN_CACHE_VERSION_KEY, 1, None)
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = TokenCache()
+
+
+def freeze(instance):
+    """Модель, база данных и значения полей экземпляра для кэша."""
+    return (
+        type(instance),
+        instance._state.db,
+        tuple(
+            getattr(instance, field.attname)
+            for field in instance._meta.concrete_fields
+        )
+    )
+
+
+def thaw(frozen):
+    """Новый экземпляр модели из значений полей, сохранённых freeze."""
+    model, db, values = frozen
+    return model.from_db(
+        db, [field.attname for field in model._meta.concrete_fields], values
+    )
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Аутентификация по токену с кэшированием пользователя.
+
+    Повторные запросы с тем же токеном не обращаются к базе данных, пока
+    запись не устарела или кэш не сброшен. В кэше хранятся значения
+    полей, и каждый запрос получает собранные из них заново экземпляры
+    без общего состояния (_state и кэша связей) с другими запросами и
+    потоками. Изменяющие запросы всегда читают
+    пользователя из базы данных: представление может сохранить его,
+    и устаревшая копия перезаписала бы свежие данные.
+    """
+
+    use_cache = True
+
+    def authenticate(self, request):
+        self.use_cache = request.method in SAFE_METHODS
+        return super().authenticate(request)
+
+    def authenticate_credentials(self, key):
+        if not self.use_cache or not token_cache.enabled:
+            return super().authenticate_credentials(key)
+        version = token_cache.version()
+        cached = token_cache.get(key)
+        if cached is None:
+            user, token = super().authenticate_credentials(key)
+            token_cache.set(key, freeze(user), freeze(token), version)
+            return user, token
+        user, token = map(thaw, cached)
+        token.user = user
+        return user, token
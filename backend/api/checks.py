@@ -0,0 +1,86 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.core.checks import Error, Tags, Warning, register
+
+from api.constants import (PROCESS_LOCAL_CACHE_BACKENDS,
+                           RECIPE_LIST_CACHE_TIMEOUT, TOKEN_CACHE_SIZE)
+
+
+def is_shared_cache(alias):
+    """Проверяет, что кэш alias виден всем процессам приложения."""
+    return (
+        settings.CACHES[alias]['BACKEND'] not in PROCESS_LOCAL_CACHE_BACKENDS
+    )
+
+
+@register(Tags.caches)
+def check_recipe_list_cache(app_configs, **kwargs):
+    """
+    Предупреждает, что явно включённый кэш списка рецептов не работает.
+
+    Страницы сбрасываются поколениями в кэше Django. В кэше отдельного
+    процесса запись в одном воркере не сбросит страницы других, поэтому
+    в таком кэше список рецептов не кэшируется, а по умолчанию
+    RECIPE_LIST_CACHE_TIMEOUT в нём равен 0.
+    """
+    alias = getattr(settings, 'RECIPE_LIST_CACHE', 'default')
+    timeout = getattr(
+        settings, 'RECIPE_LIST_CACHE_TIMEOUT', RECIPE_LIST_CACHE_TIMEOUT
+    )
+    if timeout <= 0 or is_shared_cache(alias):
+        return []
+    return [Warning(
+        f'Кэш списка рецептов отключён: кэш "{alias}" '
+        f'({settings.CACHES[alias]["BACKEND"]}) локален для процесса.',
+        hint='Укажите общий для воркеров кэш в CACHE_BACKEND, например '
+             'DatabaseCache, FileBasedCache или Memcached, или '
+             'RECIPE_LIST_CACHE_TIMEOUT=0.',
+        id='api.W001',
+    )]
+
+
+@register(Tags.caches)
+def check_token_cache(app_configs, **kwargs):
+    """
+    Предупреждает, что явно включённый кэш токенов не работает.
+
+    Выход из системы, смена пароля и деактивация пользователя сбрасывают
+    кэш токенов всех процессов через версию в кэше по умолчанию. В кэше
+    отдельного процесса остальные воркеры принимали бы отозванный токен
+    до истечения TOKEN_CACHE_TTL, поэтому токены не кэшируются, а по
+    умолчанию TOKEN_CACHE_SIZE в нём равен 0.
+    """
+    if getattr(settings, 'TOKEN_CACHE_SIZE', TOKEN_CACHE_SIZE) <= 0:
+        return []
+    if is_shared_cache('default'):
+        return []
+    return [Warning(
+        'Кэш токенов отключён: кэш "default" '
+        f'({settings.CACHES["default"]["BACKEND"]}) локален для процесса.',
+        hint='Укажите общий для воркеров кэш в CACHE_BACKEND или '
+             'TOKEN_CACHE_SIZE=0.',
+        id='api.W002',
+    )]
+
+
+@register(Tags.security)
+def check_recipe_import_root(app_configs, **kwargs):
+    """
+    Проверяет, что файлы импорта не раздаются как статика или медиа.
+
+    В файлах импорта есть адреса электронной почты авторов, а отчёты
+    об ошибках повторяют содержимое строк.
+    """
+    root = Path(settings.RECIPE_IMPORT_ROOT).resolve()
+    public = [
+        Path(path).resolve()
+        for path in (settings.MEDIA_ROOT, settings.STATIC_ROOT) if path
+    ]
+    if not any(root == path or path in root.parents for path in public):
+        return []
+    return [Error(
+        f'RECIPE_IMPORT_ROOT ({root}) находится в публичном каталоге.',
+        hint='Укажите каталог вне MEDIA_ROOT и STATIC_ROOT.',
+        id='api.E001',
+    )]
@@ -15,3 +15,52 @@ PAGE_SIZE_QUERY_PARAM = 'limit'
 USERNAME_NOT_ME_ERR_MESSAGE = "Имя пользователя не может быть 'me'"
 INGREDIENT_DATA_ROUTE = 'data/ingredients.csv'
 TAG_DATA_ROUTE = 'data/tags.csv'
+INGREDIENT_SEARCH_LIMIT = 50
+INGREDIENT_INDEX_VERSION_KEY = 'ingredient_index_version'
+INGREDIENT_INDEX_TTL = 300
+CATALOG_VERSION_PK = 1
+SHOPPING_LIST_TITLE = 'Список покупок.'
+SHOPPING_LIST_HEADER = ('Ингредиент', 'Единица измерения', 'Количество')
+SHOPPING_LIST_CHUNK_SIZE = 64 * 1024
+IMAGE_VARIANTS = (
+    ('thumbnail', 100),
+    ('card', 480),
+    ('full', 1200),
+)
+IMAGE_VARIANT_FORMATS = (
+    ('webp', 'WEBP'),
+    ('jpeg', 'JPEG'),
+)
+IMAGE_VARIANT_QUALITY = 80
+IMAGE_VARIANTS_DIR = 'images/variants/'
+CURSOR_QUERY_PARAM = 'cursor'
+INVALID_CURSOR_MESSAGE = 'Неверный курсор'
+CURSOR_ORDERING_MESSAGE = (
+    'Пагинация по курсору недоступна при сортировке по релевантности поиска'
+)
+CATALOG_BATCH_SIZE = 1000
+RECIPE_LIST_CACHE_TIMEOUT = 60
+PROCESS_LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+)
+RECIPE_LIST_CACHE_PREFIX = 'recipe-list'
+RECIPE_LIST_CACHE_STATS = ('hits', 'misses', 'evictions')
+TOKEN_CACHE_SIZE = 1024
+TOKEN_CACHE_TTL = 300
+TOKEN_CACHE_VERSION_KEY = 'token_cache_version'
+RECIPE_IMPORT_BATCH_SIZE = 500
+RECIPE_IMPORT_CHUNK_SIZE = 64 * 1024
+BATCH_MAX_SIZE = 50
+METRICS_PREFIX = 'metrics'
+METRICS_TIMINGS = ('sql', 'serializer', 'render')
+METRICS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+METRICS_FLUSH_INTERVAL = 10
+OTHER_VIEW = 'other'
+QUERY_BUDGETS_ROUTE = 'api/query_budgets.json'
+QUERY_BUDGET_PAGE_SIZES = (1, 10, 50)
+EXPLAIN_SEQ_SCAN_ROWS = 1000
+SLOW_QUERY_THRESHOLD = 0.1
+SLOW_QUERY_PREFIX = 'slow_queries'
+SLOW_QUERY_STACK_DEPTH = 5
+SLOW_QUERY_FINGERPRINTS = 1000
+FINGERPRINT_CACHE_SIZE = 4096
@@ -1,8 +1,11 @@
 import base64
 
 from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
 from rest_framework import serializers
 
+from api.constants import IMAGE_VARIANT_FORMATS
+
 
 class Base64ImageField(serializers.ImageField):
     """Класс для загрузки изображений в формате base64."""
@@ -13,3 +16,31 @@ class Base64ImageField(serializers.ImageField):
             ext = format.split('/')[-1]
             data = ContentFile(base64.b64decode(imgstr), name='temp.' + ext)
         return super().to_internal_value(data)
+
+
+class ImageSrcsetField(serializers.ReadOnlyField):
+    """
+    Поле со списками уменьшенных копий изображения в формате srcset.
+
+    Возвращает словарь {формат: "url ширина w, ..."}; пока копии не
+    построены, словарь пуст. Из копий одной ширины, построенных до
+    исключения повторов в generate_variants, берётся первая.
+    """
+
+    def to_representation(self, value):
+        request = self.context.get('request')
+        variants = {}
+        for variant in value.get('variants', {}).values():
+            variants.setdefault(variant['width'], variant)
+        variants = [variants[width] for width in sorted(variants)]
+        srcset = {}
+        for extension, _ in IMAGE_VARIANT_FORMATS:
+            entries = []
+            for variant in variants:
+                url = default_storage.url(variant[extension])
+                if request is not None:
+                    url = request.build_absolute_uri(url)
+                entries.append(f'{url} {variant["width"]}w')
+            if entries:
+                srcset[extension] = ', '.join(entries)
+        return srcset
@@ -1,13 +1,17 @@
 from django_filters.rest_framework import FilterSet, filters
+from rest_framework.filters import OrderingFilter
 
-from recipes.models import Ingredient, Recipe
+from recipes.models import Ingredient, Recipe, Tag
+from recipes.search import search_recipes
 
 
 class RecipeFilter(FilterSet):
     """Фильтр для модели рецептов."""
 
-    tags = filters.AllValuesMultipleFilter(
-        field_name='tags__slug'
+    tags = filters.ModelMultipleChoiceFilter(
+        field_name='tags__slug',
+        to_field_name='slug',
+        queryset=Tag.objects.all()
     )
     is_favorited = filters.BooleanFilter(
         method='filter_is_favorited'
@@ -15,10 +19,19 @@ class RecipeFilter(FilterSet):
     is_in_shopping_cart = filters.BooleanFilter(
         method='filter_is_in_shopping_cart'
     )
+    search = filters.CharFilter(
+        method='filter_search'
+    )
 
     class Meta:
         model = Recipe
-        fields = ('author', 'is_favorited', 'tags', 'is_in_shopping_cart')
+        fields = (
+            'author',
+            'is_favorited',
+            'tags',
+            'is_in_shopping_cart',
+            'search'
+        )
 
     def filter_is_favorited(self, queryset, name, value):
         if value and self.request and self.request.user.is_authenticated:
@@ -32,6 +45,25 @@ class RecipeFilter(FilterSet):
             )
         return queryset
 
+    def filter_search(self, queryset, name, value):
+        return search_recipes(queryset, value)
+
+
+class RecipeOrderingFilter(OrderingFilter):
+    """
+    Сортировка рецептов по параметру ordering.
+
+    К выбранной сортировке добавляется порядок по умолчанию, чтобы рецепты
+    с одинаковыми значениями шли в стабильном порядке и выборка
+    использовала составные индексы счётчиков.
+    """
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if not ordering:
+            return ordering
+        return (*ordering, '-pub_date', '-id')
+
 
 class IngredientFilter(FilterSet):
     """Фильтр для модели ингредиентов."""
@@ -0,0 +1,293 @@
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import caches
+from django.urls import URLResolver, get_resolver
+
+from api.constants import (METRICS_BUCKETS, METRICS_FLUSH_INTERVAL,
+                           METRICS_PREFIX, METRICS_TIMINGS, OTHER_VIEW)
+from recipes.list_cache import recipe_list_cache
+
+current_metrics = ContextVar('current_metrics', default=None)
+
+
+class RequestMetrics:
+    """
+    Замеры одного запроса.
+
+    Время хранится в секундах по разделам METRICS_TIMINGS; вложенные
+    замеры одного раздела учитываются один раз.
+    """
+
+    def __init__(self):
+        self.view = OTHER_VIEW
+        self.queries = 0
+        self.size = 0
+        self.timings = dict.fromkeys(METRICS_TIMINGS, 0.0)
+        self._active = set()
+
+    @contextmanager
+    def timed(self, name):
+        if name in self._active:
+            yield
+            return
+        self._active.add(name)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] += time.perf_counter() - started
+            self._active.discard(name)
+
+    def execute(self, execute, sql, params, many, context):
+        """Обёртка execute_wrapper: число и время SQL-запросов."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.timings['sql'] += time.perf_counter() - started
+
+    def server_timing(self, duration):
+        """Значение заголовка Server-Timing."""
+        entries = [
+            f'view;desc="{self.view}"',
+            f'total;dur={duration * 1000:.2f}'
+        ]
+        for name, seconds in self.timings.items():
+            entry = f'{name};dur={seconds * 1000:.2f}'
+            if name == 'sql':
+                entry += f';desc="{self.queries} queries"'
+            entries.append(entry)
+        entries.append(f'size;desc="{self.size} bytes"')
+        return ', '.join(entries)
+
+
+@contextmanager
+def timed(name):
+    """Учитывает время блока в разделе name текущего запроса."""
+    metrics = current_metrics.get()
+    if metrics is None:
+        yield
+        return
+    with metrics.timed(name):
+        yield
+
+
+class TimedSerializerMixin:
+    """Учитывает время сериализации в метриках запроса."""
+
+    def to_representation(self, instance):
+        with timed('serializer'):
+            return super().to_representation(instance)
+
+
+def view_name(view_func, method):
+    """Имя представления вида RecipeViewSet.list."""
+    cls = getattr(view_func, 'cls', None)
+    if cls is None:
+        return None
+    actions = getattr(view_func, 'actions', None)
+    if actions is None:
+        return f'{cls.__name__}.{method.lower()}'
+    action = actions.get(method.lower())
+    return f'{cls.__name__}.{action}' if action else None
+
+
+@lru_cache(maxsize=None)
+def known_views():
+    """Имена всех представлений API; метрики хранятся только для них."""
+    names = {OTHER_VIEW}
+    patterns = list(get_resolver().url_patterns)
+    while patterns:
+        pattern = patterns.pop()
+        if isinstance(pattern, URLResolver):
+            patterns.extend(pattern.url_patterns)
+            continue
+        callback = pattern.callback
+        cls = getattr(callback, 'cls', None)
+        if cls is None:
+            continue
+        actions = getattr(callback, 'actions', None)
+        if actions is None:
+            actions = {
+                method: method for method in cls.http_method_names
+                if hasattr(cls, method)
+            }
+        names.update(
+            f'{cls.__name__}.{action}' for action in actions.values()
+        )
+    return tuple(sorted(names))
+
+
+class CacheCounters:
+    """
+    Счётчики процесса, которые периодически переносятся в кэш.
+
+    Каждый процесс копит приращения в памяти и раз в
+    METRICS_FLUSH_INTERVAL секунд переносит их в кэш Django через incr,
+    поэтому при общем кэше счётчики всех воркеров gunicorn складываются
+    без потерь.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = defaultdict(int)
+        self._flushed = time.monotonic()
+
+    @property
+    def cache(self):
+        return caches[getattr(settings, 'METRICS_CACHE', 'default')]
+
+    @property
+    def flush_interval(self):
+        return getattr(
+            settings, 'METRICS_FLUSH_INTERVAL', METRICS_FLUSH_INTERVAL
+        )
+
+    def increment(self, values):
+        """Добавляет приращения {ключ: целое число}."""
+        with self._lock:
+            for key, value in values.items():
+                self._pending[key] += value
+            due = time.monotonic() - self._flushed >= self.flush_interval
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Переносит накопленные приращения процесса в кэш."""
+        with self._lock:
+            pending, self._pending = self._pending, defaultdict(int)
+            self._flushed = time.monotonic()
+        for key, delta in pending.items():
+            if not delta:
+                continue
+            try:
+                self.cache.incr(key, delta)
+            except ValueError:
+                self.cache.add(key, 0, None)
+                self.cache.incr(key, delta)
+
+
+class MetricsRegistry(CacheCounters):
+    """
+    Агрегированные метрики запросов по представлениям.
+
+    Время хранится целым числом микросекунд, гистограмма длительности —
+    числом запросов в каждом интервале METRICS_BUCKETS.
+    """
+
+    @staticmethod
+    def fields():
+        return (
+            'requests', 'duration', 'queries', 'size',
+            *METRICS_TIMINGS,
+            *(f'bucket:{index}' for index in range(len(METRICS_BUCKETS) + 1))
+        )
+
+    @staticmethod
+    def key(view, field):
+        return f'{METRICS_PREFIX}:{view}:{field}'
+
+    def record(self, metrics, duration):
+        if metrics.view not in known_views():
+            metrics.view = OTHER_VIEW
+        values = {
+            'requests': 1,
+            'duration': duration,
+            'queries': metrics.queries,
+            'size': metrics.size,
+            f'bucket:{bisect_left(METRICS_BUCKETS, duration)}': 1,
+        }
+        values.update(metrics.timings)
+        self.increment({
+            self.key(metrics.view, field): (
+                round(value * 1_000_000) if isinstance(value, float)
+                else value
+            ) for field, value in values.items()
+        })
+
+    def snapshot(self):
+        """Метрики всех процессов: {представление: {поле: значение}}."""
+        self.flush()
+        fields = self.fields()
+        keys = {
+            self.key(view, field): (view, field)
+            for view in known_views() for field in fields
+        }
+        values = self.cache.get_many(keys)
+        snapshot = {}
+        for key, value in values.items():
+            view, field = keys[key]
+            snapshot.setdefault(view, dict.fromkeys(fields, 0))[field] = value
+        return snapshot
+
+    def reset(self):
+        with self._lock:
+            self._pending.clear()
+        self.cache.delete_many([
+            self.key(view, field)
+            for view in known_views() for field in self.fields()
+        ])
+
+    def export(self):
+        """Метрики в текстовом формате Prometheus."""
+        snapshot = sorted(self.snapshot().items())
+        lines = [
+            '# HELP foodgram_request_duration_seconds '
+            'Время обработки запроса.',
+            '# TYPE foodgram_request_duration_seconds histogram',
+        ]
+        for view, values in snapshot:
+            total = 0
+            for index, bound in enumerate((*METRICS_BUCKETS, '+Inf')):
+                total += values[f'bucket:{index}']
+                lines.append(
+                    'foodgram_request_duration_seconds_bucket'
+                    f'{{view="{view}",le="{bound}"}} {total}'
+                )
+            lines.append(
+                f'foodgram_request_duration_seconds_sum{{view="{view}"}} '
+                f'{values["duration"] / 1_000_000}'
+            )
+            lines.append(
+                f'foodgram_request_duration_seconds_count{{view="{view}"}} '
+                f'{values["requests"]}'
+            )
+        counters = [
+            ('sql_queries_total', 'Число SQL-запросов.', 'queries', 1),
+            ('response_bytes_total', 'Размер ответов.', 'size', 1),
+            *(
+                (
+                    f'{name}_duration_seconds_total',
+                    f'Время раздела {name}.',
+                    name,
+                    1_000_000
+                ) for name in METRICS_TIMINGS
+            ),
+        ]
+        for name, help_text, field, scale in counters:
+            lines.append(f'# HELP foodgram_{name} {help_text}')
+            lines.append(f'# TYPE foodgram_{name} counter')
+            for view, values in snapshot:
+                value = values[field] if scale == 1 else values[field] / scale
+                lines.append(f'foodgram_{name}{{view="{view}"}} {value}')
+        lines.append(
+            '# HELP foodgram_recipe_list_cache_total '
+            'События кэша списка рецептов.'
+        )
+        lines.append('# TYPE foodgram_recipe_list_cache_total counter')
+        lines.extend(
+            f'foodgram_recipe_list_cache_total{{event="{event}"}} {count}'
+            for event, count in recipe_list_cache.stats().items()
+        )
+        return '\n'.join(lines) + '\n'
+
+
+metrics_registry = MetricsRegistry()
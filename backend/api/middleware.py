@@ -0,0 +1,98 @@
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from api.metrics import (RequestMetrics, current_metrics, metrics_registry,
+                         view_name)
+from api.query_log import current_view, query_log
+
+
+class RequestMetricsMiddleware:
+    """
+    Замеры производительности каждого запроса.
+
+    Считает число и время SQL-запросов, время сериализации и рендеринга,
+    размер ответа и общее время, привязывая их к представлению и
+    действию вьюсета. Результаты попадают в метрики /api/_metrics, а при
+    включённой настройке SERVER_TIMING — в заголовок Server-Timing.
+    Должен стоять первым в MIDDLEWARE.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not getattr(settings, 'REQUEST_METRICS', True):
+            return self.get_response(request)
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(metrics.execute)
+                    )
+                response = self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        duration = time.perf_counter() - started
+        if response.streaming:
+            metrics.size = int(response.get('Content-Length', 0))
+        else:
+            metrics.size = len(response.content)
+        metrics_registry.record(metrics, duration)
+        if getattr(settings, 'SERVER_TIMING', False):
+            response['Server-Timing'] = metrics.server_timing(duration)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        metrics = current_metrics.get()
+        if metrics is not None:
+            metrics.view = (
+                view_name(view_func, request.method) or metrics.view
+            )
+
+    def process_template_response(self, request, response):
+        metrics = current_metrics.get()
+        if metrics is None:
+            return response
+        started = time.perf_counter()
+
+        def rendered(response):
+            metrics.timings['render'] += time.perf_counter() - started
+
+        response.add_post_render_callback(rendered)
+        return response
+
+
+class SlowQueryLogMiddleware:
+    """
+    Журнал медленных SQL-запросов при включённой настройке SLOW_QUERY_LOG.
+
+    Оборачивает запросы к базе данных в query_log на время обработки
+    запроса и запоминает представление, которому они принадлежат.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not getattr(settings, 'SLOW_QUERY_LOG', False):
+            return self.get_response(request)
+        token = current_view.set(request.path)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(query_log))
+                return self.get_response(request)
+        finally:
+            current_view.reset(token)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if getattr(settings, 'SLOW_QUERY_LOG', False):
+            current_view.set(
+                view_name(view_func, request.method) or request.path
+            )
@@ -0,0 +1,74 @@
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+from api.serializers import BatchSerializer
+
+
+class ConditionalGetMixin:
+    """
+    Условные GET-запросы для list и retrieve.
+
+    Вьюсет возвращает из get_validators пару (etag, last_modified) для
+    запроса. Если клиент прислал совпадающий If-None-Match или
+    If-Modified-Since, ответ 304 отдаётся до сериализации и тяжёлых
+    запросов; иначе валидаторы добавляются к обычному ответу.
+    """
+
+    def get_validators(self, request, *args, **kwargs):
+        return None, None
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        etag, last_modified = self.get_validators(request, *args, **kwargs)
+        if etag is None and last_modified is None:
+            return handler(request, *args, **kwargs)
+        if etag is not None:
+            etag = f'"{etag}-{request.accepted_renderer.format}"'
+        timestamp = (
+            int(last_modified.timestamp()) if last_modified else None
+        )
+        response = get_conditional_response(
+            request._request,
+            etag=etag,
+            last_modified=timestamp
+        )
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            if etag is not None:
+                response['ETag'] = etag
+            if timestamp is not None:
+                response['Last-Modified'] = http_date(timestamp)
+        patch_vary_headers(response, ('Authorization',))
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+
+class BatchRelationMixin:
+    """
+    Пакетное добавление и удаление связей текущего пользователя.
+
+    POST добавляет, DELETE удаляет связи с объектами из списка ids тела
+    запроса; ответ содержит статус обработки каждого id.
+    """
+
+    def batch_response(self, request, relation):
+        serializer = BatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        apply = relation.add if request.method == 'POST' else relation.remove
+        results = apply(request.user.id, serializer.validated_data['ids'])
+        return Response({
+            'results': [
+                {'id': pk, 'status': result}
+                for pk, result in results.items()
+            ]
+        })
@@ -1,8 +1,165 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from django.core.exceptions import FieldDoesNotExist
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
-from .constants import PAGE_SIZE, PAGE_SIZE_QUERY_PARAM
+from .constants import (CURSOR_ORDERING_MESSAGE, CURSOR_QUERY_PARAM,
+                        INVALID_CURSOR_MESSAGE, PAGE_SIZE,
+                        PAGE_SIZE_QUERY_PARAM)
 
 
 class CustomPagination(PageNumberPagination):
     page_size = PAGE_SIZE
     page_size_query_param = PAGE_SIZE_QUERY_PARAM
+
+
+class RecipePagination(CustomPagination):
+    """
+    Пагинация рецептов по номеру страницы или по курсору.
+
+    По умолчанию используется постраничная пагинация. Если в запросе есть
+    параметр cursor (в том числе пустой), выдача строится по ключу из
+    полей текущей сортировки: (pub_date, id) по умолчанию или поле из
+    ordering вместе с ними. Следующая страница отбирается условием по
+    последнему показанному рецепту, без COUNT(*) и OFFSET. Релевантность
+    поиска не является полем модели, поэтому курсор вместе с search
+    отклоняется с ошибкой 400. Ответ в этом режиме содержит только next,
+    previous и results.
+    """
+
+    cursor_query_param = CURSOR_QUERY_PARAM
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_mode = self.cursor_query_param in request.query_params
+        if not self.cursor_mode:
+            return super().paginate_queryset(queryset, request, view)
+        self.request = request
+        self.ordering = self.get_ordering(queryset)
+        page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(
+            request.query_params[self.cursor_query_param], queryset.model
+        )
+        self.reverse = cursor is not None and cursor['reverse']
+        if cursor is not None:
+            queryset = queryset.filter(
+                self.after(cursor['values'], self.reverse)
+            )
+        ordering = (
+            [self.flip(item) for item in self.ordering]
+            if self.reverse else self.ordering
+        )
+        results = list(queryset.order_by(*ordering)[:page_size + 1])
+        has_more = len(results) > page_size
+        results = results[:page_size]
+        if self.reverse:
+            results.reverse()
+        self.has_next = has_more if not self.reverse else True
+        self.has_previous = has_more if self.reverse else cursor is not None
+        self.page_results = results
+        return results
+
+    @staticmethod
+    def flip(item):
+        return item[1:] if item.startswith('-') else f'-{item}'
+
+    def get_ordering(self, queryset):
+        """
+        Поля ключа: сортировка запроса без повторов, последним идёт id.
+
+        Сортировка по аннотациям, в том числе по релевантности поиска,
+        курсором не поддерживается.
+        """
+        ordering, names = [], set()
+        for item in (
+            queryset.query.order_by or queryset.model._meta.ordering
+        ):
+            if not isinstance(item, str):
+                raise ValidationError(CURSOR_ORDERING_MESSAGE)
+            name = item.lstrip('-')
+            name = 'id' if name == 'pk' else name
+            try:
+                queryset.model._meta.get_field(name)
+            except FieldDoesNotExist:
+                raise ValidationError(CURSOR_ORDERING_MESSAGE)
+            if name not in names:
+                names.add(name)
+                ordering.append(f'-{name}' if item.startswith('-') else name)
+        if 'id' not in names:
+            ordering.append('-id')
+        return ordering
+
+    def after(self, values, reverse):
+        """Условие «после рецепта с values» в порядке self.ordering."""
+        condition, equal = Q(), {}
+        for item, value in zip(self.ordering, values):
+            name = item.lstrip('-')
+            lookup = 'lt' if item.startswith('-') != reverse else 'gt'
+            condition |= Q(**equal, **{f'{name}__{lookup}': value})
+            equal[name] = value
+        return condition
+
+    def get_paginated_response(self, data):
+        if not self.cursor_mode:
+            return super().get_paginated_response(data)
+        return Response({
+            'next': self.get_cursor_link(reverse=False),
+            'previous': self.get_cursor_link(reverse=True),
+            'results': data,
+        })
+
+    def get_cursor_link(self, reverse):
+        if not (self.has_previous if reverse else self.has_next):
+            return None
+        url = self.request.build_absolute_uri()
+        if not self.page_results:
+            return replace_query_param(url, self.cursor_query_param, '')
+        recipe = self.page_results[0 if reverse else -1]
+        return replace_query_param(
+            url,
+            self.cursor_query_param,
+            self.encode_cursor(recipe, reverse)
+        )
+
+    def encode_cursor(self, recipe, reverse):
+        values = [
+            getattr(recipe, item.lstrip('-')) for item in self.ordering
+        ]
+        data = json.dumps({
+            'ordering': self.ordering,
+            'values': [
+                value.isoformat() if isinstance(value, datetime) else value
+                for value in values
+            ],
+            'reverse': reverse,
+        })
+        return base64.urlsafe_b64encode(data.encode()).decode()
+
+    def decode_cursor(self, value, model):
+        """Разбирает курсор; курсор другой сортировки считается неверным."""
+        if not value:
+            return None
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(value.encode()))
+            if cursor['ordering'] != self.ordering or len(
+                cursor['values']
+            ) != len(self.ordering):
+                raise ValueError
+            cursor['values'] = [
+                model._meta.get_field(item.lstrip('-')).to_python(value)
+                for item, value in zip(self.ordering, cursor['values'])
+            ]
+            cursor['reverse'] = bool(cursor['reverse'])
+        except (
+            binascii.Error, ValueError, TypeError, KeyError, AttributeError,
+            DjangoValidationError
+        ):
+            raise NotFound(INVALID_CURSOR_MESSAGE)
+        return cursor
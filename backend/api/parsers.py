@@ -0,0 +1,46 @@
+import shutil
+import tempfile
+
+import msgpack
+import orjson
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+
+
+class ORJSONParser(JSONParser):
+    """JSON-парсер на orjson."""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f'JSON parse error - {exc}')
+
+
+class MessagePackParser(BaseParser):
+    """Парсер тела запроса в формате MessagePack."""
+
+    media_type = 'application/msgpack'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), raw=False)
+        except (ValueError, msgpack.UnpackException) as exc:
+            raise ParseError(f'MessagePack parse error - {exc}')
+
+
+class NDJSONParser(BaseParser):
+    """
+    Парсер тела запроса в формате JSON Lines.
+
+    Тело не разбирается, а копируется во временный файл, который
+    возвращается как данные запроса.
+    """
+
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        upload = tempfile.TemporaryFile()
+        shutil.copyfileobj(stream, upload)
+        upload.seek(0)
+        return upload
@@ -1,3 +1,5 @@
+from django.conf import settings
+from django.utils.crypto import constant_time_compare
 from rest_framework.permissions import SAFE_METHODS, BasePermission
 
 
@@ -8,3 +10,16 @@ class IsOwnerOrAdminOrReadOnly(BasePermission):
             request.method in SAFE_METHODS
             or obj.author == request.user
         )
+
+
+class IsMetricsScraper(BasePermission):
+    """Доступ к метрикам: администратор или токен METRICS_TOKEN."""
+
+    def has_permission(self, request, view):
+        token = getattr(settings, 'METRICS_TOKEN', '')
+        if token and constant_time_compare(
+            request.META.get('HTTP_AUTHORIZATION', ''),
+            f'Bearer {token}'
+        ):
+            return True
+        return bool(request.user and request.user.is_staff)
@@ -0,0 +1,225 @@
+import hashlib
+import logging
+import os
+import re
+import time
+import traceback
+from contextlib import nullcontext
+from contextvars import ContextVar
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+
+from api.constants import (FINGERPRINT_CACHE_SIZE, OTHER_VIEW,
+                           SLOW_QUERY_FINGERPRINTS, SLOW_QUERY_PREFIX,
+                           SLOW_QUERY_STACK_DEPTH, SLOW_QUERY_THRESHOLD)
+from api.metrics import CacheCounters
+
+logger = logging.getLogger(__name__)
+
+current_view = ContextVar('current_view', default=OTHER_VIEW)
+
+INDEX_KEY = f'{SLOW_QUERY_PREFIX}:index'
+
+SQL_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+\b|%s")
+SQL_LIST = r'\(\s*\?(?:\s*,\s*\?)*\s*\)'
+SQL_IN_LISTS = re.compile(rf'\bIN\s*{SQL_LIST}')
+SQL_VALUES = re.compile(rf'\bVALUES\s*{SQL_LIST}(?:\s*,\s*{SQL_LIST})*')
+SQL_SPACES = re.compile(r'\s+')
+# Обёртки запросов, которые не показываются в стеке вызовов.
+INSTRUMENTATION = tuple(
+    os.path.join(os.path.dirname(__file__), name)
+    for name in ('metrics.py', 'middleware.py', 'query_log.py')
+)
+
+
+@lru_cache(maxsize=FINGERPRINT_CACHE_SIZE)
+def fingerprint(sql):
+    """
+    SQL без литералов, чтобы одинаковые запросы совпадали.
+
+    Строки, числа и параметры заменяются на ?, списки значений IN и
+    строки VALUES — на (...), поэтому запросы с разным числом id дают
+    один отпечаток.
+    """
+    sql = SQL_LITERALS.sub('?', sql)
+    sql = SQL_IN_LISTS.sub('IN (...)', sql)
+    sql = SQL_VALUES.sub('VALUES (...)', sql)
+    return SQL_SPACES.sub(' ', sql).strip()
+
+
+class QueryLog(CacheCounters):
+    """
+    Журнал медленных SQL-запросов.
+
+    Экземпляр — обёртка для connection.execute_wrapper. По каждому
+    отпечатку запроса считаются число выполнений, суммарное и
+    максимальное время; счётчики складываются в кэше по всем воркерам,
+    а тексты отпечатков хранятся в отдельном ключе. Запрос дольше
+    SLOW_QUERY_THRESHOLD секунд пишется в лог с представлением, строками
+    кода проекта, из которых он выполнен, и при SLOW_QUERY_EXPLAIN —
+    планом выполнения.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._maxima = {}
+        self._fingerprints = {}
+        self._explaining = ContextVar('explaining', default=False)
+
+    @property
+    def threshold(self):
+        return getattr(settings, 'SLOW_QUERY_THRESHOLD', SLOW_QUERY_THRESHOLD)
+
+    @staticmethod
+    def key(digest, field):
+        return f'{SLOW_QUERY_PREFIX}:{digest}:{field}'
+
+    def __call__(self, execute, sql, params, many, context):
+        if self._explaining.get():
+            return execute(sql, params, many, context)
+        started = time.perf_counter()
+        try:
+            result = execute(sql, params, many, context)
+        except Exception:
+            self.observe(sql, params, many, context, started, failed=True)
+            raise
+        self.observe(sql, params, many, context, started)
+        return result
+
+    def observe(self, sql, params, many, context, started, failed=False):
+        duration = time.perf_counter() - started
+        self.record(sql, duration)
+        if duration < self.threshold:
+            return
+        lines = [
+            f'Медленный SQL-запрос {duration * 1000:.1f} мс в '
+            f'{current_view.get()}: {fingerprint(sql)}',
+            *self.stack()
+        ]
+        if not failed and not many and getattr(
+            settings, 'SLOW_QUERY_EXPLAIN', False
+        ):
+            plan = self.explain(context['connection'], sql, params)
+            if plan:
+                lines.extend(['План выполнения:', plan])
+        logger.warning('\n'.join(lines))
+
+    def record(self, sql, duration):
+        text = fingerprint(sql)
+        digest = hashlib.sha1(text.encode()).hexdigest()
+        micros = round(duration * 1_000_000)
+        with self._lock:
+            if digest not in self._fingerprints:
+                if len(self._fingerprints) >= SLOW_QUERY_FINGERPRINTS:
+                    return
+                self._fingerprints[digest] = text
+            self._maxima[digest] = max(self._maxima.get(digest, 0), micros)
+        self.increment({
+            self.key(digest, 'count'): 1,
+            self.key(digest, 'total'): micros,
+        })
+
+    @staticmethod
+    def stack():
+        """Последние вызовы из кода проекта, выполнившие запрос."""
+        frames = [
+            frame for frame in traceback.extract_stack()
+            if frame.filename.startswith(str(settings.BASE_DIR))
+            and 'site-packages' not in frame.filename
+            and frame.filename not in INSTRUMENTATION
+        ]
+        return [
+            f'  {os.path.relpath(frame.filename, settings.BASE_DIR)}:'
+            f'{frame.lineno} в {frame.name}'
+            for frame in frames[-SLOW_QUERY_STACK_DEPTH:]
+        ]
+
+    def explain(self, connection, sql, params):
+        """План запроса SELECT без повторного выполнения."""
+        if not sql.lstrip().upper().startswith('SELECT'):
+            return None
+        token = self._explaining.set(True)
+        try:
+            # В транзакции ошибка EXPLAIN не должна прерывать её целиком.
+            savepoint = (
+                transaction.atomic(using=connection.alias)
+                if connection.in_atomic_block else nullcontext()
+            )
+            with savepoint, connection.cursor() as cursor:
+                cursor.execute(
+                    f'{connection.ops.explain_query_prefix()} {sql}', params
+                )
+                return '\n'.join(f'  {row[-1]}' for row in cursor.fetchall())
+        except DatabaseError:
+            return None
+        finally:
+            self._explaining.reset(token)
+
+    def flush(self):
+        with self._lock:
+            maxima, self._maxima = self._maxima, {}
+            fingerprints = dict(self._fingerprints)
+        super().flush()
+        if not fingerprints:
+            return
+        # Новые отпечатки добавляются в общий индекс; потерянные при
+        # одновременной записи из разных воркеров вернутся при следующем
+        # переносе.
+        index = self.cache.get(INDEX_KEY, {})
+        missing = {
+            digest: text for digest, text in fingerprints.items()
+            if digest not in index
+        }
+        if missing:
+            index.update(missing)
+            self.cache.set(INDEX_KEY, index, None)
+        keys = [self.key(digest, 'max') for digest in maxima]
+        stored = self.cache.get_many(keys)
+        self.cache.set_many({
+            key: value for key, value in zip(keys, maxima.values())
+            if value > stored.get(key, 0)
+        }, None)
+
+    def top(self, limit, order='total'):
+        """
+        Отпечатки с наибольшим значением order.
+
+        Возвращает список словарей с полями fingerprint, count, total и
+        max; время в секундах.
+        """
+        self.flush()
+        index = self.cache.get(INDEX_KEY, {})
+        fields = ('count', 'total', 'max')
+        values = self.cache.get_many([
+            self.key(digest, field) for digest in index for field in fields
+        ])
+        rows = []
+        for digest, text in index.items():
+            row = {
+                field: values.get(self.key(digest, field), 0)
+                for field in fields
+            }
+            if not row['count']:
+                continue
+            row['total'] /= 1_000_000
+            row['max'] /= 1_000_000
+            row['fingerprint'] = text
+            rows.append(row)
+        rows.sort(key=lambda row: row[order], reverse=True)
+        return rows[:limit]
+
+    def reset(self):
+        with self._lock:
+            self._pending.clear()
+            self._maxima.clear()
+        index = self.cache.get(INDEX_KEY, {})
+        self.cache.delete_many([
+            self.key(digest, field)
+            for digest in index for field in ('count', 'total', 'max')
+        ])
+        self.cache.delete(INDEX_KEY)
+
+
+query_log = QueryLog()
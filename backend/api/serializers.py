@@ -1,20 +1,23 @@
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db.models import Sum
+from django.db import transaction
+from django.urls import reverse
 from djoser.serializers import UserCreateSerializer
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
-from rest_framework.validators import UniqueTogetherValidator
 
-from api.constants import (MAX_COOKING_TIME, MAX_INGREDIENT_AMOUNT,
-                           MIN_COOKING_TIME, MIN_INGREDIENT_AMOUNT,
-                           MIN_INGREDIENT_REQUIRED, MIN_TAG_REQUIRED)
-from api.fields import Base64ImageField
-from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
-                            ShoppingCart, Tag)
-from users.models import Follow, User
+from api.constants import (BATCH_MAX_SIZE, MAX_COOKING_TIME,
+                           MAX_INGREDIENT_AMOUNT, MIN_COOKING_TIME,
+                           MIN_INGREDIENT_AMOUNT, MIN_INGREDIENT_REQUIRED,
+                           MIN_TAG_REQUIRED)
+from api.fields import Base64ImageField, ImageSrcsetField
+from api.metrics import TimedSerializerMixin
+from recipes import shopping_list
+from recipes.models import (Ingredient, Recipe, RecipeImport, RecipeIngredient,
+                            Tag)
+from users.models import User
 
 
-class UserCreateSerializer(UserCreateSerializer):
+class UserCreateSerializer(TimedSerializerMixin, UserCreateSerializer):
     """Сериализатор для создания пользователя."""
 
     class Meta:
@@ -48,6 +51,8 @@ class UserInfoSerializer(UserCreateSerializer):
         )
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         request = self.context.get('request')
         return (
             request and request.user.is_authenticated
@@ -55,7 +60,7 @@ class UserInfoSerializer(UserCreateSerializer):
         )
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Сериализатор для модели ингредиента."""
 
     class Meta:
@@ -83,17 +88,12 @@ class IngredientInRecipeCreateSerializer(serializers.ModelSerializer):
             'amount'
         )
 
-    def validate_id(self, value):
-        if not Ingredient.objects.filter(id=value).exists():
-            raise serializers.ValidationError('Ингредиент не существует')
-        return value
-
 
 class SubscriptionSerializer(UserInfoSerializer):
     """Сериализатор для получения информации о подписках."""
 
     recipes = serializers.SerializerMethodField(read_only=True)
-    recipes_count = serializers.ReadOnlyField(source='recipes.count')
+    recipes_count = serializers.ReadOnlyField()
 
     class Meta:
         model = User
@@ -104,6 +104,12 @@ class SubscriptionSerializer(UserInfoSerializer):
         )
 
     def get_recipes(self, obj):
+        if hasattr(obj, 'preview_recipes'):
+            return SpecialRecipeSerializer(
+                obj.preview_recipes,
+                many=True,
+                context=self.context
+            ).data
         request = self.context.get('request')
         recipes_limit = request.query_params.get('recipes_limit')
         recipes_queryset = obj.recipes.all()
@@ -118,40 +124,7 @@ class SubscriptionSerializer(UserInfoSerializer):
         return serializer.data
 
 
-class SubscriptionDataSerializer(serializers.ModelSerializer):
-    """Сериализатор для подписки/отмены подписки на пользователя."""
-
-    class Meta:
-        model = Follow
-        fields = (
-            'user',
-            'following'
-        )
-        validators = [
-            UniqueTogetherValidator(
-                queryset=Follow.objects.all(),
-                fields=('user', 'following'),
-                message='Нельзя подписаться на автора дважды'
-            )
-        ]
-
-    def validate(self, data):
-        request = self.context.get('request')
-        if request.user == data.get('following'):
-            raise serializers.ValidationError(
-                'Нельзя подписаться на самого себя'
-            )
-        return data
-
-    def to_representation(self, instance):
-        serializer = SubscriptionSerializer(
-            instance.following,
-            context=self.context
-        )
-        return serializer.data
-
-
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Сериализатор для модели тега."""
 
     class Meta:
@@ -159,12 +132,16 @@ class TagSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'color', 'slug')
 
 
-class RecipeDetailSerializer(serializers.ModelSerializer):
+class RecipeDetailSerializer(
+    TimedSerializerMixin,
+    serializers.ModelSerializer
+):
     author = UserInfoSerializer(
         read_only=True,
     )
     ingredients = serializers.SerializerMethodField()
     image = Base64ImageField()
+    image_srcset = ImageSrcsetField(source='image_variants')
     tags = TagSerializer(
         many=True,
         read_only=True
@@ -183,6 +160,7 @@ class RecipeDetailSerializer(serializers.ModelSerializer):
             'name',
             'text',
             'image',
+            'image_srcset',
             'author',
             'ingredients',
             'tags',
@@ -191,14 +169,31 @@ class RecipeDetailSerializer(serializers.ModelSerializer):
             'is_in_shopping_cart'
         )
 
+    def to_representation(self, instance):
+        if hasattr(instance, 'author_is_subscribed'):
+            instance.author.is_subscribed = instance.author_is_subscribed
+        return super().to_representation(instance)
+
     def get_ingredients(self, obj):
-        return obj.ingredients.annotate(
-            amount=Sum('recipe_ingredients__amount')
-        ).values(
-            'id', 'name', 'amount', 'measurement_unit'
-        )
+        recipe_ingredients = obj.recipe_ingredients.all()
+        if 'recipe_ingredients' not in getattr(
+            obj, '_prefetched_objects_cache', {}
+        ):
+            recipe_ingredients = recipe_ingredients.select_related(
+                'ingredient'
+            )
+        return [
+            {
+                'id': item.ingredient.id,
+                'name': item.ingredient.name,
+                'amount': item.amount,
+                'measurement_unit': item.ingredient.measurement_unit
+            } for item in recipe_ingredients
+        ]
 
     def get_is_favorited(self, obj):
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         context_user = self.context.get('request').user
         return (
             context_user
@@ -209,6 +204,8 @@ class RecipeDetailSerializer(serializers.ModelSerializer):
         )
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         context_user = self.context.get('request').user
         return (
             context_user
@@ -219,7 +216,10 @@ class RecipeDetailSerializer(serializers.ModelSerializer):
         )
 
 
-class SpecialRecipeSerializer(serializers.ModelSerializer):
+class SpecialRecipeSerializer(
+    TimedSerializerMixin,
+    serializers.ModelSerializer
+):
     name = serializers.ReadOnlyField(
         help_text='Название рецепта'
     )
@@ -227,6 +227,10 @@ class SpecialRecipeSerializer(serializers.ModelSerializer):
         read_only=True,
         help_text='Изображение рецепта в Base64'
     )
+    image_srcset = ImageSrcsetField(
+        source='image_variants',
+        help_text='Уменьшенные копии изображения по форматам'
+    )
     cooking_time = serializers.ReadOnlyField(
         help_text='Время готовки в минутах'
     )
@@ -237,11 +241,15 @@ class SpecialRecipeSerializer(serializers.ModelSerializer):
             'id',
             'name',
             'cooking_time',
-            'image'
+            'image',
+            'image_srcset'
         )
 
 
-class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
+class RecipeCreateUpdateSerializer(
+    TimedSerializerMixin,
+    serializers.ModelSerializer
+):
     """Сериализатор модели рецепта для создания и обновления рецепта."""
 
     author = UserInfoSerializer(read_only=True)
@@ -249,9 +257,8 @@ class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
         many=True
     )
     image = Base64ImageField()
-    tags = serializers.PrimaryKeyRelatedField(
-        queryset=Tag.objects.all(),
-        many=True
+    tags = serializers.ListField(
+        child=serializers.IntegerField()
     )
     cooking_time = serializers.IntegerField(
         min_value=MIN_COOKING_TIME,
@@ -275,6 +282,34 @@ class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
             'cooking_time'
         )
 
+    @staticmethod
+    def fetch_objects(model, ids, message):
+        """
+        Получает объекты по списку id одним запросом.
+
+        Если каких-то объектов нет, ошибка перечисляет все
+        отсутствующие id.
+        """
+        objects = model.objects.in_bulk(ids)
+        missing = [str(pk) for pk in dict.fromkeys(ids) if pk not in objects]
+        if missing:
+            raise ValidationError(f'{message}: {", ".join(missing)}')
+        return objects
+
+    def validate_ingredients(self, ingredients):
+        objects = self.fetch_objects(
+            Ingredient,
+            [ingredient['id'] for ingredient in ingredients],
+            'Ингредиенты не существуют'
+        )
+        for ingredient in ingredients:
+            ingredient['ingredient'] = objects[ingredient['id']]
+        return ingredients
+
+    def validate_tags(self, tags):
+        objects = self.fetch_objects(Tag, tags, 'Теги не существуют')
+        return [objects[pk] for pk in tags]
+
     def validate(self, data):
         ingredients = data.get('ingredients', [])
         if not ingredients:
@@ -300,12 +335,26 @@ class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
     def create_ingredients_recipes(self, ingredients_data, recipe):
         ingredient_instances = [
             RecipeIngredient(
-                ingredient_id=ingredient['id'],
+                ingredient=ingredient['ingredient'],
                 recipe=recipe,
                 amount=ingredient['amount'],
             ) for ingredient in ingredients_data
         ]
         RecipeIngredient.objects.bulk_create(ingredient_instances)
+        return ingredient_instances
+
+    @staticmethod
+    def cache_relations(recipe, tags, recipe_ingredients):
+        """
+        Сохраняет теги и ингредиенты рецепта как предзагруженные.
+
+        Ответ строится из уже полученных при валидации объектов без
+        повторных запросов.
+        """
+        recipe._prefetched_objects_cache = {
+            'tags': list(tags),
+            'recipe_ingredients': list(recipe_ingredients)
+        }
 
     def create(self, validated_data):
         ingredients_data = validated_data.pop('ingredients')
@@ -313,65 +362,127 @@ class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
         user = self.context['request'].user
         recipe = Recipe.objects.create(author=user, **validated_data)
         recipe.tags.set(tags)
-        self.create_ingredients_recipes(
+        recipe_ingredients = self.create_ingredients_recipes(
             recipe=recipe,
             ingredients_data=ingredients_data,
         )
+        self.cache_relations(recipe, tags, recipe_ingredients)
         return recipe
 
+    def update_ingredients_recipes(self, ingredients_data, recipe):
+        """
+        Приводит ингредиенты рецепта к переданному списку.
+
+        Изменяются только отличающиеся строки: новые ингредиенты
+        добавляются, изменённые количества обновляются, отсутствующие
+        в списке удаляются. Возвращает итоговые строки рецепта и
+        количества ингредиентов до и после изменения.
+        """
+        existing = {
+            item.ingredient_id: item
+            for item in RecipeIngredient.objects.filter(recipe=recipe)
+        }
+        old_amounts = {
+            ingredient_id: item.amount
+            for ingredient_id, item in existing.items()
+        }
+        new_amounts = {
+            ingredient['id']: ingredient['amount']
+            for ingredient in ingredients_data
+        }
+        ingredients = {
+            ingredient['id']: ingredient['ingredient']
+            for ingredient in ingredients_data
+        }
+        kept, to_update = [], []
+        for ingredient_id, item in existing.items():
+            if ingredient_id not in new_amounts:
+                continue
+            item.ingredient = ingredients[ingredient_id]
+            kept.append(item)
+            if new_amounts[ingredient_id] != item.amount:
+                item.amount = new_amounts[ingredient_id]
+                to_update.append(item)
+        to_delete = [
+            item.pk for ingredient_id, item in existing.items()
+            if ingredient_id not in new_amounts
+        ]
+        if to_delete:
+            RecipeIngredient.objects.filter(pk__in=to_delete).delete()
+        if to_update:
+            RecipeIngredient.objects.bulk_update(to_update, ['amount'])
+        created = self.create_ingredients_recipes(
+            recipe=recipe,
+            ingredients_data=[
+                ingredient for ingredient in ingredients_data
+                if ingredient['id'] not in existing
+            ]
+        )
+        return kept + created, old_amounts, new_amounts
+
+    @transaction.atomic
     def update(self, instance, validated_data):
         tags = validated_data.pop('tags')
         ingredients_data = validated_data.pop('ingredients')
-        instance.tags.clear()
+        list(
+            Recipe.objects.select_for_update().filter(
+                pk=instance.pk
+            ).values_list('pk', flat=True)
+        )
         instance.tags.set(tags)
-        instance.ingredients.clear()
-        self.create_ingredients_recipes(
-            recipe=instance,
-            ingredients_data=ingredients_data,
+        recipe_ingredients, old_amounts, new_amounts = (
+            self.update_ingredients_recipes(
+                recipe=instance,
+                ingredients_data=ingredients_data,
+            )
+        )
+        shopping_list.recipe_ingredients_changed(
+            instance.id,
+            old_amounts,
+            new_amounts
         )
         instance = super().update(instance, validated_data)
+        self.cache_relations(instance, tags, recipe_ingredients)
         return instance
 
     def to_representation(self, instance):
         return RecipeDetailSerializer(instance, context=self.context).data
 
 
-class FavoriteShoppingCartSerializer(serializers.ModelSerializer):
+class RecipeImportSerializer(
+    TimedSerializerMixin,
+    serializers.ModelSerializer
+):
+    """Сериализатор задачи импорта рецептов."""
+
+    report = serializers.SerializerMethodField()
 
     class Meta:
+        model = RecipeImport
         fields = (
-            'user',
-            'recipe',
+            'id',
+            'imported',
+            'failed',
+            'position',
+            'report',
+            'created_at',
+            'finished_at'
         )
 
-    def to_representation(self, instance):
-        return SpecialRecipeSerializer(
-            instance.recipe,
-            context={'request': self.context.get('request')},
-        ).data
-
-
-class FavoriteSerializer(FavoriteShoppingCartSerializer):
-
-    class Meta(FavoriteShoppingCartSerializer.Meta):
-        model = Favorite
-        validators = [
-            UniqueTogetherValidator(
-                queryset=Favorite.objects.all(),
-                fields=('user', 'recipe'),
-                message='Рецепт уже был добавлен',
-            ),
-        ]
+    def get_report(self, obj):
+        """Адрес отчёта об ошибках, доступный только администраторам."""
+        if not obj.failed:
+            return None
+        url = reverse('recipes-import-report', kwargs={'job_id': obj.pk})
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
 
 
-class ShoppingCartSerializer(FavoriteShoppingCartSerializer):
+class BatchSerializer(serializers.Serializer):
+    """Сериализатор списка id для пакетных операций."""
 
-    class Meta(FavoriteShoppingCartSerializer.Meta):
-        model = ShoppingCart
-        validators = [
-            UniqueTogetherValidator(
-                queryset=ShoppingCart.objects.all(),
-                fields=('user', 'recipe'),
-                message='Рецепт уже был добавлен',
-            ),
-        ]
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        min_length=1,
+        max_length=BATCH_MAX_SIZE
+    )
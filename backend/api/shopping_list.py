@@ -0,0 +1,110 @@
+import csv
+import hashlib
+import io
+import json
+
+from django.conf import settings
+
+from api.constants import (SHOPPING_LIST_CHUNK_SIZE, SHOPPING_LIST_HEADER,
+                           SHOPPING_LIST_TITLE)
+
+
+class Echo:
+    """Псевдо-файл, возвращающий записанную строку, для csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def shopping_list_etag(version, catalog, export_format):
+    """
+    Вычисляет ETag списка покупок в заданном формате.
+
+    version: версия списка покупок пользователя, catalog: версия
+    справочника ингредиентов, от которого зависят названия и единицы
+    измерения в выгрузке.
+    """
+    digest = hashlib.sha256(
+        f'{export_format}:{version}:{catalog}'.encode()
+    )
+    return f'"{digest.hexdigest()}"'
+
+
+def export_txt(items):
+    yield f'{SHOPPING_LIST_TITLE}\n'
+    for name, measurement_unit, amount in items:
+        yield f'{name} ({measurement_unit}): {amount}\n'
+
+
+def export_csv(items):
+    writer = csv.writer(Echo())
+    yield writer.writerow(SHOPPING_LIST_HEADER)
+    for row in items:
+        yield writer.writerow(row)
+
+
+def export_json(items):
+    separator = ''
+    yield '['
+    for name, measurement_unit, amount in items:
+        yield separator + json.dumps(
+            {
+                'name': name,
+                'measurement_unit': measurement_unit,
+                'amount': amount
+            },
+            ensure_ascii=False
+        )
+        separator = ','
+    yield ']'
+
+
+def export_pdf(items):
+    """
+    Формирует PDF со списком покупок.
+
+    PDF собирается целиком перед отправкой, поэтому отдаётся частями
+    уже после построения документа.
+    """
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFError, TTFont
+    from reportlab.pdfgen import canvas
+
+    font = 'Helvetica'
+    try:
+        pdfmetrics.registerFont(
+            TTFont('ShoppingList', settings.SHOPPING_LIST_PDF_FONT)
+        )
+        font = 'ShoppingList'
+    except (OSError, TTFError):
+        pass
+    buffer = io.BytesIO()
+    document = canvas.Canvas(buffer, pagesize=A4)
+    width, height = A4
+    margin, line_height = 50, 16
+    y = height - margin
+    document.setFont(font, 16)
+    document.drawString(margin, y, SHOPPING_LIST_TITLE)
+    document.setFont(font, 12)
+    y -= line_height * 2
+    for name, measurement_unit, amount in items:
+        if y < margin:
+            document.showPage()
+            document.setFont(font, 12)
+            y = height - margin
+        document.drawString(
+            margin, y, f'{name} ({measurement_unit}): {amount}'
+        )
+        y -= line_height
+    document.save()
+    buffer.seek(0)
+    yield from iter(lambda: buffer.read(SHOPPING_LIST_CHUNK_SIZE), b'')
+
+
+EXPORTERS = {
+    'txt': export_txt,
+    'csv': export_csv,
+    'json': export_json,
+    'pdf': export_pdf,
+}
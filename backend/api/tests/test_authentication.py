@@ -0,0 +1,109 @@
+import tempfile
+
+from django.core.checks import run_checks
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.authentication import CachedTokenAuthentication, token_cache
+from users.models import User
+
+LOCMEM = 'django.core.cache.backends.locmem.LocMemCache'
+FILE_BASED = 'django.core.cache.backends.filebased.FileBasedCache'
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """Кэширование пользователя по токену."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='reader@example.com',
+            username='reader',
+            first_name='Читатель',
+            last_name='Тестовый',
+            password='Pa55word!'
+        )
+        cls.token = Token.objects.create(user=cls.user)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def use_cache(self, backend):
+        location = tempfile.TemporaryDirectory()
+        self.addCleanup(location.cleanup)
+        # Размер по умолчанию, который settings.py выбирает для кэша.
+        caches = override_settings(
+            CACHES={'default': {
+                'BACKEND': backend, 'LOCATION': location.name
+            }},
+            TOKEN_CACHE_SIZE=0 if backend == LOCMEM else 1024
+        )
+        caches.enable()
+        self.addCleanup(caches.disable)
+        token_cache.invalidate()
+
+    def token_queries(self, method, path):
+        with CaptureQueriesContext(connection) as context:
+            response = getattr(self.client, method)(path)
+        self.assertLess(response.status_code, 400)
+        return sum(
+            query['sql'].startswith('SELECT')
+            and 'authtoken_token' in query['sql']
+            for query in context.captured_queries
+        )
+
+    def test_shared_cache_skips_database_for_reads(self):
+        self.use_cache(FILE_BASED)
+        self.assertTrue(token_cache.enabled)
+        self.token_queries('get', '/api/users/me/')
+        self.assertEqual(self.token_queries('get', '/api/users/me/'), 0)
+        self.assertNotIn(
+            'api.W002', [message.id for message in run_checks()]
+        )
+
+    def test_writes_read_user_from_database(self):
+        self.use_cache(FILE_BASED)
+        self.token_queries('get', '/api/users/me/')
+        self.assertGreater(
+            self.token_queries('post', '/api/auth/token/logout/'), 0
+        )
+
+    def test_process_local_cache_is_disabled(self):
+        self.use_cache(LOCMEM)
+        self.assertFalse(token_cache.enabled)
+        self.token_queries('get', '/api/users/me/')
+        self.assertEqual(self.token_queries('get', '/api/users/me/'), 1)
+        # Размер по умолчанию для кэша процесса равен 0 и предупреждения
+        # нет; оно выводится, только если кэш включён явно.
+        self.assertNotIn(
+            'api.W002', [message.id for message in run_checks()]
+        )
+        with self.settings(TOKEN_CACHE_SIZE=1024):
+            self.assertFalse(token_cache.enabled)
+            self.assertIn(
+                'api.W002', [message.id for message in run_checks()]
+            )
+
+    def test_cached_user_shares_no_state(self):
+        self.use_cache(FILE_BASED)
+        authentication = CachedTokenAuthentication()
+        authentication.authenticate_credentials(self.token.key)
+        first, _ = authentication.authenticate_credentials(self.token.key)
+        first.first_name = 'Изменённое'
+        first._state.fields_cache['auth_token'] = None
+        with self.assertNumQueries(0):
+            second, token = authentication.authenticate_credentials(
+                self.token.key
+            )
+        self.assertIsNot(first._state, second._state)
+        self.assertIs(second._state.fields_cache['auth_token'], token)
+        self.assertFalse(second._state.adding)
+        self.assertEqual(second._state.db, 'default')
+        self.assertEqual(second, self.user)
+        self.assertEqual(second.first_name, 'Читатель')
+        self.assertIs(token.user, second)
+        self.assertEqual(token.key, self.token.key)
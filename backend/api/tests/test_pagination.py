@@ -0,0 +1,107 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from recipes.models import Recipe, Tag
+from users.models import User
+
+URL = '/api/recipes/'
+# Популярность и сдвиг даты публикации в часах; повторы проверяют, что
+# рецепты с одинаковыми значениями не теряются между страницами.
+RECIPES = ((3, 0), (3, 1), (1, 1), (5, 2), (0, 3), (3, 3), (2, 4))
+
+
+class RecipeCursorPaginationTests(TestCase):
+    """Пагинация списка рецептов по курсору."""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(
+            email='author@example.com',
+            username='author',
+            first_name='Автор',
+            last_name='Тестовый',
+            password='Pa55word!'
+        )
+        cls.tag = Tag.objects.create(name='Суп', color='#E26C2D', slug='soup')
+        now = timezone.now()
+        for i, (favorites, hours) in enumerate(RECIPES):
+            recipe = Recipe.objects.create(
+                author=author,
+                name=f'Суп {i}' if i % 2 else f'Рецепт {i}',
+                text='Описание',
+                cooking_time=5
+            )
+            Recipe.objects.filter(pk=recipe.pk).update(
+                favorites_count=favorites,
+                pub_date=now - timedelta(hours=hours)
+            )
+            if i % 3:
+                recipe.tags.add(cls.tag)
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def get(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def ids(self, data):
+        return [recipe['id'] for recipe in data['results']]
+
+    def walk(self, **params):
+        """Все рецепты по ссылкам next и обратно по ссылкам previous."""
+        pages = [self.get(URL, cursor='', limit=2, **params)]
+        while pages[-1]['next']:
+            pages.append(self.get(pages[-1]['next']))
+        self.assertNotIn('count', pages[0])
+        back = [pages[-1]]
+        while back[-1]['previous']:
+            back.append(self.get(back[-1]['previous']))
+        self.assertEqual(
+            [self.ids(page) for page in reversed(back)][1:],
+            [self.ids(page) for page in pages][1:]
+        )
+        return [pk for page in pages for pk in self.ids(page)]
+
+    def expected(self, **params):
+        return self.ids(self.get(URL, limit=100, **params))
+
+    def test_default_order(self):
+        self.assertEqual(self.walk(), self.expected())
+
+    def test_ordering(self):
+        for ordering in ('-favorites_count', 'favorites_count', 'pub_date'):
+            with self.subTest(ordering):
+                self.assertEqual(
+                    self.walk(ordering=ordering),
+                    self.expected(ordering=ordering)
+                )
+        favorites = [
+            Recipe.objects.get(pk=pk).favorites_count
+            for pk in self.walk(ordering='-favorites_count')
+        ]
+        self.assertEqual(favorites, sorted(favorites, reverse=True))
+
+    def test_filters(self):
+        params = {'tags': 'soup', 'ordering': '-favorites_count'}
+        self.assertEqual(self.walk(**params), self.expected(**params))
+        self.assertEqual(len(self.walk(tags='soup')), 4)
+
+    def test_search_with_cursor_is_rejected(self):
+        self.assertEqual(len(self.expected(search='суп')), 3)
+        response = self.client.get(URL, {'search': 'суп', 'cursor': ''})
+        self.assertEqual(response.status_code, 400)
+
+    def test_cursor_of_other_ordering_is_invalid(self):
+        data = self.get(URL, cursor='', limit=2)
+        cursor = data['next'].split('cursor=')[1].split('&')[0]
+        response = self.client.get(
+            URL, {'cursor': cursor, 'ordering': '-favorites_count'}
+        )
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get(URL, {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 404)
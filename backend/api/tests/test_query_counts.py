@@ -0,0 +1,280 @@
+import json
+import tempfile
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLResolver, get_resolver, reverse
+from rest_framework.permissions import IsAdminUser
+from rest_framework.test import APIClient
+
+from api.constants import QUERY_BUDGET_PAGE_SIZES, QUERY_BUDGETS_ROUTE
+from api.permissions import IsMetricsScraper
+from api.query_log import fingerprint
+from api.throttling import BatchRateThrottle
+from recipes import shopping_list
+from recipes.counters import recount
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeImport,
+                            RecipeIngredient, ShoppingCart, Tag)
+from users.models import Follow, User
+
+PREFIX = 'query_budget'
+# Действия, которые изменяют данные, но не требуют тела запроса, кроме
+# списка ids пакетных действий; остальные изменяющие запросы пропускаются.
+WRITE_ACTIONS = (
+    'favorite', 'shopping_cart', 'subscribe',
+    'favorite_batch', 'shopping_cart_batch', 'subscribe_batch',
+)
+# Маршруты с этими правами измеряются от имени администратора.
+STAFF_PERMISSIONS = (IsAdminUser, IsMetricsScraper)
+
+
+def url_patterns(resolver):
+    for pattern in resolver.url_patterns:
+        if isinstance(pattern, URLResolver):
+            yield from url_patterns(pattern)
+        elif pattern.name and 'format' not in (
+            pattern.pattern.regex.groupindex
+        ):
+            yield pattern
+
+
+def is_staff_only(view, action):
+    """Доступен ли маршрут только администратору."""
+    handler = getattr(view, action, None)
+    permission_classes = getattr(handler, 'kwargs', {}).get(
+        'permission_classes', view.permission_classes
+    )
+    return any(
+        isinstance(permission, type)
+        and issubclass(permission, STAFF_PERMISSIONS)
+        for permission in permission_classes
+    )
+
+
+@override_settings(RECIPE_LIST_CACHE_TIMEOUT=0, REQUEST_METRICS=False)
+class QueryCountsTests(TestCase):
+    """
+    Количество SQL-запросов эндпоинтов API.
+
+    Обходит все маршруты router_v1 и djoser и выполняет GET-запросы и
+    действия добавления и удаления связей при размерах страницы и пакета
+    из QUERY_BUDGET_PAGE_SIZES. Количество запросов не должно зависеть от
+    размера страницы и не должно превышать бюджет из файла
+    QUERY_BUDGETS_ROUTE для текущей базы данных; бюджеты меняются в этом
+    файле вручную. Маршруты только для администратора выполняются от
+    имени администратора, а ответы 401 и 403 считаются ошибкой: бюджет
+    отказа в доступе не измеряет эндпоинт. Если для базы данных бюджеты
+    ещё не записаны, тест пропускается.
+    """
+
+    client_class = APIClient
+
+    @classmethod
+    def setUpTestData(cls):
+        User.objects.bulk_create(
+            User(
+                email=f'{PREFIX}_{i}@example.com',
+                username=f'{PREFIX}_{i}',
+                first_name='Бюджет',
+                last_name=str(i)
+            ) for i in range(122)
+        )
+        users = list(
+            User.objects.filter(username__startswith=PREFIX).order_by('pk')
+        )
+        cls.user, authors, strangers = users[0], users[1:61], users[61:121]
+        cls.staff = users[121]
+        cls.staff.is_staff = True
+        cls.staff.save(update_fields=('is_staff',))
+        Tag.objects.bulk_create(
+            Tag(
+                name=f'{PREFIX} {i}',
+                color=f'#BD{i:04X}',
+                slug=f'{PREFIX}_{i}'
+            ) for i in range(3)
+        )
+        tags = list(Tag.objects.filter(slug__startswith=PREFIX))
+        Ingredient.objects.bulk_create(
+            Ingredient(name=f'{PREFIX} {i}', measurement_unit='г')
+            for i in range(60)
+        )
+        ingredients = list(Ingredient.objects.filter(name__startswith=PREFIX))
+        Recipe.objects.bulk_create(
+            Recipe(
+                author=author,
+                name=f'{PREFIX} {i}',
+                text='Описание',
+                cooking_time=10,
+                image='images/query_budget.png'
+            )
+            for i, author in enumerate(
+                authors + [authors[0]] * 60
+            )
+        )
+        recipes = list(
+            Recipe.objects.filter(author__in=authors).order_by('pk')
+        )
+        Recipe.tags.through.objects.bulk_create(
+            Recipe.tags.through(recipe=recipe, tag=tag)
+            for recipe in recipes for tag in tags[:2]
+        )
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(recipe=recipe, ingredient=ingredient, amount=10)
+            for recipe in recipes for ingredient in ingredients[:5]
+        )
+        Follow.objects.bulk_create(
+            Follow(user=cls.user, following=author) for author in authors
+        )
+        for model in (Favorite, ShoppingCart):
+            model.objects.bulk_create(
+                model(user=cls.user, recipe=recipe) for recipe in recipes[:60]
+            )
+        shopping_list.add_recipes(
+            cls.user.pk, [recipe.pk for recipe in recipes]
+        )
+        recount()
+        reports = tempfile.TemporaryDirectory()
+        cls.addClassCleanup(reports.cleanup)
+        report = Path(reports.name) / f'{PREFIX}.errors.ndjson'
+        error = {'line': 1, 'errors': {'record': 'Некорректный JSON'}}
+        report.write_text(json.dumps(error) + '\n', encoding='utf-8')
+        job = RecipeImport.objects.create(
+            source=str(Path(reports.name) / f'{PREFIX}.ndjson'),
+            report=str(report),
+            position=1,
+            failed=1
+        )
+        cls.kwargs = {
+            'users': strangers[0].pk,
+            'recipes': recipes[-1].pk,
+            'ingredients': ingredients[0].pk,
+            'tags': tags[0].pk,
+            'job_id': job.pk,
+        }
+        cls.ids = {
+            'users': [stranger.pk for stranger in strangers],
+            'recipes': [recipe.pk for recipe in recipes[60:]],
+        }
+        with open(
+            settings.BASE_DIR / QUERY_BUDGETS_ROUTE, encoding='utf-8'
+        ) as file:
+            cls.budgets = json.load(file).get(connection.vendor)
+
+    def cases(self):
+        """(имя, метод, путь, действие, пользователь) для маршрутов API."""
+        api = next(
+            pattern for pattern in get_resolver().url_patterns
+            if isinstance(pattern, URLResolver)
+            and str(pattern.pattern) == 'api/'
+        )
+        seen = set()
+        for pattern in url_patterns(api):
+            callback = pattern.callback
+            cls = getattr(callback, 'cls', None)
+            if cls is None:
+                continue
+            prefix = pattern.name.split('-')[0]
+            path = reverse(pattern.name, kwargs={
+                group: self.kwargs.get(
+                    group, self.kwargs.get(prefix, self.kwargs['users'])
+                )
+                for group in pattern.pattern.regex.groupindex
+            })
+            actions = getattr(callback, 'actions', None) or {
+                method: method for method in cls.http_method_names
+                if hasattr(cls, method) and method != 'options'
+            }
+            for method, action in list(actions.items()):
+                method = method.upper()
+                if method in ('HEAD', 'OPTIONS') or (method, path) in seen:
+                    continue
+                seen.add((method, path))
+                if method != 'GET' and action not in WRITE_ACTIONS:
+                    continue
+                user = self.staff if is_staff_only(cls, action) else self.user
+                yield f'{method} {pattern.name}', method, path, action, user
+
+    def measure(self, method, path, action, user, size):
+        """Текст запросов для размера страницы size."""
+        self.client.force_authenticate(user)
+        body = None
+        if action.endswith('_batch'):
+            prefix = 'users' if action == 'subscribe_batch' else 'recipes'
+            body = {'ids': self.ids[prefix][:size]}
+            throttle = BatchRateThrottle()
+            throttle.cache.delete(throttle.cache_format % {
+                'scope': throttle.scope, 'ident': user.pk
+            })
+        if method == 'GET':
+            path = f'{path}?limit={size}&recipes_limit={size}'
+            # Прогрев: первый запрос заполняет кэши процесса.
+            self.send('GET', path, body)
+        elif method == 'DELETE':
+            self.send('POST', path, body)
+        with CaptureQueriesContext(connection) as context:
+            self.send(method, path, body)
+        # Следующий запрос очищает queries_log, поэтому текст читается сразу.
+        queries = [query['sql'] for query in context.captured_queries]
+        if method == 'POST':
+            # Повторный POST вернул бы ошибку, поэтому связь сразу удаляется.
+            self.send('DELETE', path, body)
+        return queries
+
+    def send(self, method, path, body):
+        """Выполняет запрос и читает потоковый ответ целиком."""
+        response = getattr(self.client, method.lower())(
+            path, body, format='json'
+        )
+        if response.streaming:
+            b''.join(response.streaming_content)
+        self.assertLess(
+            response.status_code, 500, f'{method} {path}: ошибка сервера'
+        )
+        self.assertNotIn(
+            response.status_code, (401, 403), f'{method} {path}: нет доступа'
+        )
+        return response
+
+    def test_budgets(self):
+        if self.budgets is None:
+            self.skipTest(
+                f'Нет бюджетов для {connection.vendor} в {QUERY_BUDGETS_ROUTE}'
+            )
+        measured = set()
+        for name, method, path, action, user in self.cases():
+            measured.add(name)
+            with self.subTest(name):
+                runs = [
+                    self.measure(method, path, action, user, size)
+                    for size in QUERY_BUDGET_PAGE_SIZES
+                ]
+                counts = [len(queries) for queries in runs]
+                sizes = ', '.join(
+                    f'{size}: {count}'
+                    for size, count in zip(QUERY_BUDGET_PAGE_SIZES, counts)
+                )
+                repeated = '\n'.join(
+                    f'    {count} x {sql}'
+                    for sql, count in Counter(
+                        map(fingerprint, runs[-1])
+                    ).most_common(10)
+                )
+                self.assertIn(
+                    name, self.budgets, f'Нет бюджета в {QUERY_BUDGETS_ROUTE}'
+                )
+                self.assertEqual(
+                    len(set(counts)), 1,
+                    f'Зависит от размера страницы ({sizes}):\n{repeated}'
+                )
+                self.assertLessEqual(
+                    max(counts), self.budgets[name],
+                    f'Превышен бюджет ({sizes}):\n{repeated}'
+                )
+        self.assertEqual(
+            set(self.budgets) - measured, set(),
+            f'Бюджеты несуществующих маршрутов в {QUERY_BUDGETS_ROUTE}'
+        )
@@ -0,0 +1,41 @@
+from django.test import TestCase
+from django.utils.http import http_date
+from rest_framework.test import APIClient
+
+from recipes.models import Recipe
+from users.models import User
+
+
+class RecipeDetailValidatorsTests(TestCase):
+    """Условные GET-запросы карточки рецепта."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            email='author@example.com',
+            username='author',
+            first_name='Автор',
+            last_name='Тестовый',
+            password='Pa55word!'
+        )
+        cls.recipe = Recipe.objects.create(
+            author=cls.author, name='Рецепт', text='Описание', cooking_time=5
+        )
+
+    def get(self, **extra):
+        return APIClient().get(f'/api/recipes/{self.recipe.pk}/', **extra)
+
+    def test_author_change_is_not_hidden_by_if_modified_since(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Last-Modified', response)
+        etag = response['ETag']
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.author.first_name = 'Автор Новый'
+        self.author.save()
+        response = self.get(HTTP_IF_MODIFIED_SINCE=http_date())
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(
+            response.json()['author']['first_name'], 'Автор Новый'
+        )
@@ -0,0 +1,177 @@
+import base64
+import io
+import json
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import DatabaseError
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from recipes.importer import RecipeImporter
+from recipes.models import Ingredient, Recipe, RecipeImport, Tag
+from users.models import User
+
+URL = '/api/recipes/import/'
+PNG = base64.b64decode(
+    'iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mP8z8DwHwAF'
+    'BQIAX8jx0gAAAABJRU5ErkJggg=='
+)
+
+
+class RecipeImportEndpointTests(TestCase):
+    """Импорт рецептов через API."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(
+            email='admin@example.com',
+            username='admin',
+            first_name='Админ',
+            last_name='Тестовый',
+            password='Pa55word!',
+            is_staff=True
+        )
+        cls.author = User.objects.create_user(
+            email='author@example.com',
+            username='author',
+            first_name='Автор',
+            last_name='Тестовый',
+            password='Pa55word!'
+        )
+        Tag.objects.create(name='Завтрак', color='#E26C2D', slug='breakfast')
+        cls.ingredient = Ingredient.objects.create(
+            name='мука', measurement_unit='г'
+        )
+
+    def setUp(self):
+        directories = [tempfile.TemporaryDirectory() for _ in range(2)]
+        for directory in directories:
+            self.addCleanup(directory.cleanup)
+        self.media, self.imports = (
+            Path(directory.name) for directory in directories
+        )
+        (self.media / 'recipe.png').write_bytes(PNG)
+        settings = override_settings(
+            MEDIA_ROOT=str(self.media),
+            RECIPE_IMPORT_ROOT=str(self.imports),
+            RECIPE_IMPORT_IMAGES_DIR=str(self.media),
+            RECIPE_IMPORT_WORKERS=0
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def body(self, count):
+        lines = [
+            json.dumps({
+                'author': self.author.email,
+                'name': f'Рецепт {i}',
+                'text': 'Описание',
+                'cooking_time': 10,
+                'image': 'recipe.png',
+                'tags': ['breakfast'],
+                'ingredients': [{'id': self.ingredient.pk, 'amount': 100}],
+            }) for i in range(count)
+        ]
+        lines.append('{некорректный json')
+        return ('\n'.join(lines) + '\n').encode()
+
+    def upload(self, body, user=None):
+        if user is not None:
+            self.client.force_authenticate(user)
+        return self.client.generic(
+            'POST', URL, body, content_type='application/x-ndjson'
+        )
+
+    def test_upload_is_queued_in_private_storage(self):
+        response = self.upload(self.body(3))
+        self.assertEqual(response.status_code, 202)
+        job = RecipeImport.objects.get(pk=response.json()['id'])
+        self.assertIsNone(job.finished_at)
+        self.assertEqual(Recipe.objects.count(), 0)
+        self.assertEqual(Path(job.source).parent, self.imports.resolve())
+        self.assertEqual(Path(job.report).parent, self.imports.resolve())
+        self.assertEqual(list(self.media.rglob('*.ndjson')), [])
+
+    def test_command_runs_uploaded_job(self):
+        job_id = self.upload(self.body(3)).json()['id']
+        call_command(
+            'import_recipes',
+            job=job_id,
+            skip_image_variants=True,
+            stdout=io.StringIO(),
+            stderr=io.StringIO()
+        )
+        response = self.client.get(f'{URL}{job_id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['imported'], 3)
+        self.assertEqual(response.json()['failed'], 1)
+        self.assertIsNotNone(response.json()['finished_at'])
+        report = self.client.get(response.json()['report'])
+        self.assertEqual(report.status_code, 200)
+        self.assertIn(b'"line": 4', b''.join(report.streaming_content))
+
+    def test_reupload_resumes_unfinished_job(self):
+        body = self.body(3)
+        job_id = self.upload(body).json()['id']
+        self.assertEqual(self.upload(body).json()['id'], job_id)
+        self.assertEqual(RecipeImport.objects.count(), 1)
+
+    def test_job_is_admin_only(self):
+        job_id = self.upload(self.body(1)).json()['id']
+        self.assertEqual(self.upload(b'{}\n', self.author).status_code, 403)
+        self.assertEqual(self.client.get(f'{URL}{job_id}/').status_code, 403)
+        self.assertEqual(
+            self.client.get(f'{URL}{job_id}/report/').status_code, 403
+        )
+
+    def test_concurrent_runner_stops(self):
+        job = RecipeImport.objects.get(
+            pk=self.upload(self.body(3)).json()['id']
+        )
+        importer = RecipeImporter(job, self.media, batch_size=2)
+        RecipeImport.objects.filter(pk=job.pk).update(position=2)
+        importer.run()
+        self.assertIsNone(job.finished_at)
+        self.assertEqual(job.position, 2)
+        self.assertEqual(Recipe.objects.count(), 0)
+
+    def copy_images(self):
+        images = tempfile.TemporaryDirectory()
+        self.addCleanup(images.cleanup)
+        (Path(images.name) / 'recipe.png').write_bytes(PNG)
+        job = RecipeImport.objects.get(
+            pk=self.upload(self.body(3)).json()['id']
+        )
+        return RecipeImporter(job, images.name, image_variants=False)
+
+    def stored_images(self):
+        upload_to = Recipe.image.field.upload_to
+        return sorted(
+            path.name for path in (self.media / upload_to).glob('*')
+        )
+
+    def test_resumed_import_reuses_copied_images(self):
+        importer = self.copy_images()
+        # Копия, оставшаяся от пачки, прерванной вместе с процессом.
+        leftover = importer.store_image(
+            importer.resolve_image('recipe.png'), 1
+        )
+        importer.run()
+        self.assertEqual(Recipe.objects.count(), 3)
+        self.assertEqual(len(self.stored_images()), 3)
+        self.assertTrue(Recipe.objects.filter(image=leftover).exists())
+
+    def test_failed_chunk_removes_copied_images(self):
+        importer = self.copy_images()
+        with mock.patch(
+            'recipes.importer.update_search_index',
+            side_effect=DatabaseError
+        ), self.assertRaises(DatabaseError):
+            importer.run()
+        self.assertEqual(Recipe.objects.count(), 0)
+        self.assertEqual(self.stored_images(), [])
@@ -0,0 +1,137 @@
+import re
+import tempfile
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+from users.models import User
+
+WRITES = ('INSERT', 'UPDATE', 'DELETE')
+EXECUTEMANY = re.compile(r'^\d+ times ')
+IMAGE = (
+    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAA'
+    'DUlEQVR42mP8z8DwHwAFBQIAX8jx0gAAAABJRU5ErkJggg=='
+)
+
+
+class RecipeUpdateWriteQueriesTests(TestCase):
+    """Изменение одного ингредиента рецепта затрагивает только его строку."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            email='author@example.com',
+            username='author',
+            first_name='Автор',
+            last_name='Тестовый',
+            password='Pa55word!'
+        )
+        cls.tags = [
+            Tag.objects.create(
+                name=f'Тег {i}', color=f'#00000{i}', slug=f'tag{i}'
+            ) for i in range(2)
+        ]
+        cls.ingredients = [
+            Ingredient.objects.create(
+                name=f'ингредиент {i}', measurement_unit='г'
+            ) for i in range(4)
+        ]
+        cls.recipe = Recipe.objects.create(
+            author=cls.author,
+            name='Рецепт',
+            text='Описание',
+            cooking_time=10,
+            image='images/recipe.png'
+        )
+        cls.recipe.tags.set(cls.tags)
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(
+                recipe=cls.recipe, ingredient=ingredient, amount=10
+            ) for ingredient in cls.ingredients[:3]
+        )
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings = override_settings(MEDIA_ROOT=media.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.client = APIClient()
+        self.client.force_authenticate(self.author)
+        self.rows = dict(
+            RecipeIngredient.objects.values_list('ingredient_id', 'pk')
+        )
+
+    def update(self, amounts):
+        """PATCH рецепта; возвращает выполненные запросы записи."""
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.patch(
+                f'/api/recipes/{self.recipe.pk}/',
+                {
+                    'name': 'Рецепт',
+                    'text': 'Описание',
+                    'cooking_time': 10,
+                    'image': IMAGE,
+                    'tags': [tag.pk for tag in self.tags],
+                    'ingredients': [
+                        {'id': ingredient.pk, 'amount': amount}
+                        for ingredient, amount in amounts.items()
+                    ],
+                },
+                format='json'
+            )
+        self.assertEqual(response.status_code, 200, response.content)
+        # executemany записывается в журнал как "N times SQL". Поисковый
+        # индекс SQLite не учитывается: в PostgreSQL его ведёт триггер.
+        statements = [
+            EXECUTEMANY.sub('', query['sql'])
+            for query in context.captured_queries
+        ]
+        return [
+            sql for sql in statements
+            if sql.split(maxsplit=1)[0] in WRITES
+            and 'recipes_recipe_fts' not in sql
+        ]
+
+    def rows_after(self):
+        return dict(
+            RecipeIngredient.objects.values_list('ingredient_id', 'pk')
+        )
+
+    def assert_ingredient_write(self, writes, statement):
+        """Кроме UPDATE рецепта, выполнен один запрос к ингредиентам."""
+        self.assertEqual(len(writes), 2, writes)
+        ingredient_writes = [
+            sql for sql in writes if 'recipes_recipeingredient' in sql
+        ]
+        self.assertEqual(len(ingredient_writes), 1, writes)
+        self.assertTrue(ingredient_writes[0].startswith(statement))
+        recipe_write, = set(writes) - set(ingredient_writes)
+        self.assertTrue(recipe_write.startswith('UPDATE "recipes_recipe"'))
+
+    def test_change_one_amount(self):
+        first, second, third, _ = self.ingredients
+        writes = self.update({first: 25, second: 10, third: 10})
+        self.assert_ingredient_write(writes, 'UPDATE')
+        self.assertEqual(self.rows_after(), self.rows)
+        self.assertEqual(
+            RecipeIngredient.objects.get(ingredient=first).amount, 25
+        )
+
+    def test_add_one_ingredient(self):
+        first, second, third, fourth = self.ingredients
+        writes = self.update({first: 10, second: 10, third: 10, fourth: 5})
+        self.assert_ingredient_write(writes, 'INSERT')
+        rows = self.rows_after()
+        self.assertEqual(rows.pop(fourth.pk) in self.rows.values(), False)
+        self.assertEqual(rows, self.rows)
+
+    def test_remove_one_ingredient(self):
+        first, second, third, _ = self.ingredients
+        writes = self.update({first: 10, second: 10})
+        self.assert_ingredient_write(writes, 'DELETE')
+        del self.rows[third.pk]
+        self.assertEqual(self.rows_after(), self.rows)
@@ -0,0 +1,97 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import TransactionTestCase
+from rest_framework.test import APIClient
+
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                            ShoppingCart, ShoppingListItem)
+from users.models import Follow, User
+
+THREADS = 8
+
+
+@skipUnless(
+    connection.vendor == 'postgresql',
+    'Параллельные запросы проверяются только на PostgreSQL'
+)
+class ConcurrentRelationsTests(TransactionTestCase):
+    """Параллельные одинаковые запросы добавления связи."""
+
+    def setUp(self):
+        self.user, self.author = (
+            User.objects.create_user(
+                email=f'{username}@example.com',
+                username=username,
+                first_name='Имя',
+                last_name='Фамилия',
+                password='Pa55word!'
+            ) for username in ('reader', 'author')
+        )
+        self.recipe = Recipe.objects.create(
+            author=self.author,
+            name='Рецепт',
+            text='Описание',
+            cooking_time=10
+        )
+        self.ingredient = Ingredient.objects.create(
+            name='Соль', measurement_unit='г'
+        )
+        RecipeIngredient.objects.create(
+            recipe=self.recipe, ingredient=self.ingredient, amount=5
+        )
+
+    def post_concurrently(self, path):
+        """Статусы ответов на THREADS одновременных POST-запросов."""
+        barrier = threading.Barrier(THREADS)
+
+        def post():
+            client = APIClient()
+            client.force_authenticate(self.user)
+            try:
+                barrier.wait()
+                return client.post(path).status_code
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(THREADS) as executor:
+            futures = [executor.submit(post) for _ in range(THREADS)]
+            return sorted(future.result() for future in futures)
+
+    def assert_single_created(self, statuses):
+        self.assertEqual(statuses, [201] + [400] * (THREADS - 1))
+
+    def test_favorite(self):
+        statuses = self.post_concurrently(
+            f'/api/recipes/{self.recipe.pk}/favorite/'
+        )
+        self.assert_single_created(statuses)
+        self.assertEqual(Favorite.objects.count(), 1)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.favorites_count, 1)
+
+    def test_shopping_cart(self):
+        statuses = self.post_concurrently(
+            f'/api/recipes/{self.recipe.pk}/shopping_cart/'
+        )
+        self.assert_single_created(statuses)
+        self.assertEqual(ShoppingCart.objects.count(), 1)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.in_carts_count, 1)
+        self.assertEqual(
+            list(ShoppingListItem.objects.values_list(
+                'user', 'ingredient', 'amount'
+            )),
+            [(self.user.pk, self.ingredient.pk, 5)]
+        )
+
+    def test_subscribe(self):
+        statuses = self.post_concurrently(
+            f'/api/users/{self.author.pk}/subscribe/'
+        )
+        self.assert_single_created(statuses)
+        self.assertEqual(Follow.objects.count(), 1)
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.followers_count, 1)
@@ -0,0 +1,85 @@
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from recipes.catalog import catalog_version
+from recipes.models import Ingredient, Recipe, RecipeIngredient
+from users.models import User
+
+URL = '/api/recipes/download_shopping_cart/'
+
+
+class ShoppingListDownloadTests(TestCase):
+    """Выгрузка списка покупок и её ETag."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='buyer@example.com',
+            username='buyer',
+            first_name='Покупатель',
+            last_name='Тестовый',
+            password='Pa55word!'
+        )
+        cls.ingredient = Ingredient.objects.create(
+            name='мука', measurement_unit='г'
+        )
+        Recipe.objects.bulk_create(
+            Recipe(
+                author=cls.user,
+                name=f'Рецепт {i}',
+                text='Описание',
+                cooking_time=10,
+                image='images/recipe.png'
+            ) for i in range(2)
+        )
+        cls.recipes = list(Recipe.objects.order_by('pk'))
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(
+                recipe=recipe, ingredient=cls.ingredient, amount=100
+            ) for recipe in cls.recipes
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        # Индекс строится при первом обращении; дальше версия справочников
+        # проверяется одним запросом за HTTP-запрос.
+        catalog_version()
+
+    def download(self, export_format='txt', **extra):
+        response = self.client.get(URL, {'format': export_format}, **extra)
+        if response.streaming:
+            response.content_body = b''.join(
+                response.streaming_content
+            ).decode()
+        return response
+
+    def test_empty_list(self):
+        self.assertEqual(self.download().status_code, 400)
+
+    def test_etag_follows_list_changes(self):
+        self.client.post(f'/api/recipes/{self.recipes[0].pk}/shopping_cart/')
+        with self.assertNumQueries(3):
+            response = self.download()
+        self.assertIn('мука (г): 100', response.content_body)
+        etag = response['ETag']
+        with self.assertNumQueries(2):
+            response = self.download(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        response = self.download(HTTP_IF_NONE_MATCH=etag, export_format='csv')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.client.post(f'/api/recipes/{self.recipes[1].pk}/shopping_cart/')
+        response = self.download(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('мука (г): 200', response.content_body)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_etag_follows_catalog_changes(self):
+        self.client.post(f'/api/recipes/{self.recipes[0].pk}/shopping_cart/')
+        etag = self.download()['ETag']
+        self.ingredient.name = 'мука пшеничная'
+        self.ingredient.save()
+        response = self.download(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('мука пшеничная (г): 100', response.content_body)
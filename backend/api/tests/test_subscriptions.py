@@ -0,0 +1,34 @@
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from users.models import Follow, User
+
+
+class SubscriptionsTests(TestCase):
+    """Список подписок пользователя."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, *cls.authors = (
+            User.objects.create_user(
+                email=f'{username}@example.com',
+                username=username,
+                first_name='Имя',
+                last_name='Фамилия',
+                password='Pa55word!'
+            ) for username in ('reader', 'zoe', 'anna', 'mike')
+        )
+        Follow.objects.bulk_create(
+            Follow(user=cls.user, following=author)
+            for author in reversed(cls.authors)
+        )
+
+    def test_order_by_author_id(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.get('/api/users/subscriptions/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [item['id'] for item in response.json()['results']],
+            [author.pk for author in self.authors]
+        )
@@ -0,0 +1,7 @@
+from rest_framework.throttling import UserRateThrottle
+
+
+class BatchRateThrottle(UserRateThrottle):
+    """Ограничение частоты пакетных запросов пользователя."""
+
+    scope = 'batch'
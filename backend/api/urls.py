@@ -1,7 +1,8 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from .views import IngredientViewSet, RecipeViewSet, TagViewSet, UserViewSet
+from .views import (IngredientViewSet, MetricsView, RecipeViewSet, TagViewSet,
+                    UserViewSet)
 
 router_v1 = DefaultRouter()
 
@@ -12,6 +13,7 @@ router_v1.register('recipes', RecipeViewSet, basename='recipes')
 
 
 urlpatterns = [
+    path('_metrics', MetricsView.as_view(), name='metrics'),
     path('', include(router_v1.urls)),
     path('', include('djoser.urls')),
     path('auth/', include('djoser.urls.authtoken'))
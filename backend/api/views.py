@@ -1,94 +1,213 @@
-from django.db.models import Sum
-from django.http import FileResponse
+import hashlib
+
+from django.conf import settings
+from django.db.models import (BooleanField, Exists, F, OuterRef, Prefetch,
+                              Value, Window)
+from django.db.models.functions import Coalesce, RowNumber
+from django.http import (FileResponse, Http404, HttpResponse,
+                         HttpResponseNotModified, StreamingHttpResponse)
 from django.shortcuts import get_object_or_404
+from django.utils.http import parse_etags
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
 from rest_framework import exceptions, permissions, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.views import APIView
 
-from api.filters import IngredientFilter, RecipeFilter
-from api.pagination import CustomPagination
-from api.permissions import IsOwnerOrAdminOrReadOnly
-from api.serializers import (FavoriteSerializer, IngredientSerializer,
+from api.filters import IngredientFilter, RecipeFilter, RecipeOrderingFilter
+from api.metrics import metrics_registry
+from api.mixins import BatchRelationMixin, ConditionalGetMixin
+from api.pagination import CustomPagination, RecipePagination
+from api.parsers import NDJSONParser
+from api.permissions import IsMetricsScraper, IsOwnerOrAdminOrReadOnly
+from api.renderers import SHOPPING_LIST_RENDERERS
+from api.serializers import (IngredientSerializer,
                              RecipeCreateUpdateSerializer,
-                             RecipeDetailSerializer, ShoppingCartSerializer,
-                             SubscriptionDataSerializer,
-                             SubscriptionSerializer, TagSerializer,
-                             UserInfoSerializer)
-from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
-                            ShoppingCart, Tag)
+                             RecipeDetailSerializer, RecipeImportSerializer,
+                             SpecialRecipeSerializer, SubscriptionSerializer,
+                             TagSerializer, UserInfoSerializer)
+from api.shopping_list import EXPORTERS, shopping_list_etag
+from api.throttling import BatchRateThrottle
+from recipes import relations
+from recipes.catalog import catalog_version
+from recipes.importer import get_job, save_upload, schedule_import
+from recipes.ingredient_index import ingredient_index
+from recipes.list_cache import recipe_list_cache
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeImport,
+                            RecipeIngredient, ShoppingCart, ShoppingListItem,
+                            Tag)
 from users.models import Follow, User
 
+SUBSCRIBE_ERRORS = {
+    relations.EXISTS: 'Нельзя подписаться на автора дважды',
+    relations.INVALID: 'Нельзя подписаться на самого себя',
+}
+
+
+class CatalogViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
+    """Базовый вьюсет справочников с валидаторами по версии справочников."""
+
+    pagination_class = None
+
+    def get_validators(self, request, *args, **kwargs):
+        version = catalog_version()
+        return f'catalog-{version.version}', version.updated_at
+
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(CatalogViewSet):
     """Вьюсет для просмотра списка ингредиентов."""
 
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
-    pagination_class = None
     filterset_class = IngredientFilter
     filter_backends = (DjangoFilterBackend,)
 
+    def get_validators(self, request, *args, **kwargs):
+        """
+        Валидаторы ответа со списком или карточкой ингредиента.
+
+        Подсказки по ?name= упорядочены по популярности ингредиентов,
+        которая меняется без изменения справочника, поэтому их ETag
+        включает отпечаток порядка индекса, а Last-Modified не отдаётся.
+        """
+        etag, last_modified = super().get_validators(request, *args, **kwargs)
+        if self.action == 'list' and request.query_params.get('name'):
+            return f'{etag}-{ingredient_index.digest[:16]}', None
+        return etag, last_modified
+
+    def filter_queryset(self, queryset):
+        name = self.request.query_params.get('name')
+        if self.action == 'list' and name:
+            return ingredient_index.search(name)
+        return super().filter_queryset(queryset)
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+
+class TagViewSet(CatalogViewSet):
     """Вьюсет для просмотра списка тегов."""
 
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
-    pagination_class = None
 
 
-class UserViewSet(UserViewSet):
+class UserViewSet(BatchRelationMixin, UserViewSet):
     """Вьюсет для модели пользователя."""
 
     queryset = User.objects.all()
     serializer_class = UserInfoSerializer
     pagination_class = CustomPagination
+    lookup_value_regex = r'\d+'
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
+    def get_queryset(self):
+        user = self.request.user
+        if not user.is_authenticated:
+            return super().get_queryset().annotate(
+                is_subscribed=Value(False, output_field=BooleanField())
+            )
+        return super().get_queryset().annotate(
+            is_subscribed=Exists(
+                Follow.objects.filter(user=user, following=OuterRef('pk'))
+            )
+        )
+
     @action(
         detail=True,
         methods=['POST', 'DELETE'],
         permission_classes=[permissions.IsAuthenticated]
     )
     def subscribe(self, request, **kwargs):
-        following = get_object_or_404(
-            User,
-            id=self.kwargs.get('id'),
-        )
-        data = {'user': request.user.id, 'following': following.id}
-        serializer = SubscriptionDataSerializer(
-            data=data,
-            context={'request': request}
-        )
+        pk = int(self.kwargs.get('id'))
         if request.method == 'POST':
-            return self.create_subscription(serializer)
-        return self.delete_subscription(request.user, following)
+            return self.create_subscription(request, pk)
+        return self.delete_subscription(request, pk)
 
-    def create_subscription(self, serializer):
-        serializer.is_valid(raise_exception=True)
-        serializer.save()
+    @action(
+        detail=False,
+        methods=['POST', 'DELETE'],
+        url_path='subscribe/batch',
+        permission_classes=[permissions.IsAuthenticated],
+        throttle_classes=[BatchRateThrottle]
+    )
+    def subscribe_batch(self, request):
+        return self.batch_response(request, relations.subscriptions)
+
+    def create_subscription(self, request, pk):
+        result = relations.subscriptions.add(request.user.id, [pk])[pk]
+        if result == relations.NOT_FOUND:
+            raise Http404
+        if result != relations.CREATED:
+            raise exceptions.ValidationError(SUBSCRIBE_ERRORS[result])
+        following = User.objects.annotate(
+            is_subscribed=Value(True, output_field=BooleanField())
+        ).get(pk=pk)
+        serializer = SubscriptionSerializer(
+            following,
+            context={'request': request}
+        )
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
-    def delete_subscription(self, user, following):
-        subscription = Follow.objects.filter(
-            user=user,
-            following=following
-        ).first()
-        if not subscription:
+    def delete_subscription(self, request, pk):
+        result = relations.subscriptions.remove(request.user.id, [pk])[pk]
+        if result == relations.NOT_FOUND:
+            raise Http404
+        if result == relations.MISSING:
             return Response(
                 {'error': 'Такой подписки не существует'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        subscription.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    def attach_recipe_previews(self, authors, recipes_limit):
+        """
+        Загружает последние рецепты авторов страницы одним запросом.
+
+        Рецепты нумеруются оконной функцией ROW_NUMBER() в пределах
+        автора, и отбираются первые recipes_limit рецептов каждого.
+        """
+        recipes = Recipe.objects.filter(
+            author_id__in=[author.id for author in authors]
+        ).only(
+            'id', 'author_id', 'name', 'image', 'image_variants',
+            'cooking_time', 'pub_date'
+        )
+        if recipes_limit is None:
+            previews = recipes.order_by('-pub_date', '-id')
+        else:
+            sql, params = recipes.annotate(
+                row_number=Window(
+                    expression=RowNumber(),
+                    partition_by=[F('author_id')],
+                    order_by=[F('pub_date').desc(), F('id').desc()]
+                )
+            ).order_by().query.sql_with_params()
+            previews = Recipe.objects.raw(
+                f'SELECT * FROM ({sql}) AS previews '
+                'WHERE previews.row_number <= %s '
+                'ORDER BY previews.pub_date DESC, previews.id DESC',
+                (*params, recipes_limit)
+            )
+        by_author = {author.id: [] for author in authors}
+        for recipe in previews:
+            by_author[recipe.author_id].append(recipe)
+        for author in authors:
+            author.preview_recipes = by_author[author.id]
+
     @action(detail=False, permission_classes=[permissions.IsAuthenticated])
     def subscriptions(self, request):
         user = request.user
-        queryset = User.objects.filter(following__user=user)
+        # Без явной сортировки подписки приходили в порядке индекса
+        # unique_following, то есть по id автора; этот порядок сохраняется.
+        queryset = User.objects.filter(following__user=user).annotate(
+            is_subscribed=Value(True, output_field=BooleanField())
+        ).order_by('id')
         pages = self.paginate_queryset(queryset)
+        recipes_limit = request.query_params.get('recipes_limit')
+        self.attach_recipe_previews(
+            pages,
+            int(recipes_limit) if recipes_limit and recipes_limit.isdigit()
+            else None
+        )
         serializer = SubscriptionSerializer(
             pages,
             many=True,
@@ -107,47 +226,134 @@ class UserViewSet(UserViewSet):
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(
+    BatchRelationMixin,
+    ConditionalGetMixin,
+    viewsets.ModelViewSet
+):
     """Вьюсет для модели рецепта."""
 
-    queryset = Recipe.objects.all()
     permission_classes = (
         IsOwnerOrAdminOrReadOnly,
         permissions.IsAuthenticatedOrReadOnly
     )
-    pagination_class = CustomPagination
+    pagination_class = RecipePagination
+    lookup_value_regex = r'\d+'
     filterset_class = RecipeFilter
-    filter_backends = (DjangoFilterBackend,)
+    filter_backends = (DjangoFilterBackend, RecipeOrderingFilter)
+    ordering_fields = ('favorites_count', 'in_carts_count', 'pub_date')
+
+    def get_queryset(self):
+        return self.annotate_user_flags(
+            Recipe.objects.select_related('author').prefetch_related(
+                'tags',
+                Prefetch(
+                    'recipe_ingredients',
+                    queryset=RecipeIngredient.objects.select_related(
+                        'ingredient'
+                    )
+                )
+            )
+        )
+
+    def annotate_user_flags(self, queryset):
+        user = self.request.user
+        if not user.is_authenticated:
+            return queryset.annotate(
+                is_favorited=Value(False, output_field=BooleanField()),
+                is_in_shopping_cart=Value(False, output_field=BooleanField()),
+                author_is_subscribed=Value(False, output_field=BooleanField())
+            )
+        return queryset.annotate(
+            is_favorited=Exists(
+                Favorite.objects.filter(user=user, recipe=OuterRef('pk'))
+            ),
+            is_in_shopping_cart=Exists(
+                ShoppingCart.objects.filter(user=user, recipe=OuterRef('pk'))
+            ),
+            author_is_subscribed=Exists(
+                Follow.objects.filter(user=user, following=OuterRef('author'))
+            )
+        )
+
+    def get_validators(self, request, *args, **kwargs):
+        """
+        Валидаторы ответа с рецептом.
+
+        ETag учитывает дату изменения рецепта, данные автора, версию
+        справочников и признаки избранного, списка покупок и подписки
+        текущего пользователя. Last-Modified не отдаётся: ни изменение
+        этих признаков, ни изменение данных автора не отражается в датах.
+        """
+        if self.action != 'retrieve':
+            return None, None
+        state = self.annotate_user_flags(
+            Recipe.objects.filter(pk=kwargs.get('pk'))
+        ).values_list(
+            'updated_at',
+            'author__username',
+            'author__email',
+            'author__first_name',
+            'author__last_name',
+            'is_favorited',
+            'is_in_shopping_cart',
+            'author_is_subscribed'
+        ).first()
+        if state is None:
+            return None, None
+        etag = hashlib.sha256(
+            repr((state, catalog_version().version)).encode()
+        ).hexdigest()
+        return etag, None
+
+    def list(self, request, *args, **kwargs):
+        """
+        Список рецептов.
+
+        Страницы для анонимных пользователей берутся из общего кэша,
+        который сбрасывается по тегам и авторам изменённых рецептов.
+        """
+        if request.user.is_authenticated or not recipe_list_cache.enabled:
+            return super().list(request, *args, **kwargs)
+        key = recipe_list_cache.key(request)
+        data = recipe_list_cache.get(key)
+        if data is not None:
+            return Response(data)
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            recipe_list_cache.set(key, response.data)
+        return response
 
     def get_serializer_class(self):
         if self.request.method in permissions.SAFE_METHODS:
             return RecipeDetailSerializer
         return RecipeCreateUpdateSerializer
 
-    def add_to(self, request, pk, serializer_class):
-        try:
-            recipe = Recipe.objects.get(id=pk)
-        except Recipe.DoesNotExist:
+    def add_to(self, request, pk, relation):
+        pk = int(pk)
+        result = relation.add(request.user.id, [pk])[pk]
+        if result == relations.NOT_FOUND:
             return Response(
                 {'errors': 'Такого рецепта не существует'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        data = {
-            'user': request.user.id,
-            'recipe': recipe.id
-        }
-        serializer = serializer_class(data=data, context={'request': request})
-        serializer.is_valid(raise_exception=True)
-        serializer.save()
+        if result != relations.CREATED:
+            raise exceptions.ValidationError('Рецепт уже был добавлен')
+        serializer = SpecialRecipeSerializer(
+            get_object_or_404(Recipe, pk=pk),
+            context={'request': request}
+        )
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
-    def delete_from(self, model, user, pk):
-        if not model.objects.filter(
-            user=user.id,
-            recipe=get_object_or_404(Recipe, id=pk)
-        ).exists():
-            raise exceptions.ValidationError(f'Рецепта нет в: {model}')
-        model.objects.filter(user=user, recipe__id=pk).delete()
+    def delete_from(self, request, pk, relation):
+        pk = int(pk)
+        result = relation.remove(request.user.id, [pk])[pk]
+        if result == relations.NOT_FOUND:
+            raise Http404
+        if result == relations.MISSING:
+            raise exceptions.ValidationError(
+                f'Рецепта нет в: {relation.model._meta.verbose_name_plural}'
+            )
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(
@@ -157,8 +363,8 @@ class RecipeViewSet(viewsets.ModelViewSet):
     )
     def favorite(self, request, pk):
         if request.method == 'POST':
-            return self.add_to(request, pk, FavoriteSerializer)
-        return self.delete_from(Favorite, request.user, pk)
+            return self.add_to(request, pk, relations.favorites)
+        return self.delete_from(request, pk, relations.favorites)
 
     @action(
         detail=True,
@@ -167,38 +373,139 @@ class RecipeViewSet(viewsets.ModelViewSet):
     )
     def shopping_cart(self, request, pk):
         if request.method == 'POST':
-            return self.add_to(request, pk, ShoppingCartSerializer)
-        return self.delete_from(ShoppingCart, request.user, pk)
-
-    def generate_shopping_list(self, user, ingredients):
-        shopping_list = ['Список покупок.']
-        for ingredient in ingredients:
-            shopping_list.append(
-                f'{ingredient["ingredient__name"]} '
-                f'({ingredient["ingredient__measurement_unit"]}): '
-                f'{ingredient["amount"]}'
-            )
-        result_list = '\n'.join(shopping_list)
-        filename = f'{user.username}_shopping_list.txt'
-        response = FileResponse(
-            result_list,
-            content_type='text/plain',
-            as_attachment=True,
-            filename=filename
-        )
-        return response
+            return self.add_to(request, pk, relations.shopping_cart)
+        return self.delete_from(request, pk, relations.shopping_cart)
+
+    @action(
+        detail=False,
+        methods=['POST', 'DELETE'],
+        url_path='favorite/batch',
+        permission_classes=[permissions.IsAuthenticated],
+        throttle_classes=[BatchRateThrottle]
+    )
+    def favorite_batch(self, request):
+        return self.batch_response(request, relations.favorites)
+
+    @action(
+        detail=False,
+        methods=['POST', 'DELETE'],
+        url_path='shopping_cart/batch',
+        permission_classes=[permissions.IsAuthenticated],
+        throttle_classes=[BatchRateThrottle]
+    )
+    def shopping_cart_batch(self, request):
+        return self.batch_response(request, relations.shopping_cart)
 
-    @action(detail=False,
-            methods=['get'],
-            permission_classes=[permissions.IsAuthenticated])
+    @action(
+        detail=False,
+        methods=['get'],
+        permission_classes=[permissions.IsAuthenticated],
+        renderer_classes=SHOPPING_LIST_RENDERERS
+    )
     def download_shopping_cart(self, request):
         user = request.user
-        if not request.user.shopping_cart_recipe.exists():
+        renderer = request.accepted_renderer
+        export_format = renderer.format
+        state = User.objects.filter(pk=user.pk).annotate(
+            version=Coalesce('shopping_list_version__version', 0),
+            has_items=Exists(
+                ShoppingListItem.objects.filter(user=OuterRef('pk'))
+            )
+        ).values('version', 'has_items').get()
+        if not state['has_items']:
             return Response(status=status.HTTP_400_BAD_REQUEST)
-        ingredients = RecipeIngredient.objects.filter(
-            recipe__shopping_cart_recipe__user=request.user
-        ).values(
-            'ingredient__name',
-            'ingredient__measurement_unit'
-        ).annotate(amount=Sum('amount')).order_by('ingredient__name')
-        return self.generate_shopping_list(user, ingredients)
+        # Версия читается до строк: если список изменится между запросами,
+        # клиент получит новое содержимое со старым ETag и при следующей
+        # выгрузке просто скачает список заново.
+        etag = shopping_list_etag(
+            state['version'], catalog_version().version, export_format
+        )
+        if_none_match = parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+        if etag in if_none_match or '*' in if_none_match:
+            response = HttpResponseNotModified()
+        else:
+            items = user.shopping_list.order_by(
+                'ingredient__name'
+            ).values_list(
+                'ingredient__name',
+                'ingredient__measurement_unit',
+                'amount'
+            )
+            response = StreamingHttpResponse(
+                EXPORTERS[export_format](items.iterator()),
+                content_type=(
+                    f'{renderer.media_type}; charset={renderer.charset}'
+                    if renderer.charset else renderer.media_type
+                )
+            )
+            response['Content-Disposition'] = (
+                'attachment; '
+                f'filename="{user.username}_shopping_list.{export_format}"'
+            )
+        response['ETag'] = etag
+        return response
+
+    @action(
+        detail=False,
+        methods=['post'],
+        url_path='import',
+        permission_classes=[permissions.IsAdminUser],
+        parser_classes=[NDJSONParser]
+    )
+    def import_recipes(self, request):
+        """
+        Принимает файл JSON Lines и ставит его импорт в очередь.
+
+        Файл и отчёт об ошибках хранятся вне MEDIA_ROOT. Повторная
+        загрузка того же файла продолжает незавершённую задачу с
+        сохранённой позиции. Ход импорта отдаётся по адресу задачи.
+        """
+        upload = request.data
+        if not hasattr(upload, 'read'):
+            raise exceptions.ValidationError('Передайте файл JSON Lines')
+        job = get_job(save_upload(upload))
+        schedule_import(job, settings.RECIPE_IMPORT_IMAGES_DIR)
+        serializer = RecipeImportSerializer(job, context={'request': request})
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+
+    @action(
+        detail=False,
+        methods=['get'],
+        url_path=r'import/(?P<job_id>\d+)',
+        permission_classes=[permissions.IsAdminUser]
+    )
+    def import_status(self, request, job_id):
+        job = get_object_or_404(RecipeImport, pk=job_id)
+        serializer = RecipeImportSerializer(job, context={'request': request})
+        return Response(serializer.data)
+
+    @action(
+        detail=False,
+        methods=['get'],
+        url_path=r'import/(?P<job_id>\d+)/report',
+        permission_classes=[permissions.IsAdminUser]
+    )
+    def import_report(self, request, job_id):
+        job = get_object_or_404(RecipeImport, pk=job_id)
+        try:
+            report = open(job.report, 'rb')
+        except FileNotFoundError:
+            raise Http404
+        return FileResponse(
+            report,
+            as_attachment=True,
+            filename=f'recipe_import_{job.pk}.errors.ndjson',
+            content_type='application/x-ndjson'
+        )
+
+
+class MetricsView(APIView):
+    """Метрики запросов в текстовом формате Prometheus."""
+
+    permission_classes = (IsMetricsScraper,)
+
+    def get(self, request):
+        return HttpResponse(
+            metrics_registry.export(),
+            content_type='text/plain; version=0.0.4; charset=utf-8'
+        )
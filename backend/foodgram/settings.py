@@ -35,6 +35,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.RequestMetricsMiddleware',
+    'api.middleware.SlowQueryLogMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -85,6 +87,45 @@ else:
     }
 
 
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
+# Кэш списка рецептов и кэш токенов сбрасываются через кэш Django, поэтому
+# по умолчанию они включены только с кэшем, общим для всех воркеров.
+SHARED_CACHE = CACHES['default']['BACKEND'] != (
+    'django.core.cache.backends.locmem.LocMemCache'
+)
+
+RECIPE_LIST_CACHE = os.getenv('RECIPE_LIST_CACHE', 'default')
+RECIPE_LIST_CACHE_TIMEOUT = int(
+    os.getenv('RECIPE_LIST_CACHE_TIMEOUT', 60 if SHARED_CACHE else 0)
+)
+
+TOKEN_CACHE_SIZE = int(
+    os.getenv('TOKEN_CACHE_SIZE', 1024 if SHARED_CACHE else 0)
+)
+TOKEN_CACHE_TTL = int(os.getenv('TOKEN_CACHE_TTL', 300))
+
+REQUEST_METRICS = os.getenv('REQUEST_METRICS', 'True').lower() == 'true'
+SERVER_TIMING = os.getenv('SERVER_TIMING', 'False').lower() == 'true'
+METRICS_CACHE = os.getenv('METRICS_CACHE', 'default')
+METRICS_FLUSH_INTERVAL = int(os.getenv('METRICS_FLUSH_INTERVAL', 10))
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+SLOW_QUERY_LOG = os.getenv('SLOW_QUERY_LOG', 'False').lower() == 'true'
+SLOW_QUERY_THRESHOLD = float(os.getenv('SLOW_QUERY_THRESHOLD', 0.1))
+SLOW_QUERY_EXPLAIN = (
+    os.getenv('SLOW_QUERY_EXPLAIN', 'False').lower() == 'true'
+)
+
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -105,9 +146,24 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.AllowAny',
     ],
 
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.ORJSONRenderer',
+        'api.renderers.MessagePackRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'api.parsers.ORJSONParser',
+        'api.parsers.MessagePackParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ],
+    'DEFAULT_THROTTLE_RATES': {
+        'batch': os.getenv('BATCH_THROTTLE_RATE', '30/min'),
+    },
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 6,
 }
@@ -132,6 +188,20 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+INGREDIENT_SEARCH_LIMIT = int(os.getenv('INGREDIENT_SEARCH_LIMIT', 50))
+INGREDIENT_INDEX_TTL = int(os.getenv('INGREDIENT_INDEX_TTL', 300))
+
+SHOPPING_LIST_PDF_FONT = os.getenv(
+    'SHOPPING_LIST_PDF_FONT',
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'
+)
+
+IMAGE_VARIANT_WORKERS = int(os.getenv('IMAGE_VARIANT_WORKERS', 2))
+
+RECIPE_IMPORT_IMAGES_DIR = os.getenv('RECIPE_IMPORT_IMAGES_DIR', MEDIA_ROOT)
+RECIPE_IMPORT_ROOT = os.getenv('RECIPE_IMPORT_ROOT', BASE_DIR / 'imports')
+RECIPE_IMPORT_WORKERS = int(os.getenv('RECIPE_IMPORT_WORKERS', 1))
+
 DJOSER = {
     'HIDE_USERS': False,
     'LOGIN_FIELDS': 'email',
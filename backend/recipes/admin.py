@@ -1,7 +1,8 @@
 from django.contrib import admin
 
-from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
-                            ShoppingCart, Tag)
+from recipes import shopping_list
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeImport,
+                            RecipeIngredient, ShoppingCart, Tag)
 from users.admin import BaseAdmin
 
 
@@ -95,9 +96,14 @@ class RecipeAdmin(BaseAdmin):
     search_fields = ('name', 'author__username', 'favorites_count')
     list_filter = ('name', 'author', 'tags')
 
-    @admin.display(description='Количество добавлений в избранное')
-    def favorites_count(self, obj):
-        return obj.favorites.count()
+    def save_related(self, request, form, formsets, change):
+        old_amounts = shopping_list.recipe_amounts([form.instance.id])
+        super().save_related(request, form, formsets, change)
+        shopping_list.recipe_ingredients_changed(
+            form.instance.id,
+            old_amounts,
+            shopping_list.recipe_amounts([form.instance.id])
+        )
 
     @admin.display(description='Отображение ингредиентов')
     def display_ingredients(self, recipe):
@@ -139,3 +145,24 @@ class FavoriteAdmin(BaseAdmin):
     list_display = ('user', 'recipe')
     list_filter = ('user', 'recipe')
     search_fields = ('user',)
+
+
+@admin.register(RecipeImport)
+class RecipeImportAdmin(BaseAdmin):
+    """
+    Класс административной панели для модели RecipeImport.
+
+    Атрибуты:
+        list_display (tuple): Поля, отображаемые в списке записей.
+        readonly_fields (tuple): Поля, недоступные для редактирования.
+    """
+
+    list_display = (
+        'source',
+        'imported',
+        'failed',
+        'position',
+        'created_at',
+        'finished_at'
+    )
+    readonly_fields = list_display + ('report',)
@@ -0,0 +1,40 @@
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from api.constants import CATALOG_VERSION_PK
+from recipes.ingredient_index import ingredient_index
+from recipes.list_cache import GLOBAL_GROUP, recipe_list_cache
+from recipes.models import CatalogVersion
+
+
+def catalog_version():
+    """
+    Возвращает текущую версию справочников тегов и ингредиентов.
+
+    Версия хранится в памяти процесса вместе с индексом ингредиентов
+    и перечитывается из базы данных при его перестроении; устаревание
+    индекса проверяется по общему кэшу или по строке CatalogVersion.
+    """
+    return ingredient_index.catalog
+
+
+def bump_catalog_version():
+    """
+    Увеличивает версию справочников после их изменения.
+
+    Кэш списка рецептов и индекс ингредиентов сбрасываются после
+    фиксации транзакции: иначе другой процесс мог бы заново заполнить их
+    по старым данным уже под новой версией.
+    """
+    recipe_list_cache.invalidate(GLOBAL_GROUP)
+    updated = CatalogVersion.objects.filter(pk=CATALOG_VERSION_PK).update(
+        version=F('version') + 1,
+        updated_at=timezone.now()
+    )
+    if not updated:
+        CatalogVersion.objects.get_or_create(
+            pk=CATALOG_VERSION_PK,
+            defaults={'version': 1}
+        )
+    transaction.on_commit(ingredient_index.invalidate)
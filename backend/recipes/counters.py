@@ -0,0 +1,62 @@
+from collections import defaultdict
+
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from recipes.models import Favorite, Recipe, ShoppingCart
+from users.models import Follow, User
+
+COUNTERS = (
+    (Recipe, 'favorites_count', Favorite, 'recipe'),
+    (Recipe, 'in_carts_count', ShoppingCart, 'recipe'),
+    (User, 'recipes_count', Recipe, 'author'),
+    (User, 'followers_count', Follow, 'following'),
+)
+
+
+def adjust_counter(model, field, deltas):
+    """
+    Атомарно изменяет счётчик field у объектов model.
+
+    deltas: словарь {pk: изменение}. Объекты с одинаковым изменением
+    обновляются одним запросом UPDATE ... SET field = field + delta.
+    """
+    by_delta = defaultdict(list)
+    for pk, delta in deltas.items():
+        if delta:
+            by_delta[delta].append(pk)
+    for delta, pks in by_delta.items():
+        model.objects.filter(pk__in=pks).update(
+            **{field: F(field) + delta}
+        )
+
+
+def actual_count(related_model, related_field):
+    """Подзапрос, считающий связанные объекты для внешнего запроса."""
+    return Coalesce(
+        Subquery(
+            related_model.objects.filter(
+                **{related_field: OuterRef('pk')}
+            ).order_by().values(related_field).annotate(
+                total=Count('pk')
+            ).values('total')
+        ),
+        0
+    )
+
+
+def recount(check_only=False):
+    """
+    Сверяет счётчики с фактическим количеством и исправляет расхождения.
+
+    Возвращает словарь {'Модель.поле': число объектов с расхождением}.
+    """
+    drift = {}
+    for model, field, related_model, related_field in COUNTERS:
+        actual = actual_count(related_model, related_field)
+        drift[f'{model.__name__}.{field}'] = model.objects.annotate(
+            actual=actual
+        ).exclude(**{field: F('actual')}).count()
+        if drift[f'{model.__name__}.{field}'] and not check_only:
+            model.objects.update(**{field: actual})
+    return drift
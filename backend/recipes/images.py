@@ -0,0 +1,152 @@
+import io
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import PurePosixPath
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from api.constants import (IMAGE_VARIANT_FORMATS, IMAGE_VARIANT_QUALITY,
+                           IMAGE_VARIANTS, IMAGE_VARIANTS_DIR)
+from recipes.list_cache import recipe_list_cache
+from recipes.models import Recipe
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def variant_paths(image_variants):
+    """Возвращает пути всех файлов из описания вариантов изображения."""
+    return [
+        variant[extension]
+        for variant in image_variants.get('variants', {}).values()
+        for extension, _ in IMAGE_VARIANT_FORMATS
+        if extension in variant
+    ]
+
+
+def variants_up_to_date(recipe):
+    """Проверяет, что варианты построены для текущего изображения."""
+    paths = variant_paths(recipe.image_variants)
+    return (
+        recipe.image_variants.get('source') == recipe.image.name
+        and bool(paths)
+        and all(default_storage.exists(path) for path in paths)
+    )
+
+
+def save_variant(image, path, image_format):
+    buffer = io.BytesIO()
+    if image_format == 'JPEG' and image.mode != 'RGB':
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        image = background
+    image.save(
+        buffer,
+        format=image_format,
+        quality=IMAGE_VARIANT_QUALITY,
+        optimize=True
+    )
+    if default_storage.exists(path):
+        default_storage.delete(path)
+    return default_storage.save(path, ContentFile(buffer.getvalue()))
+
+
+def generate_variants(image_field):
+    """
+    Строит уменьшенные копии изображения в форматах WebP и JPEG.
+
+    Копии сохраняются без метаданных под именами, производными от имени
+    исходного файла, поэтому повторный запуск перезаписывает те же файлы.
+    Изображение не увеличивается: если несколько размеров дают одну и ту
+    же ширину, сохраняется только копия наименьшего из них.
+    """
+    with image_field.open('rb') as file:
+        source = ImageOps.exif_transpose(Image.open(file))
+        source.load()
+    has_alpha = source.mode in ('RGBA', 'LA') or (
+        source.mode == 'P' and 'transparency' in source.info
+    )
+    source = source.convert('RGBA' if has_alpha else 'RGB')
+    stem = PurePosixPath(image_field.name).stem
+    variants = {}
+    widths = set()
+    for name, width in sorted(IMAGE_VARIANTS, key=lambda item: item[1]):
+        image = source.copy()
+        image.thumbnail((width, width * 10), Image.LANCZOS)
+        if image.width in widths:
+            continue
+        widths.add(image.width)
+        variant = {'width': image.width}
+        for extension, image_format in IMAGE_VARIANT_FORMATS:
+            variant[extension] = save_variant(
+                image,
+                f'{IMAGE_VARIANTS_DIR}{stem}_{name}.{extension}',
+                image_format
+            )
+        variants[name] = variant
+    return {'source': image_field.name, 'variants': variants}
+
+
+def process_recipe_image(recipe_id, force=False):
+    """
+    Строит варианты изображения рецепта и сохраняет их пути в рецепте.
+
+    Возвращает True, если варианты были построены. Если изображение
+    рецепта изменилось во время обработки, результат не сохраняется.
+    """
+    recipe = Recipe.objects.filter(pk=recipe_id).only(
+        'id', 'author_id', 'image', 'image_variants'
+    ).first()
+    if recipe is None or not recipe.image:
+        return False
+    if not force and variants_up_to_date(recipe):
+        return False
+    variants = generate_variants(recipe.image)
+    updated = Recipe.objects.filter(
+        pk=recipe_id,
+        image=recipe.image.name
+    ).update(image_variants=variants, updated_at=timezone.now())
+    old_paths = set(variant_paths(recipe.image_variants))
+    new_paths = set(variant_paths(variants))
+    stale = old_paths - new_paths if updated else new_paths - old_paths
+    for path in stale:
+        default_storage.delete(path)
+    if updated:
+        recipe_list_cache.invalidate_recipe(recipe)
+    return bool(updated)
+
+
+def _process_in_worker(recipe_id):
+    try:
+        process_recipe_image(recipe_id)
+    except Exception:
+        logger.exception(
+            'Не удалось обработать изображение рецепта %s', recipe_id
+        )
+    finally:
+        connections.close_all()
+
+
+def schedule_recipe_image(recipe_id):
+    """
+    Ставит обработку изображения рецепта в пул фоновых потоков.
+
+    При IMAGE_VARIANT_WORKERS = 0 изображение обрабатывается сразу.
+    """
+    global _executor
+    workers = settings.IMAGE_VARIANT_WORKERS
+    if not workers:
+        process_recipe_image(recipe_id)
+        return
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=workers,
+            thread_name_prefix='recipe-images'
+        )
+    _executor.submit(_process_in_worker, recipe_id)
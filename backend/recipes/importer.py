@@ -0,0 +1,452 @@
+import hashlib
+import json
+import logging
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db import connections, transaction
+from django.utils import timezone
+
+from api.constants import (MAX_COOKING_TIME, MAX_INGREDIENT_AMOUNT,
+                           MAX_LENGTH_NAME_AND_SLUG, MIN_COOKING_TIME,
+                           MIN_INGREDIENT_AMOUNT, RECIPE_IMPORT_BATCH_SIZE,
+                           RECIPE_IMPORT_CHUNK_SIZE)
+from recipes.counters import adjust_counter
+from recipes.images import schedule_recipe_image
+from recipes.ingredient_index import ingredient_index
+from recipes.list_cache import UNFILTERED_GROUP, recipe_list_cache
+from recipes.models import (Ingredient, Recipe, RecipeImport, RecipeIngredient,
+                            Tag)
+from recipes.search import update_search_index
+from users.models import User
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def read_lines(path, start):
+    """Возвращает пары (номер строки, строка) после строки start."""
+    with open(path, encoding='utf-8') as file:
+        for number, line in enumerate(file, start=1):
+            if number > start and line.strip():
+                yield number, line
+
+
+def trim_report(path, position):
+    """Оставляет в отчёте только ошибки уже зафиксированных строк."""
+    report = Path(path)
+    if not report.exists():
+        return
+    with open(report, encoding='utf-8') as file:
+        kept = [
+            line for line in file
+            if line.strip() and json.loads(line)['line'] <= position
+        ]
+    with open(report, 'w', encoding='utf-8') as file:
+        file.writelines(kept)
+
+
+def import_storage():
+    """Закрытое хранилище файлов импорта и отчётов вне MEDIA_ROOT."""
+    return FileSystemStorage(location=settings.RECIPE_IMPORT_ROOT)
+
+
+def save_upload(upload):
+    """
+    Сохраняет загруженный файл импорта в закрытое хранилище.
+
+    Имя файла — SHA-256 содержимого, поэтому повторная загрузка того же
+    файла после сбоя продолжает его незавершённую задачу. Возвращает
+    путь к файлу.
+    """
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: upload.read(RECIPE_IMPORT_CHUNK_SIZE), b''):
+        digest.update(chunk)
+    upload.seek(0)
+    storage = import_storage()
+    name = f'{digest.hexdigest()}.ndjson'
+    if not storage.exists(name):
+        name = storage.save(name, File(upload))
+    return storage.path(name)
+
+
+def get_job(source, report=None, restart=False):
+    """
+    Возвращает незавершённую задачу импорта файла или создаёт новую.
+
+    По умолчанию отчёт об ошибках пишется рядом с файлом импорта.
+    """
+    source = str(Path(source).resolve())
+    job = None
+    if not restart:
+        job = RecipeImport.objects.filter(
+            source=source,
+            finished_at__isnull=True
+        ).first()
+    if job is None:
+        job = RecipeImport.objects.create(
+            source=source,
+            report=report or f'{source}.errors.ndjson'
+        )
+    return job
+
+
+def is_positive_int(value, minimum, maximum):
+    return (
+        isinstance(value, int) and not isinstance(value, bool)
+        and minimum <= value <= maximum
+    )
+
+
+class RecipeImporter:
+    """
+    Пакетный импорт рецептов из файла JSON Lines.
+
+    Каждая строка файла описывает рецепт:
+    {"author": "email", "name": "...", "text": "...", "cooking_time": 10,
+    "image": "путь/к/файлу.jpg", "tags": ["slug"],
+    "ingredients": [{"id": 1, "amount": 100}]}. Ингредиент можно указать
+    парой name и measurement_unit вместо id, тег — его id вместо slug.
+    Путь к изображению отсчитывается от images_dir; файлы внутри
+    MEDIA_ROOT используются на месте, остальные копируются в хранилище.
+
+    Записи проверяются пачками, авторы и ингредиенты пачки загружаются
+    одним запросом каждый. Рецепты, теги и ингредиенты рецептов
+    вставляются через bulk_create, после чего обновляются счётчики
+    авторов, поисковый индекс и кэш списка рецептов. Записи с ошибками
+    пропускаются и попадают в отчёт в формате JSON Lines.
+    """
+
+    def __init__(
+        self,
+        job,
+        images_dir,
+        batch_size=RECIPE_IMPORT_BATCH_SIZE,
+        image_variants=True
+    ):
+        self.job = job
+        self.images_dir = Path(images_dir).resolve()
+        self.media_root = Path(settings.MEDIA_ROOT).resolve()
+        self.batch_size = batch_size
+        self.image_variants = image_variants
+        self.copied = []
+        self.tags = {}
+        for tag in Tag.objects.all():
+            self.tags[tag.slug] = tag.id
+            self.tags[tag.id] = tag.id
+
+    def run(self, progress=None):
+        """
+        Импортирует файл с позиции задачи; возвращает задачу.
+
+        Если задачу одновременно продолжил другой процесс, импорт
+        останавливается и задача остаётся незавершённой.
+        """
+        trim_report(self.job.report, self.job.position)
+        lines = read_lines(self.job.source, self.job.position)
+        with open(self.job.report, 'a', encoding='utf-8') as report:
+            while True:
+                chunk = list(islice(lines, self.batch_size))
+                if not chunk:
+                    break
+                if not self.import_chunk(chunk, report):
+                    self.job.refresh_from_db()
+                    return self.job
+                if progress is not None:
+                    progress(len(chunk))
+        ingredient_index.invalidate()
+        self.job.finished_at = timezone.now()
+        self.job.save(update_fields=['finished_at'])
+        return self.job
+
+    def import_chunk(self, chunk, report):
+        """Импортирует пачку строк; False, если задачу ведёт другой процесс."""
+        records, errors = self.validate(chunk)
+        self.copied = []
+        try:
+            with transaction.atomic():
+                locked = RecipeImport.objects.select_for_update()
+                position = locked.values_list('position', flat=True).get(
+                    pk=self.job.pk
+                )
+                if position != self.job.position:
+                    return False
+                recipes = self.insert(records)
+                self.job.position = chunk[-1][0]
+                self.job.imported += len(recipes)
+                self.job.failed += len(errors)
+                self.job.save(
+                    update_fields=['position', 'imported', 'failed']
+                )
+                for number, messages in errors:
+                    report.write(json.dumps(
+                        {'line': number, 'errors': messages},
+                        ensure_ascii=False
+                    ) + '\n')
+                report.flush()
+        except Exception:
+            # Рецепты пачки откатились, и скопированные для них
+            # изображения больше никому не нужны.
+            for name in self.copied:
+                default_storage.delete(name)
+            raise
+        if self.image_variants:
+            for recipe in recipes:
+                schedule_recipe_image(recipe.id)
+        return True
+
+    def parse(self, chunk):
+        parsed, errors = [], []
+        for number, line in chunk:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                errors.append((number, {'record': 'Некорректный JSON'}))
+                continue
+            if not isinstance(record, dict):
+                errors.append((number, {'record': 'Ожидается объект'}))
+                continue
+            parsed.append((number, record))
+        return parsed, errors
+
+    def lookups(self, records):
+        """Загружает авторов и ингредиенты пачки."""
+        emails, ids, names = set(), set(), set()
+        for _, record in records:
+            if isinstance(record.get('author'), str):
+                emails.add(record['author'])
+            for item in record.get('ingredients') or ():
+                if not isinstance(item, dict):
+                    continue
+                if isinstance(item.get('id'), int):
+                    ids.add(item['id'])
+                elif isinstance(item.get('name'), str):
+                    names.add(item['name'])
+        authors = dict(
+            User.objects.filter(email__in=emails).values_list('email', 'id')
+        )
+        ingredients = {
+            pk: pk for pk in Ingredient.objects.filter(
+                pk__in=ids
+            ).values_list('id', flat=True)
+        }
+        for pk, name, unit in Ingredient.objects.filter(
+            name__in=names
+        ).values_list('id', 'name', 'measurement_unit'):
+            ingredients[name, unit] = pk
+        return authors, ingredients
+
+    def validate(self, chunk):
+        parsed, errors = self.parse(chunk)
+        authors, ingredients = self.lookups(parsed)
+        records = []
+        for number, record in parsed:
+            messages = {}
+            cleaned = {
+                'line': number,
+                'author_id': authors.get(str(record.get('author'))),
+                'name': record.get('name'),
+                'text': record.get('text'),
+                'cooking_time': record.get('cooking_time'),
+                'image': self.resolve_image(record.get('image')),
+                'tags': self.clean_tags(record.get('tags'), messages),
+                'ingredients': self.clean_ingredients(
+                    record.get('ingredients'), ingredients, messages
+                ),
+            }
+            if cleaned['author_id'] is None:
+                messages['author'] = 'Автор не найден'
+            name = cleaned['name']
+            if (
+                not isinstance(name, str) or not name.strip()
+                or len(name) > MAX_LENGTH_NAME_AND_SLUG
+            ):
+                messages['name'] = (
+                    'Название обязательно, не длиннее '
+                    f'{MAX_LENGTH_NAME_AND_SLUG} символов'
+                )
+            if not isinstance(cleaned['text'], str) or not cleaned['text']:
+                messages['text'] = 'Текст обязателен'
+            if not is_positive_int(
+                cleaned['cooking_time'], MIN_COOKING_TIME, MAX_COOKING_TIME
+            ):
+                messages['cooking_time'] = (
+                    f'Время приготовления от {MIN_COOKING_TIME} '
+                    f'до {MAX_COOKING_TIME} м.'
+                )
+            if cleaned['image'] is None:
+                messages['image'] = 'Изображение не найдено'
+            if messages:
+                errors.append((number, messages))
+            else:
+                records.append(cleaned)
+        return records, errors
+
+    def clean_tags(self, tags, messages):
+        if not isinstance(tags, list) or not tags:
+            messages['tags'] = 'Необходимо указать хотя бы один тег'
+            return []
+        ids = [
+            self.tags.get(tag) for tag in tags
+            if isinstance(tag, (int, str))
+        ]
+        if len(ids) != len(tags) or None in ids:
+            messages['tags'] = 'Теги не найдены'
+        elif len(set(ids)) != len(ids):
+            messages['tags'] = 'Теги не должны повторяться'
+        return ids
+
+    def clean_ingredients(self, items, ingredients, messages):
+        if not isinstance(items, list) or not items:
+            messages['ingredients'] = (
+                'Необходимо указать хотя бы один ингредиент'
+            )
+            return []
+        cleaned = []
+        for item in items:
+            if not isinstance(item, dict):
+                messages['ingredients'] = 'Ингредиент должен быть объектом'
+                return []
+            key = item.get('id')
+            if not isinstance(key, int):
+                key = (
+                    str(item.get('name')),
+                    str(item.get('measurement_unit'))
+                )
+            pk = ingredients.get(key)
+            if pk is None:
+                messages['ingredients'] = 'Ингредиенты не найдены'
+                return []
+            if not is_positive_int(
+                item.get('amount'),
+                MIN_INGREDIENT_AMOUNT,
+                MAX_INGREDIENT_AMOUNT
+            ):
+                messages['ingredients'] = (
+                    f'Количество от {MIN_INGREDIENT_AMOUNT} '
+                    f'до {MAX_INGREDIENT_AMOUNT}'
+                )
+                return []
+            cleaned.append((pk, item['amount']))
+        if len({pk for pk, _ in cleaned}) != len(cleaned):
+            messages['ingredients'] = 'Ингредиенты не должны повторяться'
+        return cleaned
+
+    def resolve_image(self, image):
+        """Путь файла изображения или None, если его нет."""
+        if not isinstance(image, str) or not image:
+            return None
+        path = (self.images_dir / image).resolve()
+        if self.images_dir not in path.parents or not path.is_file():
+            return None
+        return path
+
+    def store_image(self, path, line):
+        """
+        Имя файла в хранилище; файлы вне MEDIA_ROOT копируются.
+
+        Имя копии строится из задачи и номера строки, поэтому импорт,
+        продолженный после сбоя, использует уже скопированный файл. Новые
+        копии запоминаются в self.copied, чтобы удалить их при откате
+        пачки.
+        """
+        if self.media_root in path.parents:
+            return path.relative_to(self.media_root).as_posix()
+        name = (
+            f'{Recipe.image.field.upload_to}import_{self.job.pk}_{line}'
+            f'{path.suffix.lower()}'
+        )
+        if default_storage.exists(name):
+            return name
+        with open(path, 'rb') as file:
+            name = default_storage.save(name, File(file))
+        self.copied.append(name)
+        return name
+
+    def insert(self, records):
+        if not records:
+            return []
+        recipes = [
+            Recipe(
+                author_id=record['author_id'],
+                name=record['name'],
+                text=record['text'],
+                cooking_time=record['cooking_time'],
+                image=self.store_image(record['image'], record['line'])
+            ) for record in records
+        ]
+        Recipe.objects.bulk_create(recipes)
+        connection = connections[Recipe.objects.db]
+        if not connection.features.can_return_rows_from_bulk_insert:
+            # Без RETURNING ключи выбираются сразу после вставки: запись
+            # в SQLite блокирует всю базу до конца транзакции, поэтому
+            # последние ключи принадлежат только что вставленным рецептам.
+            pks = Recipe.objects.order_by('-pk').values_list(
+                'pk', flat=True
+            )[:len(recipes)]
+            for recipe, pk in zip(recipes, reversed(list(pks))):
+                recipe.pk = pk
+        Recipe.tags.through.objects.bulk_create(
+            Recipe.tags.through(recipe_id=recipe.pk, tag_id=tag_id)
+            for recipe, record in zip(recipes, records)
+            for tag_id in record['tags']
+        )
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(
+                recipe_id=recipe.pk,
+                ingredient_id=ingredient_id,
+                amount=amount
+            )
+            for recipe, record in zip(recipes, records)
+            for ingredient_id, amount in record['ingredients']
+        )
+        authors = Counter(recipe.author_id for recipe in recipes)
+        adjust_counter(User, 'recipes_count', authors)
+        update_search_index(recipes)
+        slugs = Tag.objects.filter(
+            pk__in={tag_id for record in records for tag_id in record['tags']}
+        ).values_list('slug', flat=True)
+        recipe_list_cache.invalidate(
+            UNFILTERED_GROUP,
+            *(f'author:{author_id}' for author_id in authors),
+            *(f'tag:{slug}' for slug in slugs)
+        )
+        return recipes
+
+
+def _run_in_worker(job_id, images_dir):
+    try:
+        RecipeImporter(RecipeImport.objects.get(pk=job_id), images_dir).run()
+    except Exception:
+        logger.exception('Не удалось выполнить импорт рецептов %s', job_id)
+    finally:
+        connections.close_all()
+
+
+def schedule_import(job, images_dir):
+    """
+    Ставит задачу импорта в пул фоновых потоков.
+
+    При RECIPE_IMPORT_WORKERS = 0 задача только сохраняется и выполняется
+    командой import_recipes --job. Возвращает True, если задача
+    поставлена в пул.
+    """
+    global _executor
+    workers = settings.RECIPE_IMPORT_WORKERS
+    if not workers:
+        return False
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=workers,
+            thread_name_prefix='recipe-import'
+        )
+    transaction.on_commit(
+        lambda: _executor.submit(_run_in_worker, job.pk, images_dir)
+    )
+    return True
@@ -0,0 +1,196 @@
+import hashlib
+import heapq
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+
+from api.checks import is_shared_cache
+from api.constants import (CATALOG_VERSION_PK, INGREDIENT_INDEX_TTL,
+                           INGREDIENT_INDEX_VERSION_KEY,
+                           INGREDIENT_SEARCH_LIMIT)
+from recipes.models import CatalogVersion, Ingredient
+
+
+def normalize(value):
+    """Приводит строку к виду для поиска: регистр и ё/е не различаются."""
+    return value.casefold().replace('ё', 'е')
+
+
+class IngredientIndex:
+    """
+    Процессный индекс каталога ингредиентов для автодополнения.
+
+    Ингредиенты хранятся в массиве, отсортированном по нормализованному
+    названию, поэтому поиск по префиксу сводится к двум бинарным поискам
+    и не обращается к базе данных. Запись ингредиента или импорт каталога
+    увеличивают версию каталога, и каждый процесс перестраивает свой индекс
+    при следующем поиске. Версия хранится в кэше Django, если он общий для
+    процессов, а иначе берётся из строки CatalogVersion; в HTTP-запросе
+    она проверяется один раз.
+
+    Популярность ингредиента — число рецептов с ним — запоминается при
+    построении и от записи рецептов не сбрасывается, поэтому индекс
+    перестраивается ещё и раз в INGREDIENT_INDEX_TTL секунд: порядок
+    подсказок отстаёт от рецептов не больше чем на это время.
+
+    Вместе с индексом в памяти хранится версия справочников (catalog),
+    чтобы валидаторы ответов получали её вместе с проверкой версии
+    индекса, и отпечаток порядка ингредиентов (digest) для ETag подсказок.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._built = None
+        self._keys = []
+        self._entries = []
+        self._catalog = None
+        self._digest = None
+        # None вне HTTP-запроса: тогда версия проверяется при каждом обращении.
+        self._checked = ContextVar('ingredient_index_checked', default=None)
+
+    def start_request(self):
+        self._checked.set(False)
+
+    def finish_request(self):
+        self._checked.set(None)
+
+    def build(self):
+        """Загружает каталог из базы данных и строит индекс."""
+        # Версия читается до строк каталога: запись между запросами
+        # приведёт к повторному построению, а не к устаревшему индексу.
+        catalog, _ = CatalogVersion.objects.get_or_create(
+            pk=CATALOG_VERSION_PK
+        )
+        version = (
+            self.current_version() if is_shared_cache('default')
+            else catalog.version
+        )
+        rows = Ingredient.objects.annotate(
+            popularity=Count('recipe_ingredients')
+        ).values_list('id', 'name', 'measurement_unit', 'popularity')
+        # Названия с разными единицами измерения после нормализации
+        # совпадают, поэтому порядок задаётся ключом, а не самими
+        # кортежами: объекты Ingredient между собой не сравниваются.
+        entries = sorted(
+            (
+                (
+                    normalize(name),
+                    popularity,
+                    Ingredient(id=pk, name=name, measurement_unit=unit)
+                ) for pk, name, unit, popularity in rows
+            ),
+            key=lambda entry: (entry[0], entry[2].pk)
+        )
+        digest = hashlib.sha256(
+            repr([(entry[2].pk, entry[1]) for entry in entries]).encode()
+        ).hexdigest()
+        with self._lock:
+            self._keys = [entry[0] for entry in entries]
+            self._entries = entries
+            self._catalog = catalog
+            self._digest = digest
+            self._version = version
+            self._built = time.monotonic()
+
+    def refresh(self):
+        """Перестраивает индекс, если он устарел."""
+        checked = self._checked.get()
+        if checked:
+            return
+        if self.is_stale():
+            self.build()
+        if checked is not None:
+            self._checked.set(True)
+
+    @property
+    def catalog(self):
+        """Версия справочников на момент построения индекса."""
+        self.refresh()
+        return self._catalog
+
+    @property
+    def digest(self):
+        """Отпечаток порядка ингредиентов с учётом популярности."""
+        self.refresh()
+        return self._digest
+
+    def is_stale(self):
+        ttl = getattr(settings, 'INGREDIENT_INDEX_TTL', INGREDIENT_INDEX_TTL)
+        return (
+            self._built is None
+            or self._version != self.current_version()
+            or time.monotonic() - self._built >= ttl
+        )
+
+    @staticmethod
+    def current_version():
+        """
+        Версия индекса.
+
+        В общем кэше это отдельный счётчик: если ключ вытеснен или кэш
+        очищен, версия начинается с текущего времени в наносекундах, чтобы
+        не совпасть с прежними версиями, уже запомненными процессами. В
+        кэше отдельного процесса запись в другом воркере его не увеличит,
+        поэтому версией служит CatalogVersion.version из базы данных.
+        """
+        if is_shared_cache('default'):
+            return cache.get_or_set(
+                INGREDIENT_INDEX_VERSION_KEY, time.time_ns, None
+            )
+        return CatalogVersion.objects.filter(
+            pk=CATALOG_VERSION_PK
+        ).values_list('version', flat=True).first()
+
+    def invalidate(self):
+        """
+        Помечает индекс устаревшим во всех процессах.
+
+        Без общего кэша другие процессы узнают об изменении каталога по
+        CatalogVersion, а об изменении популярности — по истечении
+        INGREDIENT_INDEX_TTL.
+        """
+        with self._lock:
+            self._built = None
+        if self._checked.get():
+            self._checked.set(False)
+        if not is_shared_cache('default'):
+            return
+        try:
+            cache.incr(INGREDIENT_INDEX_VERSION_KEY)
+        except ValueError:
+            cache.set(INGREDIENT_INDEX_VERSION_KEY, time.time_ns(), None)
+
+    def search(self, prefix, limit=None):
+        """
+        Возвращает ингредиенты, название которых начинается с prefix.
+
+        Сначала идут точные совпадения, затем остальные по убыванию
+        количества рецептов с ингредиентом.
+        """
+        self.refresh()
+        if limit is None:
+            limit = getattr(
+                settings, 'INGREDIENT_SEARCH_LIMIT', INGREDIENT_SEARCH_LIMIT
+            )
+        prefix = normalize(prefix)
+        with self._lock:
+            keys, entries = self._keys, self._entries
+        start = bisect_left(keys, prefix)
+        end = bisect_left(keys, prefix + '\U0010ffff', start)
+        matches = heapq.nsmallest(
+            limit,
+            entries[start:end],
+            key=lambda entry: (
+                entry[0] != prefix, -entry[1], entry[0], entry[2].pk
+            )
+        )
+        return [entry[2] for entry in matches]
+
+
+ingredient_index = IngredientIndex()
@@ -0,0 +1,149 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from api.checks import is_shared_cache
+from api.constants import (RECIPE_LIST_CACHE_PREFIX, RECIPE_LIST_CACHE_STATS,
+                           RECIPE_LIST_CACHE_TIMEOUT)
+
+GLOBAL_GROUP = 'global'
+UNFILTERED_GROUP = 'all'
+RANKING_GROUP = 'ranking'
+
+
+class RecipeListCache:
+    """
+    Общий кэш страниц списка рецептов для анонимных пользователей.
+
+    Ключ страницы строится из нормализованной строки запроса и поколений
+    групп, от которых зависит её содержимое: тегов и автора из фильтра,
+    либо всего списка, если фильтров нет. Изменение рецепта увеличивает
+    поколения только его тегов и автора, поэтому остальные страницы
+    остаются в кэше. Поколения и статистика хранятся в том же кэше Django,
+    поэтому он должен быть общим для всех процессов: в кэше отдельного
+    процесса (LocMemCache) запись в одном воркере не сбросила бы страницы
+    других, и кэширование отключается (проверка api.W001).
+    """
+
+    @property
+    def cache(self):
+        return caches[getattr(settings, 'RECIPE_LIST_CACHE', 'default')]
+
+    @property
+    def timeout(self):
+        return getattr(
+            settings, 'RECIPE_LIST_CACHE_TIMEOUT', RECIPE_LIST_CACHE_TIMEOUT
+        )
+
+    @property
+    def enabled(self):
+        return self.timeout > 0 and is_shared_cache(
+            getattr(settings, 'RECIPE_LIST_CACHE', 'default')
+        )
+
+    @staticmethod
+    def normalize(params):
+        """Строка запроса с отсортированными параметрами и значениями."""
+        return '&'.join(
+            f'{name}={value}'
+            for name in sorted(params)
+            for value in sorted(set(params.getlist(name)))
+            if value
+        )
+
+    @staticmethod
+    def groups(params):
+        """Группы инвалидации, от которых зависит страница."""
+        groups = [GLOBAL_GROUP]
+        tags = [tag for tag in params.getlist('tags') if tag]
+        author = params.get('author')
+        if tags or author:
+            groups.extend(f'tag:{tag}' for tag in sorted(set(tags)))
+            if author:
+                groups.append(f'author:{author}')
+        else:
+            groups.append(UNFILTERED_GROUP)
+        if params.get('ordering'):
+            groups.append(RANKING_GROUP)
+        return groups
+
+    def generations(self, groups):
+        keys = {f'{RECIPE_LIST_CACHE_PREFIX}:gen:{group}': group
+                for group in groups}
+        values = self.cache.get_many(keys)
+        for key in keys.keys() - values.keys():
+            # Начальное поколение берётся из времени, чтобы после вытеснения
+            # счётчика из кэша не вернуть к жизни старые страницы.
+            self.cache.add(key, time.time_ns(), None)
+            values[key] = self.cache.get(key)
+        return [f'{keys[key]}={values[key]}' for key in sorted(keys)]
+
+    def key(self, request):
+        params = request.query_params
+        source = '|'.join([
+            request.get_host(),
+            self.normalize(params),
+            *self.generations(self.groups(params))
+        ])
+        digest = hashlib.sha256(source.encode()).hexdigest()
+        return f'{RECIPE_LIST_CACHE_PREFIX}:page:{digest}'
+
+    def get(self, key):
+        data = self.cache.get(key)
+        self.count('hits' if data is not None else 'misses')
+        return data
+
+    def set(self, key, data):
+        self.cache.set(key, data, self.timeout)
+
+    def invalidate(self, *groups):
+        """Увеличивает поколения групп после фиксации транзакции."""
+        groups = set(groups)
+        if groups:
+            transaction.on_commit(lambda: self.bump(groups))
+
+    def invalidate_recipe(self, recipe, tags=None):
+        """Сбрасывает страницы, на которых может быть рецепт."""
+        if tags is None:
+            tags = recipe.tags.values_list('slug', flat=True)
+        self.invalidate(
+            UNFILTERED_GROUP,
+            f'author:{recipe.author_id}',
+            *(f'tag:{tag}' for tag in tags)
+        )
+
+    def bump(self, groups):
+        for group in groups:
+            key = f'{RECIPE_LIST_CACHE_PREFIX}:gen:{group}'
+            try:
+                self.cache.incr(key)
+            except ValueError:
+                self.cache.set(key, time.time_ns(), None)
+        self.count('evictions', len(groups))
+
+    def count(self, name, delta=1):
+        key = f'{RECIPE_LIST_CACHE_PREFIX}:stats:{name}'
+        try:
+            self.cache.incr(key, delta)
+        except ValueError:
+            self.cache.add(key, 0, None)
+            self.cache.incr(key, delta)
+
+    def stats(self):
+        """Количество попаданий, промахов и сброшенных групп."""
+        keys = {f'{RECIPE_LIST_CACHE_PREFIX}:stats:{name}': name
+                for name in RECIPE_LIST_CACHE_STATS}
+        values = self.cache.get_many(keys)
+        return {name: values.get(key, 0) for key, name in keys.items()}
+
+    def reset_stats(self):
+        self.cache.delete_many([
+            f'{RECIPE_LIST_CACHE_PREFIX}:stats:{name}'
+            for name in RECIPE_LIST_CACHE_STATS
+        ])
+
+
+recipe_list_cache = RecipeListCache()
@@ -0,0 +1,137 @@
+import csv
+import json
+from pathlib import Path
+
+from django.db import connections, transaction
+
+
+def read_rows(path, fields):
+    """
+    Построчно читает каталог из CSV, JSON или JSON Lines.
+
+    CSV и JSON Lines читаются потоком; файл JSON должен содержать массив
+    объектов с ключами fields и загружается целиком.
+    """
+    suffix = Path(path).suffix.lower()
+    with open(path, encoding='utf-8') as file:
+        if suffix == '.json':
+            for item in json.load(file):
+                yield tuple(item.get(field) for field in fields)
+        elif suffix in ('.jsonl', '.ndjson'):
+            for line in file:
+                if line.strip():
+                    item = json.loads(line)
+                    yield tuple(item.get(field) for field in fields)
+        else:
+            for row in csv.reader(file):
+                yield tuple(row[:len(fields)])
+
+
+class CSVStream:
+    """Файлоподобный объект, отдающий строки в формате CSV для COPY."""
+
+    def __init__(self, rows):
+        self.rows = iter(rows)
+        self.chunks = []
+        self.size = 0
+        self.writer = csv.writer(self)
+
+    def write(self, value):
+        self.chunks.append(value)
+        self.size += len(value)
+
+    def read(self, size=-1):
+        while size < 0 or self.size < size:
+            row = next(self.rows, None)
+            if row is None:
+                break
+            self.writer.writerow(row)
+        data = ''.join(self.chunks)
+        if size < 0 or size >= len(data):
+            self.chunks, self.size = [], 0
+            return data
+        self.chunks, self.size = [data[size:]], len(data) - size
+        return data[:size]
+
+
+class CatalogLoader:
+    """
+    Пакетная загрузка справочника в таблицу модели.
+
+    В PostgreSQL строки передаются командой COPY во временную таблицу
+    и переносятся в таблицу модели одним INSERT ... ON CONFLICT DO NOTHING.
+    В остальных СУБД строки вставляются пакетами через
+    bulk_create(ignore_conflicts=True). В обоих случаях строки, нарушающие
+    ограничения уникальности модели, пропускаются.
+    """
+
+    def __init__(self, model, fields, batch_size=1000, use_copy=True):
+        self.model = model
+        self.fields = fields
+        self.batch_size = batch_size
+        self.use_copy = use_copy
+
+    def clean(self, rows):
+        """Отбрасывает строки с неполным набором значений."""
+        self.invalid = 0
+        for row in rows:
+            if len(row) == len(self.fields) and all(row):
+                yield tuple(str(value).strip() for value in row)
+            else:
+                self.invalid += 1
+
+    def load(self, rows):
+        """
+        Загружает строки и возвращает пару (добавлено, пропущено).
+        """
+        connection = connections[self.model.objects.db]
+        with transaction.atomic(using=connection.alias):
+            if self.use_copy and connection.vendor == 'postgresql':
+                total, inserted = self.load_copy(connection, self.clean(rows))
+            else:
+                total, inserted = self.load_batches(self.clean(rows))
+        return inserted, total - inserted + self.invalid
+
+    def load_batches(self, rows):
+        manager = self.model.objects
+        before = manager.count()
+        total = 0
+        batch = []
+        for row in rows:
+            batch.append(self.model(**dict(zip(self.fields, row))))
+            if len(batch) >= self.batch_size:
+                manager.bulk_create(batch, ignore_conflicts=True)
+                total += len(batch)
+                batch = []
+        manager.bulk_create(batch, ignore_conflicts=True)
+        total += len(batch)
+        return total, manager.count() - before
+
+    def load_copy(self, connection, rows):
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        staging = connection.ops.quote_name(
+            f'{self.model._meta.db_table}_staging'
+        )
+        columns = ', '.join(
+            connection.ops.quote_name(self.model._meta.get_field(field).column)
+            for field in self.fields
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE TEMPORARY TABLE {staging} ON COMMIT DROP AS '
+                f'SELECT {columns} FROM {table} WITH NO DATA'
+            )
+            cursor.copy_expert(
+                f'COPY {staging} ({columns}) FROM STDIN WITH (FORMAT csv)',
+                CSVStream(rows),
+                size=64 * 1024
+            )
+            cursor.execute(f'SELECT count(*) FROM {staging}')
+            total = cursor.fetchone()[0]
+            cursor.execute(
+                f'INSERT INTO {table} ({columns}) '
+                f'SELECT DISTINCT {columns} FROM {staging} '
+                'ON CONFLICT DO NOTHING'
+            )
+            inserted = cursor.rowcount
+        return total, inserted
@@ -0,0 +1,498 @@
+import json
+import random
+import re
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+from django.test import Client, override_settings
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from tqdm import tqdm
+
+from recipes import shopping_list
+from recipes.catalog import bump_catalog_version
+from recipes.counters import recount
+from recipes.ingredient_index import ingredient_index
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                            ShoppingCart, Tag)
+from recipes.search import update_search_index
+from users.models import Follow, User
+
+PREFIX = 'benchmark_api'
+SYLLABLES = (
+    'ба', 'ва', 'га', 'да', 'ка', 'ла', 'ма', 'на', 'па', 'ра', 'са', 'та',
+    'ко', 'ло', 'мо', 'но', 'по', 'ро', 'со', 'то', 'ки', 'ли', 'ми', 'ни',
+)
+SERVER_TIMING_QUERIES = re.compile(r'sql;[^,]*desc="(\d+) queries"')
+SCENARIOS = (
+    'recipes_list',
+    'recipes_list_filtered',
+    'recipe_detail',
+    'ingredients_autocomplete',
+    'subscriptions',
+    'favorite_toggle',
+    'shopping_cart_toggle',
+    'download_shopping_cart',
+)
+
+
+def percentile(values, percent):
+    """Перцентиль отсортированного списка методом ближайшего ранга."""
+    index = max(0, round(percent / 100 * len(values) + 0.5) - 1)
+    return values[min(index, len(values) - 1)]
+
+
+class InProcessClient:
+    """Запросы к приложению в том же процессе через тестовый клиент."""
+
+    def __init__(self, token):
+        headers = {'HTTP_AUTHORIZATION': f'Token {token}'} if token else {}
+        self.client = Client(**headers)
+
+    def request(self, method, path):
+        response = getattr(self.client, method.lower())(path)
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return response.status_code, response.get('Server-Timing', '')
+
+
+class HTTPClient:
+    """Запросы к запущенному серверу по HTTP."""
+
+    def __init__(self, token, url):
+        self.url = url.rstrip('/')
+        self.headers = {'Authorization': f'Token {token}'} if token else {}
+
+    def request(self, method, path):
+        request = urllib.request.Request(
+            self.url + path, method=method, headers=self.headers
+        )
+        try:
+            with urllib.request.urlopen(request) as response:
+                response.read()
+                return response.status, response.headers.get(
+                    'Server-Timing', ''
+                )
+        except urllib.error.HTTPError as error:
+            return error.code, error.headers.get('Server-Timing', '')
+
+
+class Command(BaseCommand):
+    """
+    Команда для нагрузочного тестирования основных эндпоинтов API.
+
+    Создаёт синтетический набор пользователей, рецептов, подписок,
+    избранного и корзин, затем параллельно выполняет запросы каждого
+    сценария в нескольких потоках и выводит перцентили задержки,
+    количество запросов в секунду и число SQL-запросов на запрос из
+    заголовка Server-Timing. Запросы выполняются в том же процессе или,
+    с флагом --url, по HTTP к серверу с той же базой данных и включённым
+    SERVER_TIMING. Результаты сохраняются в JSON; с флагом --baseline
+    команда сравнивает их с предыдущим запуском и завершается ошибкой
+    при регрессии. Созданные данные удаляются, если не указан --keep.
+
+    Attributes:
+        help (str): Справочное сообщение о назначении команды.
+    """
+
+    help = 'Нагрузочное тестирование основных эндпоинтов API'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--recipes', type=int, default=1000)
+        parser.add_argument('--ingredients', type=int, default=300)
+        parser.add_argument('--tags', type=int, default=6)
+        parser.add_argument('--recipe-ingredients', type=int, default=8)
+        parser.add_argument('--follows', type=int, default=10)
+        parser.add_argument('--favorites', type=int, default=20)
+        parser.add_argument('--cart', type=int, default=5)
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--warmup', type=int, default=10)
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--scenario',
+            action='append',
+            choices=SCENARIOS,
+            help='Запустить только указанные сценарии'
+        )
+        parser.add_argument(
+            '--url',
+            help='Адрес запущенного сервера, например http://127.0.0.1:8000'
+        )
+        parser.add_argument('--output', help='Файл для результатов в JSON')
+        parser.add_argument(
+            '--baseline',
+            help='Результаты предыдущего запуска для сравнения'
+        )
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=20,
+            help='Допустимое ухудшение p95 и RPS в процентах'
+        )
+        parser.add_argument(
+            '--keep',
+            action='store_true',
+            help='Не удалять созданные данные'
+        )
+        parser.add_argument(
+            '--cleanup',
+            action='store_true',
+            help='Только удалить данные, оставленные с --keep'
+        )
+
+    def handle(self, *args, **options):
+        if options['cleanup']:
+            self.cleanup()
+            self.stdout.write(self.style.SUCCESS('Данные бенчмарка удалены'))
+            return
+        if User.objects.filter(username__startswith=PREFIX).exists():
+            raise CommandError(
+                'В базе остались данные запуска с --keep, '
+                'удалите их флагом --cleanup'
+            )
+        rng = random.Random(options['seed'])
+        try:
+            started = time.perf_counter()
+            data = self.seed(rng, options)
+            self.stdout.write(
+                f'Данные созданы за {time.perf_counter() - started:.1f} с'
+            )
+            with override_settings(ALLOWED_HOSTS=['*'], SERVER_TIMING=True):
+                results = {
+                    name: self.run(name, rng, data, options)
+                    for name in options['scenario'] or SCENARIOS
+                }
+        finally:
+            if not options['keep']:
+                self.cleanup()
+        report = {
+            'created_at': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'mode': 'http' if options['url'] else 'in-process',
+            'options': {
+                name: options[name] for name in (
+                    'users', 'recipes', 'ingredients', 'tags',
+                    'recipe_ingredients', 'follows', 'favorites', 'cart',
+                    'requests', 'concurrency', 'seed'
+                )
+            },
+            'results': results,
+        }
+        self.print_results(results)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+        if options['baseline']:
+            self.compare(results, options['baseline'], options['tolerance'])
+
+    def seed(self, rng, options):
+        users = options['users']
+        with transaction.atomic():
+            User.objects.bulk_create(
+                User(
+                    email=f'{PREFIX}_{i}@example.com',
+                    username=f'{PREFIX}_{i}',
+                    first_name='Бенчмарк',
+                    last_name=str(i)
+                ) for i in range(users)
+            )
+            user_ids = list(User.objects.filter(
+                username__startswith=PREFIX
+            ).order_by('pk').values_list('pk', flat=True))
+            Tag.objects.bulk_create(
+                Tag(
+                    name=f'{PREFIX} {i}',
+                    color=f'#BE{i:04X}',
+                    slug=f'{PREFIX}_{i}'
+                ) for i in range(options['tags'])
+            )
+            tags = dict(Tag.objects.filter(
+                slug__startswith=PREFIX
+            ).values_list('pk', 'slug'))
+            tag_ids = list(tags)
+            Ingredient.objects.bulk_create(
+                Ingredient(
+                    name=''.join(rng.choices(SYLLABLES, k=3)) + f' {i}',
+                    measurement_unit=PREFIX
+                ) for i in range(options['ingredients'])
+            )
+            ingredients = dict(Ingredient.objects.filter(
+                measurement_unit=PREFIX
+            ).values_list('pk', 'name'))
+            ingredient_ids = list(ingredients)
+            for start in tqdm(
+                range(0, options['recipes'], 1000),
+                ncols=80,
+                ascii=True,
+                desc='Recipes'
+            ):
+                Recipe.objects.bulk_create(
+                    Recipe(
+                        author_id=rng.choice(user_ids),
+                        name=f'{PREFIX} {i}',
+                        text='Описание приготовления рецепта. ' * 10,
+                        cooking_time=rng.randint(1, 120),
+                        image='recipes/images/benchmark.png'
+                    ) for i in range(
+                        start, min(start + 1000, options['recipes'])
+                    )
+                )
+            recipes = list(Recipe.objects.filter(
+                author_id__in=user_ids
+            ).order_by('pk'))
+            recipe_ids = [recipe.pk for recipe in recipes]
+            Recipe.tags.through.objects.bulk_create(
+                Recipe.tags.through(recipe_id=recipe_id, tag_id=tag_id)
+                for recipe_id in recipe_ids
+                for tag_id in rng.sample(tag_ids, min(2, len(tag_ids)))
+            )
+            RecipeIngredient.objects.bulk_create(
+                (
+                    RecipeIngredient(
+                        recipe_id=recipe_id,
+                        ingredient_id=ingredient_id,
+                        amount=rng.randint(1, 500)
+                    )
+                    for recipe_id in recipe_ids
+                    for ingredient_id in rng.sample(
+                        ingredient_ids,
+                        min(options['recipe_ingredients'], len(ingredient_ids))
+                    )
+                ),
+                batch_size=5000
+            )
+            Follow.objects.bulk_create(
+                Follow(user_id=user_id, following_id=following_id)
+                for user_id in user_ids
+                for following_id in rng.sample(
+                    user_ids, min(options['follows'], users)
+                ) if following_id != user_id
+            )
+            favorites = {
+                user_id: rng.sample(
+                    recipe_ids, min(options['favorites'], len(recipe_ids) // 2)
+                ) for user_id in user_ids
+            }
+            carts = {
+                user_id: rng.sample(
+                    recipe_ids, min(options['cart'], len(recipe_ids) // 2)
+                ) for user_id in user_ids
+            }
+            for model, relations in (
+                (Favorite, favorites),
+                (ShoppingCart, carts),
+            ):
+                model.objects.bulk_create(
+                    (
+                        model(user_id=user_id, recipe_id=recipe_id)
+                        for user_id, chosen in relations.items()
+                        for recipe_id in chosen
+                    ),
+                    batch_size=5000
+                )
+            for user_id, chosen in carts.items():
+                shopping_list.add_recipes(user_id, chosen)
+            update_search_index(recipes)
+            recount()
+            bump_catalog_version()
+        ingredient_index.invalidate()
+        clients = [
+            {
+                'token': Token.objects.get_or_create(user_id=user_id)[0].key,
+                'favorite': set(favorites[user_id]),
+                'shopping_cart': set(carts[user_id]),
+            } for user_id in user_ids[:options['concurrency']]
+        ]
+        return {
+            'recipe_ids': recipe_ids,
+            'tags': list(tags.values()),
+            'ingredients': list(ingredients.values()),
+            'clients': clients,
+        }
+
+    def cleanup(self):
+        with transaction.atomic():
+            User.objects.filter(username__startswith=PREFIX).delete()
+            Tag.objects.filter(slug__startswith=PREFIX).delete()
+            Ingredient.objects.filter(measurement_unit=PREFIX).delete()
+        ingredient_index.invalidate()
+
+    def requests(self, name, rng, data, client):
+        """Запросы одной итерации сценария: (метод, путь, анонимный)."""
+        if name == 'recipes_list':
+            return [('GET', '/api/recipes/?limit=6', True)]
+        if name == 'recipes_list_filtered':
+            tags = '&'.join(
+                f'tags={tag}' for tag in rng.sample(data['tags'], 2)
+            )
+            return [('GET', f'/api/recipes/?limit=6&{tags}', False)]
+        if name == 'recipe_detail':
+            recipe_id = rng.choice(data['recipe_ids'])
+            return [('GET', f'/api/recipes/{recipe_id}/', False)]
+        if name == 'ingredients_autocomplete':
+            prefix = rng.choice(data['ingredients'])[:rng.randint(2, 4)]
+            return [(
+                'GET',
+                f'/api/ingredients/?name={urllib.request.quote(prefix)}',
+                True
+            )]
+        if name == 'subscriptions':
+            return [(
+                'GET',
+                '/api/users/subscriptions/?limit=6&recipes_limit=3',
+                False
+            )]
+        if name in ('favorite_toggle', 'shopping_cart_toggle'):
+            action = name.replace('_toggle', '')
+            recipe_id = rng.choice(data['recipe_ids'])
+            while recipe_id in client[action]:
+                recipe_id = rng.choice(data['recipe_ids'])
+            path = f'/api/recipes/{recipe_id}/{action}/'
+            return [('POST', path, False), ('DELETE', path, False)]
+        return [('GET', '/api/recipes/download_shopping_cart/', False)]
+
+    def run(self, name, rng, data, options):
+        concurrency = options['concurrency']
+        iterations = [
+            options['requests'] // concurrency
+            + (worker < options['requests'] % concurrency)
+            for worker in range(concurrency)
+        ]
+        seeds = [rng.random() for _ in range(concurrency)]
+        timings, queries, statuses = [], [], defaultdict(int)
+        lock = threading.Lock()
+        barrier = threading.Barrier(concurrency + 1)
+
+        def worker(index):
+            worker_rng = random.Random(seeds[index])
+            client = data['clients'][index % len(data['clients'])]
+            token = client['token']
+            clients = {
+                anonymous: (
+                    HTTPClient(None if anonymous else token, options['url'])
+                    if options['url'] else
+                    InProcessClient(None if anonymous else token)
+                ) for anonymous in (True, False)
+            }
+            try:
+                for _ in range(options['warmup']):
+                    for method, path, anonymous in self.requests(
+                        name, worker_rng, data, client
+                    ):
+                        clients[anonymous].request(method, path)
+            except Exception:
+                barrier.abort()
+                raise
+            try:
+                barrier.wait()
+                for _ in range(iterations[index]):
+                    for method, path, anonymous in self.requests(
+                        name, worker_rng, data, client
+                    ):
+                        started = time.perf_counter()
+                        try:
+                            status, timing = clients[anonymous].request(
+                                method, path
+                            )
+                        except Exception:
+                            status, timing = 'exception', ''
+                        elapsed = (time.perf_counter() - started) * 1000
+                        match = SERVER_TIMING_QUERIES.search(timing)
+                        with lock:
+                            timings.append(elapsed)
+                            statuses[status] += 1
+                            if match:
+                                queries.append(int(match.group(1)))
+            finally:
+                connections.close_all()
+
+        threads = [
+            threading.Thread(target=worker, args=(index,))
+            for index in range(concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        barrier.wait()
+        started = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        timings.sort()
+        errors = sum(
+            count for status, count in statuses.items()
+            if status == 'exception' or status >= 400
+        )
+        return {
+            'requests': len(timings),
+            'errors': errors,
+            'statuses': {str(status): count for status, count in sorted(
+                statuses.items(), key=lambda item: str(item[0])
+            )},
+            'rps': round(len(timings) / elapsed, 2),
+            'mean_ms': round(statistics.mean(timings), 3),
+            'p50_ms': round(percentile(timings, 50), 3),
+            'p95_ms': round(percentile(timings, 95), 3),
+            'p99_ms': round(percentile(timings, 99), 3),
+            'max_ms': round(timings[-1], 3),
+            'queries_mean': (
+                round(statistics.mean(queries), 2) if queries else None
+            ),
+            'queries_max': max(queries) if queries else None,
+        }
+
+    def print_results(self, results):
+        self.stdout.write(
+            f'{"сценарий":<26}{"RPS":>9}{"p50":>9}{"p95":>9}{"p99":>9}'
+            f'{"SQL":>7}{"ошибки":>8}'
+        )
+        for name, result in results.items():
+            queries = result['queries_mean']
+            self.stdout.write(
+                f'{name:<26}{result["rps"]:>9.1f}{result["p50_ms"]:>9.2f}'
+                f'{result["p95_ms"]:>9.2f}{result["p99_ms"]:>9.2f}'
+                f'{"-" if queries is None else queries:>7}'
+                f'{result["errors"]:>8}'
+            )
+
+    def compare(self, results, path, tolerance):
+        with open(path, encoding='utf-8') as file:
+            baseline = json.load(file)['results']
+        regressions = []
+        for name, result in results.items():
+            base = baseline.get(name)
+            if base is None:
+                continue
+            if result['p95_ms'] > base['p95_ms'] * (1 + tolerance / 100):
+                regressions.append(
+                    f'{name}: p95 {base["p95_ms"]} -> {result["p95_ms"]} мс'
+                )
+            if result['rps'] < base['rps'] * (1 - tolerance / 100):
+                regressions.append(
+                    f'{name}: RPS {base["rps"]} -> {result["rps"]}'
+                )
+            if (
+                result['queries_max'] is not None
+                and base['queries_max'] is not None
+                and result['queries_max'] > base['queries_max']
+            ):
+                regressions.append(
+                    f'{name}: SQL-запросов {base["queries_max"]} -> '
+                    f'{result["queries_max"]}'
+                )
+            if result['errors'] > base['errors']:
+                regressions.append(
+                    f'{name}: ошибок {base["errors"]} -> {result["errors"]}'
+                )
+        if regressions:
+            for regression in regressions:
+                self.stderr.write(regression)
+            raise CommandError(f'Регрессий: {len(regressions)}')
+        self.stdout.write(self.style.SUCCESS('Регрессий нет'))
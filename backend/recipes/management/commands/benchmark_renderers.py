@@ -0,0 +1,114 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import RequestFactory
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from api.renderers import MessagePackRenderer, ORJSONRenderer
+from api.serializers import RecipeDetailSerializer
+from api.views import RecipeViewSet
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+from users.models import User
+
+RENDERERS = (JSONRenderer, ORJSONRenderer, MessagePackRenderer)
+
+
+class Command(BaseCommand):
+    """
+    Команда для замера скорости рендереров API.
+
+    Создаёт синтетические рецепты с тегами и ингредиентами, сериализует
+    страницу списка рецептов так же, как представление, и замеряет время
+    её рендеринга каждым рендерером. Все созданные данные откатываются
+    по завершении.
+
+    Attributes:
+        help (str): Справочное сообщение о назначении команды.
+    """
+
+    help = 'Замер скорости рендеринга страницы рецептов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=100)
+        parser.add_argument('--ingredients', type=int, default=10)
+        parser.add_argument('--repeat', type=int, default=200)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.seed(options['recipes'], options['ingredients'])
+            page = self.page()
+            transaction.set_rollback(True)
+        baseline = None
+        for renderer_class in RENDERERS:
+            renderer = renderer_class()
+            content = renderer.render(page, renderer.media_type, {})
+            timings = []
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                renderer.render(page, renderer.media_type, {})
+                timings.append((time.perf_counter() - started) * 1000)
+            median = statistics.median(timings)
+            baseline = baseline or median
+            self.stdout.write(
+                f'{renderer_class.__name__}: '
+                f'медиана {median:.3f} мс, '
+                f'минимум {min(timings):.3f} мс, '
+                f'размер {len(content)} байт, '
+                f'ускорение x{baseline / median:.1f}'
+            )
+
+    def seed(self, recipes, ingredients):
+        author = User.objects.create(
+            email='benchmark_renderers@example.com',
+            username='benchmark_renderers',
+            first_name='Бенчмарк',
+            last_name='Рендереров'
+        )
+        Tag.objects.bulk_create(
+            Tag(name=f'Тег {i}', color=f'#0000{i:02d}', slug=f'bench-{i}')
+            for i in range(2)
+        )
+        Ingredient.objects.bulk_create(
+            Ingredient(name=f'Бенчмарк {i}', measurement_unit='г')
+            for i in range(ingredients)
+        )
+        tags = Tag.objects.filter(slug__startswith='bench-')
+        products = Ingredient.objects.filter(name__startswith='Бенчмарк ')
+        Recipe.objects.bulk_create(
+            Recipe(
+                author=author,
+                name=f'Рецепт {i}',
+                text='Описание приготовления рецепта. ' * 20,
+                cooking_time=i % 120 + 1
+            ) for i in range(recipes)
+        )
+        created = Recipe.objects.filter(author=author)
+        Recipe.tags.through.objects.bulk_create(
+            Recipe.tags.through(recipe=recipe, tag=tag)
+            for recipe in created for tag in tags
+        )
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(recipe=recipe, ingredient=product, amount=100)
+            for recipe in created for product in products
+        )
+
+    def page(self):
+        request = Request(RequestFactory().get('/api/recipes/'))
+        view = RecipeViewSet(request=request, action='list', format_kwarg=None)
+        queryset = view.get_queryset().filter(
+            author__username='benchmark_renderers'
+        )
+        results = RecipeDetailSerializer(
+            queryset,
+            many=True,
+            context={'request': request}
+        ).data
+        return {
+            'count': len(results),
+            'next': None,
+            'previous': None,
+            'results': results
+        }
@@ -0,0 +1,90 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from tqdm import tqdm
+
+from api.constants import INGREDIENT_DATA_ROUTE, PAGE_SIZE
+from recipes.models import Recipe
+from recipes.search import rebuild_search_index, search_recipes
+from users.models import User
+
+
+class Command(BaseCommand):
+    """
+    Команда для замера скорости поиска рецептов.
+
+    Создаёт заданное количество синтетических рецептов, названия и тексты
+    которых составлены из названий ингредиентов, выполняет поисковые
+    запросы и выводит перцентили задержки. Все созданные данные
+    откатываются по завершении.
+
+    Attributes:
+        help (str): Справочное сообщение о назначении команды.
+    """
+
+    help = 'Замер задержки поиска рецептов на синтетических данных'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=100_000)
+        parser.add_argument('--queries', type=int, default=200)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        with open(INGREDIENT_DATA_ROUTE, encoding='utf-8') as file:
+            words = sorted({
+                word for line in file
+                for word in line.split(',')[0].split() if len(word) > 3
+            })
+        with transaction.atomic():
+            self.seed(rng, words, options['recipes'], options['batch_size'])
+            timings = self.measure(rng, words, options['queries'])
+            transaction.set_rollback(True)
+        timings.sort()
+        quantiles = statistics.quantiles(timings, n=100)
+        self.stdout.write(
+            f'Рецептов: {options["recipes"]}, '
+            f'запросов: {options["queries"]}\n'
+            f'p50: {quantiles[49]:.2f} мс, '
+            f'p95: {quantiles[94]:.2f} мс, '
+            f'p99: {quantiles[98]:.2f} мс, '
+            f'max: {timings[-1]:.2f} мс'
+        )
+
+    def seed(self, rng, words, count, batch_size):
+        author = User.objects.create(
+            email='benchmark_search@example.com',
+            username='benchmark_search',
+            first_name='benchmark',
+            last_name='benchmark'
+        )
+        for start in tqdm(
+            range(0, count, batch_size),
+            ncols=80,
+            ascii=True,
+            desc='Seed'
+        ):
+            Recipe.objects.bulk_create(
+                Recipe(
+                    author=author,
+                    name=' '.join(rng.sample(words, 3)),
+                    text=' '.join(rng.choices(words, k=30)),
+                    cooking_time=rng.randint(1, 120)
+                ) for _ in range(min(batch_size, count - start))
+            )
+        rebuild_search_index()
+
+    def measure(self, rng, words, count):
+        timings = []
+        for _ in range(count):
+            query = rng.choice(words)
+            if rng.random() < 0.3:
+                query = query[:-1]
+            started = time.perf_counter()
+            list(search_recipes(Recipe.objects.all(), query)[:PAGE_SIZE])
+            timings.append((time.perf_counter() - started) * 1000)
+        return timings
@@ -0,0 +1,27 @@
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+QUERY_COUNTS_TESTS = 'api.tests.test_query_counts'
+
+
+class Command(BaseCommand):
+    """
+    Команда для проверки количества SQL-запросов эндпоинтов API.
+
+    Запускает тесты QUERY_COUNTS_TESTS в тестовой базе данных: количество
+    запросов каждого маршрута не должно зависеть от размера страницы и
+    превышать бюджет из файла QUERY_BUDGETS_ROUTE. Бюджеты записаны
+    отдельно для каждой базы данных и меняются в этом файле вручную
+    вместе с изменением, которое их превышает; без бюджетов для текущей
+    базы данных проверка пропускается.
+
+    Attributes:
+        help (str): Справочное сообщение о назначении команды.
+    """
+
+    help = 'Проверка количества SQL-запросов эндпоинтов API'
+
+    def handle(self, *args, **options):
+        call_command(
+            'test', QUERY_COUNTS_TESTS, verbosity=options['verbosity']
+        )
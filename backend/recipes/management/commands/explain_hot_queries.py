@@ -0,0 +1,225 @@
+import json
+import re
+from urllib.parse import urlencode
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from api.constants import EXPLAIN_SEQ_SCAN_ROWS
+from recipes.models import Ingredient, Recipe, Tag
+from users.models import User
+
+SQLITE_SCAN = re.compile(r'^SCAN (?:TABLE )?(\w+)(?: AS \w+)?$')
+SQL_LIMIT = re.compile(r'LIMIT (\d+)(?: OFFSET (\d+))?\s*$')
+SQL_PREVIEW_LENGTH = 160
+
+
+def walk(node, depth=0):
+    """Узлы плана PostgreSQL в формате JSON с глубиной вложенности."""
+    yield depth, node
+    for child in node.get('Plans', ()):
+        yield from walk(child, depth + 1)
+
+
+class Command(BaseCommand):
+    """
+    Команда для проверки планов выполнения запросов основных эндпоинтов.
+
+    Выполняет запросы к эндпоинтам из endpoints() от имени пользователя,
+    перехватывает их SQL-запросы SELECT и выводит план каждого: в
+    PostgreSQL — EXPLAIN (ANALYZE) с фактическим числом строк, в SQLite —
+    EXPLAIN QUERY PLAN, где для полного чтения берётся размер таблицы.
+    Последовательное чтение больше --rows строк считается нарушением, и
+    команда завершается ошибкой. Запускается на базе с данными, например
+    после generate_fake_data.
+
+    Attributes:
+        help (str): Справочное сообщение о назначении команды.
+    """
+
+    help = 'Планы выполнения запросов основных эндпоинтов API'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=EXPLAIN_SEQ_SCAN_ROWS,
+            help='Допустимое число строк последовательного чтения'
+        )
+        parser.add_argument(
+            '--user',
+            type=int,
+            help='id пользователя; по умолчанию пользователь с наибольшим '
+                 'числом подписок'
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor not in ('postgresql', 'sqlite'):
+            raise CommandError('Поддерживаются только PostgreSQL и SQLite')
+        explain = getattr(self, f'explain_{connection.vendor}')
+        self.table_rows = {}
+        user = self.get_user(options['user'])
+        client = APIClient()
+        client.force_authenticate(user)
+        violations = 0
+        with override_settings(ALLOWED_HOSTS=['*'], REQUEST_METRICS=False):
+            for path in self.endpoints():
+                self.stdout.write(self.style.MIGRATE_HEADING(path))
+                for sql in self.capture(client, path):
+                    self.stdout.write(f'  {sql[:SQL_PREVIEW_LENGTH]}')
+                    for depth, line, rows in explain(sql):
+                        line = f'    {"  " * depth}{line}'
+                        if rows is None or rows <= options['rows']:
+                            self.stdout.write(line)
+                            continue
+                        violations += 1
+                        self.stderr.write(
+                            f'{line} — последовательное чтение {rows} строк'
+                        )
+        if violations:
+            raise CommandError(
+                f'Последовательных чтений больше {options["rows"]} строк: '
+                f'{violations}'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            'Последовательных чтений больших таблиц нет'
+        ))
+
+    def get_user(self, pk):
+        if pk is not None:
+            try:
+                return User.objects.get(pk=pk)
+            except User.DoesNotExist:
+                raise CommandError(f'Пользователь {pk} не найден')
+        user = User.objects.annotate(
+            follows=Count('follower')
+        ).order_by('-follows', 'pk').first()
+        if user is None:
+            raise CommandError(
+                'Нет пользователей, создайте данные командой '
+                'generate_fake_data'
+            )
+        return user
+
+    def endpoints(self):
+        """Пути запросов основных эндпоинтов на данных из базы."""
+        recipe = Recipe.objects.order_by('-favorites_count', 'pk').first()
+        if recipe is None:
+            raise CommandError(
+                'Нет рецептов, создайте данные командой generate_fake_data'
+            )
+        author = User.objects.order_by('-recipes_count', 'pk').first()
+        tags = list(Tag.objects.values_list('slug', flat=True)[:2])
+        ingredient = Ingredient.objects.order_by('pk').first()
+        recipes = reverse('recipes-list')
+        for params in (
+            {},
+            {'author': author.pk},
+            {'tags': tags},
+            {'is_favorited': 1},
+            {'is_in_shopping_cart': 1},
+            {'ordering': '-favorites_count'},
+            {'cursor': ''},
+            {'search': recipe.name.split()[0]},
+        ):
+            yield f'{recipes}?{urlencode(params, doseq=True)}'
+        yield reverse('recipes-detail', kwargs={'pk': recipe.pk})
+        yield reverse('recipes-download-shopping-cart')
+        yield f'{reverse("users-subscriptions")}?recipes_limit=3'
+        yield reverse('users-list')
+        if ingredient is not None:
+            yield (
+                f'{reverse("ingredients-list")}?'
+                f'{urlencode({"name": ingredient.name[:2]})}'
+            )
+
+    def send(self, client, path):
+        response = client.get(path)
+        if response.streaming:
+            b''.join(response.streaming_content)
+        if response.status_code >= 400:
+            raise CommandError(f'{path}: {response.status_code}')
+
+    def capture(self, client, path):
+        """Запросы SELECT эндпоинта без повторов."""
+        # Прогрев: первый запрос заполняет кэши процесса.
+        self.send(client, path)
+        with CaptureQueriesContext(connection) as context:
+            self.send(client, path)
+        return list(dict.fromkeys(
+            query['sql'] for query in context.captured_queries
+            if query['sql'].lstrip().upper().startswith(('SELECT', 'WITH'))
+        ))
+
+    def explain_postgresql(self, sql):
+        """Узлы EXPLAIN (ANALYZE): (глубина, описание, строк прочитано)."""
+        prefix = connection.ops.explain_query_prefix(
+            format='json', analyze=True
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(f'{prefix} {sql}')
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        for depth, node in walk(plan[0]['Plan']):
+            line = node['Node Type']
+            if 'Relation Name' in node:
+                line += f' on {node["Relation Name"]}'
+            if 'Index Name' in node:
+                line += f' using {node["Index Name"]}'
+            line += (
+                f' (rows={node["Actual Rows"]} loops={node["Actual Loops"]}'
+                f' time={node["Actual Total Time"]:.3f} ms)'
+            )
+            rows = None
+            if node['Node Type'] == 'Seq Scan':
+                rows = (
+                    node['Actual Rows'] + node.get('Rows Removed by Filter', 0)
+                ) * node['Actual Loops']
+            yield depth, line, rows
+
+    def explain_sqlite(self, sql):
+        """
+        Узлы EXPLAIN QUERY PLAN: (глубина, описание, строк прочитано).
+
+        SQLite не сообщает число строк, поэтому для полного чтения берётся
+        размер таблицы. Если внешний цикл плана читает таблицу без
+        сортировки во временном B-дереве, чтение заканчивается на LIMIT.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(f'{connection.ops.explain_query_prefix()} {sql}')
+            plan = cursor.fetchall()
+        limit = SQL_LIMIT.search(sql)
+        if limit is not None and not any(
+            parent == 0 and detail.startswith('USE TEMP B-TREE')
+            for _, parent, _, detail in plan
+        ):
+            limit = int(limit.group(1)) + int(limit.group(2) or 0)
+        else:
+            limit = None
+        depths = {}
+        for index, (node_id, parent, _, detail) in enumerate(plan):
+            depth = depths[node_id] = depths.get(parent, -1) + 1
+            match = SQLITE_SCAN.match(detail)
+            rows = self.count_rows(match.group(1)) if match else None
+            if rows is not None and index == 0 and limit is not None:
+                rows = min(rows, limit)
+            yield depth, detail, rows
+
+    def count_rows(self, table):
+        """Число строк таблицы; None для подзапросов и псевдонимов."""
+        if table not in self.table_rows:
+            rows = None
+            if table in connection.introspection.table_names():
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        'SELECT COUNT(*) FROM '
+                        f'{connection.ops.quote_name(table)}'
+                    )
+                    rows = cursor.fetchone()[0]
+            self.table_rows[table] = rows
+        return self.table_rows[table]
@@ -0,0 +1,378 @@
+import io
+import multiprocessing
+import random
+import time
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+from PIL import Image
+from tqdm import tqdm
+
+from recipes.catalog import bump_catalog_version
+from recipes.counters import recount
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                            ShoppingCart, Tag)
+from recipes.search import rebuild_search_index
+from users.models import Follow, User
+
+STATE = {}
+
+
+class Zipf:
+    """
+    Выборка объектов с частотами по закону Ципфа.
+
+    Объект ранга k выбирается с вероятностью, пропорциональной 1 / k^s.
+    Ранги назначаются перемешанным объектам, поэтому популярность не
+    совпадает с порядком первичных ключей.
+    """
+
+    def __init__(self, population, exponent, rng):
+        self.population = list(population)
+        rng.shuffle(self.population)
+        weights = [
+            1 / rank ** exponent
+            for rank in range(1, len(self.population) + 1)
+        ]
+        self.cum_weights = list(accumulate(weights))
+        self.weights = [
+            weight / self.cum_weights[-1] for weight in weights
+        ] if weights else []
+
+    def sample(self, rng, k):
+        return rng.choices(
+            self.population, cum_weights=self.cum_weights, k=k
+        )
+
+    def unique(self, rng, k):
+        """
+        k разных объектов, самые популярные выбираются чаще.
+
+        Повторы заменяются равномерно выбранными объектами, чтобы при
+        большом k не ждать редких объектов из хвоста распределения.
+        """
+        k = min(k, len(self.population))
+        chosen = set(self.sample(rng, k))
+        while len(chosen) < k:
+            chosen.update(rng.sample(self.population, k - len(chosen)))
+        return chosen
+
+    def shares(self, total, limit, rng):
+        """Делит total между объектами по закону Ципфа, не больше limit."""
+        counts = []
+        for weight in self.weights:
+            expected = total * weight
+            count = int(expected) + (rng.random() < expected % 1)
+            counts.append(min(count, limit))
+        return counts
+
+
+def init_worker(state):
+    STATE.update(state)
+
+
+def bulk_create_with_pks(model, objects):
+    """bulk_create, после которого у объектов заполнены первичные ключи."""
+    model.objects.bulk_create(objects)
+    if not connection.features.can_return_rows_from_bulk_insert:
+        # Без RETURNING ключи выбираются сразу после вставки в той же
+        # транзакции: запись в SQLite блокирует всю базу, поэтому последние
+        # ключи принадлежат только что вставленным объектам.
+        pks = model.objects.order_by('-pk').values_list(
+            'pk', flat=True
+        )[:len(objects)]
+        for obj, pk in zip(objects, reversed(list(pks))):
+            obj.pk = pk
+    return objects
+
+
+def insert_rows(model, fields, rows):
+    """
+    Вставляет строки многострочными INSERT без создания объектов моделей.
+
+    Для таблиц связей это в несколько раз быстрее bulk_create, основное
+    время которого уходит на объекты моделей и компиляцию запроса.
+    """
+    fields = [model._meta.get_field(field) for field in fields]
+    quote = connection.ops.quote_name
+    columns = ', '.join(quote(field.column) for field in fields)
+    row = '(' + ', '.join(['%s'] * len(fields)) + ')'
+    size = connection.ops.bulk_batch_size(fields, rows)
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), size):
+            chunk = rows[start:start + size]
+            cursor.execute(
+                f'INSERT INTO {quote(model._meta.db_table)} ({columns}) '
+                f'VALUES {", ".join([row] * len(chunk))}',
+                [value for values in chunk for value in values]
+            )
+
+
+def insert_recipes(task):
+    start, end, seed = task
+    rng = random.Random(seed)
+    options = STATE['options']
+    authors = STATE['authors'].sample(rng, end - start)
+    with transaction.atomic():
+        recipes = bulk_create_with_pks(Recipe, [
+            Recipe(
+                author_id=author_id,
+                name=f'{options["prefix"]} рецепт {number}',
+                text=f'Описание приготовления рецепта {number}.',
+                cooking_time=rng.randint(1, 180),
+                image=STATE['image']
+            ) for number, author_id in zip(range(start, end), authors)
+        ])
+        insert_rows(Recipe.tags.through, ('recipe', 'tag'), [
+            (recipe.pk, tag_id)
+            for recipe in recipes
+            for tag_id in STATE['tags'].unique(
+                rng, rng.randint(1, options['tags_per_recipe'])
+            )
+        ])
+        insert_rows(RecipeIngredient, ('recipe', 'ingredient', 'amount'), [
+            (recipe.pk, ingredient_id, rng.randint(1, 1000))
+            for recipe in recipes
+            for ingredient_id in STATE['ingredients'].unique(
+                rng, rng.randint(1, options['ingredients_per_recipe'])
+            )
+        ])
+    connections.close_all()
+    return end - start
+
+
+def insert_relations(task):
+    model, field, start, counts, seed = task
+    rng = random.Random(seed)
+    targets = STATE['recipes'] if field == 'recipe' else STATE['authors']
+    users = STATE['users'].population[start:start + len(counts)]
+    insert_rows(model, ('user', field), [
+        (user_id, target_id)
+        for user_id, count in zip(users, counts)
+        for target_id in targets.unique(rng, count)
+        if target_id != user_id
+    ])
+    connections.close_all()
+    return sum(counts)
+
+
+class Command(BaseCommand):
+    """
+    Команда для генерации синтетических данных для нагрузочных тестов.
+
+    Создаёт пользователей, подписки, рецепты с тегами и ингредиентами,
+    избранное и корзины. Авторы рецептов, популярные рецепты и авторы,
+    активные пользователи, теги и ингредиенты выбираются по закону Ципфа
+    с показателем --zipf, поэтому распределения так же неравномерны, как
+    в реальных данных. Генерация детерминирована: одинаковые --seed и
+    параметры дают одинаковые данные. Записи вставляются пачками через
+    bulk_create, рецепты и связи можно генерировать в нескольких
+    процессах (--workers, кроме SQLite). Все рецепты используют одно
+    изображение-заглушку. После вставки пересчитываются счётчики,
+    списки покупок и поисковый индекс.
+
+    Attributes:
+        help (str): Справочное сообщение о назначении команды.
+    """
+
+    help = 'Генерация синтетических данных для нагрузочных тестов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=10_000)
+        parser.add_argument(
+            '--follows',
+            type=int,
+            default=10,
+            help='Среднее число подписок на пользователя'
+        )
+        parser.add_argument(
+            '--favorites',
+            type=int,
+            default=20,
+            help='Среднее число рецептов в избранном на пользователя'
+        )
+        parser.add_argument(
+            '--carts',
+            type=int,
+            default=3,
+            help='Среднее число рецептов в корзине на пользователя'
+        )
+        parser.add_argument(
+            '--tags',
+            type=int,
+            default=0,
+            help='Создать теги; по умолчанию используются существующие'
+        )
+        parser.add_argument(
+            '--ingredients',
+            type=int,
+            default=0,
+            help='Создать ингредиенты; по умолчанию используются существующие'
+        )
+        parser.add_argument('--tags-per-recipe', type=int, default=3)
+        parser.add_argument('--ingredients-per-recipe', type=int, default=10)
+        parser.add_argument('--zipf', type=float, default=1.1)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--workers', type=int, default=1)
+        parser.add_argument('--prefix', default='fake')
+
+    def handle(self, *args, **options):
+        if options['workers'] > 1 and connection.vendor == 'sqlite':
+            self.stdout.write(self.style.WARNING(
+                'SQLite допускает одного писателя, --workers игнорируется'
+            ))
+            options['workers'] = 1
+        if User.objects.filter(
+            username__startswith=f'{options["prefix"]}_'
+        ).exists():
+            raise CommandError(
+                f'Данные с префиксом {options["prefix"]} уже созданы, '
+                'укажите другой --prefix'
+            )
+        started = time.perf_counter()
+        rng = random.Random(options['seed'])
+        state = {
+            'options': options,
+            'image': self.placeholder_image(),
+            'tags': Zipf(self.tags(options), options['zipf'], rng),
+            'ingredients': Zipf(
+                self.ingredients(options), options['zipf'], rng
+            ),
+        }
+        if not state['tags'].population:
+            raise CommandError('Нет тегов, загрузите их или укажите --tags')
+        if not state['ingredients'].population:
+            raise CommandError(
+                'Нет ингредиентов, загрузите их или укажите --ingredients'
+            )
+        user_ids = self.users(options)
+        state['authors'] = Zipf(user_ids, options['zipf'], rng)
+        state['users'] = Zipf(user_ids, options['zipf'], rng)
+        batch_size = options['batch_size']
+        self.run(insert_recipes, 'Recipes', options['recipes'], state, [
+            (start, min(start + batch_size, options['recipes']),
+             rng.getrandbits(64))
+            for start in range(0, options['recipes'], batch_size)
+        ])
+        state['recipes'] = Zipf(
+            Recipe.objects.filter(
+                author_id__in=user_ids
+            ).order_by('pk').values_list('pk', flat=True).iterator(),
+            options['zipf'],
+            rng
+        )
+        for model, field, targets, per_user in (
+            (Follow, 'following', 'authors', options['follows']),
+            (Favorite, 'recipe', 'recipes', options['favorites']),
+            (ShoppingCart, 'recipe', 'recipes', options['carts']),
+        ):
+            # Активность пользователей тоже распределена по Ципфу; один
+            # пользователь связан не более чем с половиной объектов.
+            counts = state['users'].shares(
+                per_user * len(user_ids),
+                len(state[targets].population) // 2,
+                rng
+            )
+            step = max(1, batch_size // max(1, per_user))
+            self.run(insert_relations, model.__name__, sum(counts), state, [
+                (model, field, start, counts[start:start + step],
+                 rng.getrandbits(64))
+                for start in range(0, len(counts), step)
+            ])
+        self.stdout.write('Пересчёт счётчиков и списков покупок')
+        with transaction.atomic():
+            recount()
+        call_command('rebuild_shopping_lists', batch_size=batch_size)
+        rebuild_search_index()
+        bump_catalog_version()
+        self.stdout.write(self.style.SUCCESS(
+            f'Данные созданы за {time.perf_counter() - started:.0f} с'
+        ))
+
+    def run(self, function, desc, total, state, tasks):
+        progress = tqdm(
+            total=total,
+            ncols=80,
+            ascii=True,
+            desc=desc
+        )
+        workers = state['options']['workers']
+        if workers == 1:
+            init_worker(state)
+            for task in tasks:
+                progress.update(function(task))
+        else:
+            connections.close_all()
+            with multiprocessing.get_context('fork').Pool(
+                workers, initializer=init_worker, initargs=(state,)
+            ) as pool:
+                for count in pool.imap_unordered(function, tasks):
+                    progress.update(count)
+        progress.close()
+
+    def placeholder_image(self):
+        name = f'{Recipe.image.field.upload_to}fake_data.png'
+        if not default_storage.exists(name):
+            buffer = io.BytesIO()
+            Image.new('RGB', (600, 400), (230, 220, 200)).save(
+                buffer, 'PNG'
+            )
+            name = default_storage.save(name, ContentFile(buffer.getvalue()))
+        return name
+
+    def tags(self, options):
+        prefix = options['prefix']
+        Tag.objects.bulk_create(
+            Tag(
+                name=f'{prefix} тег {i}',
+                color=f'#F{i:05X}',
+                slug=f'{prefix}-{i}'
+            ) for i in range(options['tags'])
+        )
+        return list(Tag.objects.order_by('pk').values_list('pk', flat=True))
+
+    def ingredients(self, options):
+        prefix = options['prefix']
+        Ingredient.objects.bulk_create(
+            (
+                Ingredient(
+                    name=f'{prefix} ингредиент {i}',
+                    measurement_unit='г'
+                ) for i in range(options['ingredients'])
+            ),
+            batch_size=options['batch_size']
+        )
+        return list(
+            Ingredient.objects.order_by('pk').values_list('pk', flat=True)
+        )
+
+    def users(self, options):
+        prefix = options['prefix']
+        password = make_password(f'{prefix}-password')
+        for start in tqdm(
+            range(0, options['users'], options['batch_size']),
+            ncols=80,
+            ascii=True,
+            desc='Users'
+        ):
+            User.objects.bulk_create(
+                User(
+                    email=f'{prefix}_{i}@example.com',
+                    username=f'{prefix}_{i}',
+                    first_name='Имя',
+                    last_name=f'Фамилия {i}',
+                    password=password
+                ) for i in range(
+                    start, min(start + options['batch_size'], options['users'])
+                )
+            )
+        return list(User.objects.filter(
+            username__startswith=f'{prefix}_'
+        ).order_by('pk').values_list('pk', flat=True))
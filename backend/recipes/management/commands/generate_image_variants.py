@@ -0,0 +1,75 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from tqdm import tqdm
+
+from recipes.images import process_recipe_image
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    """
+    Команда для построения уменьшенных копий изображений рецептов.
+
+    Обрабатывает рецепты, у которых копии отсутствуют или построены для
+    другого изображения; с флагом --force перестраивает копии всех
+    рецептов.
+
+    Attributes:
+        help (str): Справочное сообщение о назначении команды.
+    """
+
+    help = 'Построение уменьшенных копий изображений рецептов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Перестроить копии даже если они актуальны'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Число потоков; 1 — обработка в текущем потоке'
+        )
+
+    def handle(self, *args, **options):
+        recipe_ids = list(
+            Recipe.objects.exclude(image='').exclude(
+                image__isnull=True
+            ).values_list('id', flat=True)
+        )
+        force = options['force']
+        if options['workers'] > 1:
+            def process(recipe_id):
+                try:
+                    return process_recipe_image(recipe_id, force=force)
+                finally:
+                    connections.close_all()
+
+            with ThreadPoolExecutor(
+                max_workers=options['workers']
+            ) as executor:
+                results = executor.map(process, recipe_ids)
+                processed = self.count_processed(results, len(recipe_ids))
+        else:
+            results = (
+                process_recipe_image(recipe_id, force=force)
+                for recipe_id in recipe_ids
+            )
+            processed = self.count_processed(results, len(recipe_ids))
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано изображений: {processed}, '
+            f'пропущено: {len(recipe_ids) - processed}'
+        ))
+
+    def count_processed(self, results, total):
+        return sum(tqdm(
+            results,
+            total=total,
+            ncols=80,
+            ascii=True,
+            desc='Total'
+        ))
@@ -1,48 +1,55 @@
-import csv
-
 from django.core.management.base import BaseCommand
 from tqdm import tqdm
 
-from api.constants import INGREDIENT_DATA_ROUTE
+from api.constants import CATALOG_BATCH_SIZE, INGREDIENT_DATA_ROUTE
+from recipes.catalog import bump_catalog_version
+from recipes.loaders import CatalogLoader, read_rows
 from recipes.models import Ingredient
 
 
 class Command(BaseCommand):
     """
-    Команда для импорта данных об ингредиентах из CSV файла в базу данных.
+    Команда для импорта данных об ингредиентах в базу данных.
+
+    Принимает файл CSV (название, единица измерения), JSON с массивом
+    объектов или JSON Lines. Ингредиенты, уже существующие с той же
+    единицей измерения, пропускаются.
 
     Attributes:
         help (str): Справочное сообщение о назначении команды.
     """
 
-    help = 'Импорт данных из csv файла в бд'
-
-    def handle(self, *args, **kwargs):
-        # Подсчет количества строк в файле
-        with open(INGREDIENT_DATA_ROUTE, encoding='utf-8') as file:
-            num_lines = sum(1 for line in file)
-
-        # Открытие файла снова для чтения данных и импорта
-        with open(INGREDIENT_DATA_ROUTE, encoding='utf-8') as file:
-            reader = csv.reader(file)
-            # Использование tqdm с флагом total
-            for row in tqdm(
-                reader,
-                total=num_lines,
-                ncols=80,
-                ascii=True,
-                desc='Total'
-            ):
-                name = row[0]
-                measurement_unit = row[1] if len(row) > 1 else None
-                existing_ingredient = Ingredient.objects.filter(
-                    name=name
-                ).exists()
-                if not existing_ingredient:
-                    ingredient_instance = Ingredient(
-                        name=name,
-                        measurement_unit=measurement_unit,
-                    )
-                    ingredient_instance.save()
-
-        self.stdout.write(self.style.SUCCESS('Данные успешно импортированы'))
+    help = 'Импорт данных из csv или json файла в бд'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default=INGREDIENT_DATA_ROUTE)
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=CATALOG_BATCH_SIZE
+        )
+        parser.add_argument(
+            '--no-copy',
+            action='store_true',
+            help='Не использовать COPY в PostgreSQL'
+        )
+
+    def handle(self, *args, **options):
+        loader = CatalogLoader(
+            Ingredient,
+            ('name', 'measurement_unit'),
+            batch_size=options['batch_size'],
+            use_copy=not options['no_copy']
+        )
+        rows = tqdm(
+            read_rows(options['path'], loader.fields),
+            ncols=80,
+            ascii=True,
+            desc='Total'
+        )
+        inserted, skipped = loader.load(rows)
+        bump_catalog_version()
+        self.stdout.write(self.style.SUCCESS(
+            f'Данные успешно импортированы: добавлено {inserted}, '
+            f'пропущено {skipped}'
+        ))
@@ -0,0 +1,97 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from tqdm import tqdm
+
+from api.constants import RECIPE_IMPORT_BATCH_SIZE
+from recipes.importer import RecipeImporter, get_job
+from recipes.models import RecipeImport
+
+
+class Command(BaseCommand):
+    """
+    Команда для пакетного импорта рецептов из файла JSON Lines.
+
+    Незавершённый импорт того же файла продолжается с первой
+    необработанной строки; флаг --restart начинает импорт заново.
+    Записи с ошибками пропускаются и сохраняются в отчёт. Через --job
+    продолжаются и задачи, загруженные через API: для них изображения
+    по умолчанию ищутся в RECIPE_IMPORT_IMAGES_DIR.
+
+    Attributes:
+        help (str): Справочное сообщение о назначении команды.
+    """
+
+    help = 'Пакетный импорт рецептов из файла JSON Lines'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', help='Путь к файлу .ndjson')
+        parser.add_argument(
+            '--job',
+            type=int,
+            help='Продолжить задачу импорта с указанным id'
+        )
+        parser.add_argument(
+            '--images-dir',
+            help='Каталог, от которого отсчитываются пути изображений '
+                 '(по умолчанию каталог файла импорта)'
+        )
+        parser.add_argument('--report', help='Путь к отчёту об ошибках')
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=RECIPE_IMPORT_BATCH_SIZE
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='Начать импорт файла заново'
+        )
+        parser.add_argument(
+            '--skip-image-variants',
+            action='store_true',
+            help='Не создавать варианты изображений'
+        )
+
+    def handle(self, *args, **options):
+        if options['job']:
+            try:
+                job = RecipeImport.objects.get(pk=options['job'])
+            except RecipeImport.DoesNotExist:
+                raise CommandError('Задача импорта не найдена')
+        elif options['path']:
+            job = get_job(
+                options['path'],
+                report=options['report'],
+                restart=options['restart']
+            )
+        else:
+            raise CommandError('Укажите --path или --job')
+        if job.position:
+            self.stdout.write(
+                f'Продолжение импорта с строки {job.position + 1}'
+            )
+        images_dir = options['images_dir'] or (
+            settings.RECIPE_IMPORT_IMAGES_DIR
+            if Path(settings.RECIPE_IMPORT_ROOT).resolve()
+            in Path(job.source).parents
+            else Path(job.source).parent
+        )
+        importer = RecipeImporter(
+            job,
+            images_dir,
+            batch_size=options['batch_size'],
+            image_variants=not options['skip_image_variants']
+        )
+        with tqdm(ncols=80, ascii=True, desc='Recipes') as bar:
+            importer.run(progress=bar.update)
+        if job.finished_at is None:
+            raise CommandError(
+                f'Задачу {job.pk} продолжил другой процесс, '
+                f'обработано строк: {job.position}'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Импорт завершён: добавлено {job.imported}, '
+            f'ошибок {job.failed}, отчёт {job.report}'
+        ))
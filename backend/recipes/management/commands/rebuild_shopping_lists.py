@@ -0,0 +1,81 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from recipes.models import ShoppingListItem
+from recipes.shopping_list import bump_versions, expected_items
+
+
+class Command(BaseCommand):
+    """
+    Команда для пересчёта списков покупок по корзинам пользователей.
+
+    Сравнивает таблицу списков покупок с количеством ингредиентов,
+    вычисленным заново по корзинам, и перезаписывает её. С флагом --check
+    только сообщает о расхождениях.
+
+    Attributes:
+        help (str): Справочное сообщение о назначении команды.
+    """
+
+    help = 'Пересчёт и проверка списков покупок'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только проверить списки покупок, не изменяя их'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            expected = self.expected()
+            mismatches = self.compare(expected)
+            if mismatches:
+                self.stdout.write(
+                    self.style.WARNING(f'Расхождений: {mismatches}')
+                )
+            if options['check']:
+                if mismatches:
+                    raise CommandError('Списки покупок не совпадают')
+                self.stdout.write(self.style.SUCCESS('Расхождений нет'))
+                return
+            ShoppingListItem.objects.all().delete()
+            ShoppingListItem.objects.bulk_create(
+                (
+                    ShoppingListItem(
+                        user_id=user_id,
+                        ingredient_id=ingredient_id,
+                        amount=amount
+                    ) for (user_id, ingredient_id), amount in expected.items()
+                ),
+                batch_size=options['batch_size']
+            )
+            bump_versions()
+            if self.compare(expected):
+                raise CommandError(
+                    'Списки покупок не совпадают после пересчёта'
+                )
+        self.stdout.write(
+            self.style.SUCCESS(f'Списки покупок пересчитаны: {len(expected)}')
+        )
+
+    def expected(self):
+        return {
+            (row['recipe__shopping_cart_recipe__user'], row['ingredient']):
+                row['total']
+            for row in expected_items().iterator()
+        }
+
+    def compare(self, expected):
+        actual = {
+            (user_id, ingredient_id): amount
+            for user_id, ingredient_id, amount
+            in ShoppingListItem.objects.values_list(
+                'user_id', 'ingredient_id', 'amount'
+            ).iterator()
+        }
+        return sum(
+            actual.get(key) != expected.get(key)
+            for key in actual.keys() | expected.keys()
+        )
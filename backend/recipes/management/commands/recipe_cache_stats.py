@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from recipes.list_cache import recipe_list_cache
+
+
+class Command(BaseCommand):
+    """
+    Команда для просмотра статистики кэша списка рецептов.
+
+    Выводит количество попаданий и промахов кэша страниц для анонимных
+    пользователей и количество сброшенных групп. С флагом --reset
+    обнуляет статистику после вывода.
+
+    Attributes:
+        help (str): Справочное сообщение о назначении команды.
+    """
+
+    help = 'Статистика кэша списка рецептов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            help='Обнулить статистику после вывода'
+        )
+
+    def handle(self, *args, **options):
+        stats = recipe_list_cache.stats()
+        for name, value in stats.items():
+            self.stdout.write(f'{name}: {value}')
+        requests = stats['hits'] + stats['misses']
+        if requests:
+            self.stdout.write(
+                f'hit ratio: {stats["hits"] / requests:.2%}'
+            )
+        if options['reset']:
+            recipe_list_cache.reset_stats()
+            self.stdout.write(self.style.SUCCESS('Статистика обнулена'))
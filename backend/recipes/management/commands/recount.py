@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from recipes.counters import recount
+
+
+class Command(BaseCommand):
+    """
+    Команда для пересчёта счётчиков рецептов и пользователей.
+
+    Сверяет количество добавлений в избранное и в списки покупок,
+    количество рецептов и подписчиков с фактическими данными и исправляет
+    расхождения. С флагом --check только сообщает о них.
+
+    Attributes:
+        help (str): Справочное сообщение о назначении команды.
+    """
+
+    help = 'Пересчёт счётчиков рецептов и пользователей'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только проверить счётчики, не изменяя их'
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            drift = recount(check_only=options['check'])
+        for counter, mismatches in drift.items():
+            self.stdout.write(f'{counter}: расхождений {mismatches}')
+        if options['check'] and any(drift.values()):
+            raise CommandError('Счётчики не совпадают')
+        self.stdout.write(self.style.SUCCESS('Проверка счётчиков завершена'))
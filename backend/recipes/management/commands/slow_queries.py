@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand
+
+from api.query_log import query_log
+
+
+class Command(BaseCommand):
+    """
+    Команда для просмотра статистики SQL-запросов по отпечаткам.
+
+    Выводит отпечатки запросов, собранные журналом медленных запросов
+    (настройка SLOW_QUERY_LOG) во всех воркерах с момента запуска или
+    последнего сброса, по убыванию суммарного времени, максимального
+    времени или числа выполнений. Флаг --reset обнуляет статистику.
+
+    Attributes:
+        help (str): Справочное сообщение о назначении команды.
+    """
+
+    help = 'Самые затратные SQL-запросы по отпечаткам'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument(
+            '--order',
+            choices=('total', 'max', 'count'),
+            default='total',
+            help='Сортировка: суммарное время, максимальное время или '
+                 'число выполнений'
+        )
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            help='Обнулить статистику'
+        )
+
+    def handle(self, *args, **options):
+        if options['reset']:
+            query_log.reset()
+            self.stdout.write(self.style.SUCCESS('Статистика обнулена'))
+            return
+        rows = query_log.top(options['limit'], options['order'])
+        if not rows:
+            self.stdout.write(
+                'Статистики нет: включите SLOW_QUERY_LOG и общий кэш '
+                'METRICS_CACHE'
+            )
+            return
+        for row in rows:
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f'{row["total"] * 1000:.1f} мс всего, {row["count"]} раз, '
+                f'среднее {row["total"] / row["count"] * 1000:.2f} мс, '
+                f'максимум {row["max"] * 1000:.1f} мс'
+            ))
+            self.stdout.write(f'  {row["fingerprint"]}')
@@ -0,0 +1,73 @@
+from django.db import migrations
+
+POSTGRESQL_FORWARD = (
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'ALTER TABLE recipes_recipe ADD COLUMN search_vector tsvector',
+    """
+    CREATE FUNCTION recipes_recipe_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('russian', coalesce(NEW.name, '')), 'A')
+            || setweight(to_tsvector('russian', coalesce(NEW.text, '')), 'B');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER recipes_recipe_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF name, text ON recipes_recipe
+    FOR EACH ROW EXECUTE PROCEDURE recipes_recipe_search_vector_update()
+    """,
+    'UPDATE recipes_recipe SET name = name',
+    'CREATE INDEX recipes_recipe_search_vector_idx '
+    'ON recipes_recipe USING gin (search_vector)',
+    'CREATE INDEX recipes_recipe_name_trgm_idx '
+    'ON recipes_recipe USING gin (name gin_trgm_ops)',
+)
+
+POSTGRESQL_BACKWARD = (
+    'DROP INDEX IF EXISTS recipes_recipe_name_trgm_idx',
+    'DROP TRIGGER IF EXISTS recipes_recipe_search_vector_trigger '
+    'ON recipes_recipe',
+    'DROP FUNCTION IF EXISTS recipes_recipe_search_vector_update()',
+    'ALTER TABLE recipes_recipe DROP COLUMN IF EXISTS search_vector',
+)
+
+SQLITE_FORWARD = (
+    'CREATE VIRTUAL TABLE recipes_recipe_fts USING fts5('
+    "name, text, tokenize = 'unicode61')",
+    'INSERT INTO recipes_recipe_fts (rowid, name, text) '
+    "SELECT id, replace(replace(name, 'ё', 'е'), 'Ё', 'Е'), "
+    "replace(replace(text, 'ё', 'е'), 'Ё', 'Е') FROM recipes_recipe",
+)
+
+SQLITE_BACKWARD = (
+    'DROP TABLE IF EXISTS recipes_recipe_fts',
+)
+
+
+def run_statements(statements):
+    def run(apps, schema_editor):
+        for statement in statements.get(schema_editor.connection.vendor, ()):
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_statements({
+                'postgresql': POSTGRESQL_FORWARD,
+                'sqlite': SQLITE_FORWARD,
+            }),
+            run_statements({
+                'postgresql': POSTGRESQL_BACKWARD,
+                'sqlite': SQLITE_BACKWARD,
+            }),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 3.2.3 on 2026-10-18 06:10
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+COUNTERS = (
+    ('recipes', 'Recipe', 'favorites_count', 'Favorite', 'recipe'),
+    ('recipes', 'Recipe', 'in_carts_count', 'ShoppingCart', 'recipe'),
+    ('users', 'User', 'recipes_count', 'Recipe', 'author'),
+    ('users', 'User', 'followers_count', 'Follow', 'following'),
+)
+
+
+def fill_counters(apps, schema_editor):
+    for app_label, model_name, field, related_name, related_field in COUNTERS:
+        related_model = apps.get_model(
+            'users' if related_name == 'Follow' else 'recipes', related_name
+        )
+        apps.get_model(app_label, model_name).objects.update(**{
+            field: Coalesce(
+                Subquery(
+                    related_model.objects.filter(
+                        **{related_field: OuterRef('pk')}
+                    ).order_by().values(related_field).annotate(
+                        total=Count('pk')
+                    ).values('total')
+                ),
+                0
+            )
+        })
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_recipe_ordering'),
+        ('users', '0002_user_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество добавлений в избранное'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='in_carts_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество добавлений в список покупок'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-favorites_count', '-pub_date', '-id'], name='recipe_favorites_count_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-in_carts_count', '-pub_date', '-id'], name='recipe_in_carts_count_idx'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 3.2.3 on 2026-10-18 06:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_catalog_version_recipe_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeImport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=255, verbose_name='Файл импорта')),
+                ('report', models.CharField(max_length=255, verbose_name='Отчёт об ошибках')),
+                ('position', models.PositiveBigIntegerField(default=0, verbose_name='Обработано строк')),
+                ('imported', models.PositiveIntegerField(default=0, verbose_name='Импортировано рецептов')),
+                ('failed', models.PositiveIntegerField(default=0, verbose_name='Записей с ошибками')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Дата завершения')),
+            ],
+            options={
+                'verbose_name': 'Импорт рецептов',
+                'verbose_name_plural': 'Импорт рецептов',
+                'ordering': ('-created_at',),
+            },
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 3.2.3 on 2026-10-18 06:44
+
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+# Промежуточная таблица тегов создаётся Django автоматически, поэтому
+# индекс для фильтра по тегам добавляется SQL-запросом: по (tag_id,
+# recipe_id) рецепты с тегом отбираются без чтения строк таблицы.
+RECIPE_TAGS_INDEX = (
+    'CREATE INDEX recipes_recipe_tags_tag_recipe_idx '
+    'ON recipes_recipe_tags (tag_id, recipe_id)'
+)
+RECIPE_TAGS_INDEX_BACKWARD = 'DROP INDEX recipes_recipe_tags_tag_recipe_idx'
+
+
+def merge_duplicate_ingredients(apps, schema_editor):
+    """
+    Объединяет повторы ингредиента в рецепте перед созданием ограничения.
+
+    Количество суммируется в первой строке, поэтому списки покупок,
+    посчитанные по старым строкам, остаются верными.
+    """
+    RecipeIngredient = apps.get_model('recipes', 'RecipeIngredient')
+    duplicates = list(
+        RecipeIngredient.objects.values('recipe', 'ingredient').annotate(
+            rows=Count('pk'), total=Sum('amount'), first=Min('pk')
+        ).filter(rows__gt=1)
+    )
+    for duplicate in duplicates:
+        RecipeIngredient.objects.filter(
+            recipe=duplicate['recipe'],
+            ingredient=duplicate['ingredient']
+        ).exclude(pk=duplicate['first']).delete()
+        RecipeIngredient.objects.filter(pk=duplicate['first']).update(
+            amount=duplicate['total']
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_recipe_import'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ingredient',
+            index=models.Index(fields=['name'], name='ingredient_name_pattern_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['author', '-pub_date', '-id'], name='recipe_author_pub_date_idx'),
+        ),
+        migrations.RunPython(
+            merge_duplicate_ingredients, migrations.RunPython.noop
+        ),
+        migrations.AddConstraint(
+            model_name='recipeingredient',
+            constraint=models.UniqueConstraint(fields=('recipe', 'ingredient'), name='unique_recipe_ingredient'),
+        ),
+        migrations.RunSQL(RECIPE_TAGS_INDEX, RECIPE_TAGS_INDEX_BACKWARD),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 3.2.3 on 2026-10-18 07:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_user_counters'),
+        ('recipes', '0010_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShoppingListVersion',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='shopping_list_version', serialize=False, to='users.user', verbose_name='Пользователь')),
+                ('version', models.PositiveBigIntegerField(default=0, verbose_name='Версия')),
+            ],
+            options={
+                'verbose_name': 'Версия списка покупок',
+                'verbose_name_plural': 'Версии списков покупок',
+            },
+        ),
+    ]
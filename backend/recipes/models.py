@@ -2,11 +2,13 @@ from colorfield.fields import ColorField
 from django.contrib.auth import get_user_model
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
+from django.utils import timezone
 
 from api.constants import (DEFAULT_HEX_COLOR, MAX_COOKING_TIME,
                            MAX_INGREDIENT_AMOUNT, MAX_LENGTH_COLOR,
                            MAX_LENGTH_NAME_AND_SLUG, MIN_COOKING_TIME,
                            MIN_INGREDIENT_AMOUNT)
+from users.models import CounterFieldsMixin
 
 User = get_user_model()
 
@@ -39,6 +41,25 @@ class Tag(models.Model):
         return self.name
 
 
+class CatalogVersion(models.Model):
+    """
+    Модель для хранения версии справочников тегов и ингредиентов.
+
+    Версия увеличивается при любом изменении тега или ингредиента
+    и используется для ETag и Last-Modified ответов API.
+    """
+
+    version = models.PositiveBigIntegerField('Версия', default=0)
+    updated_at = models.DateTimeField('Дата изменения', default=timezone.now)
+
+    class Meta:
+        verbose_name = 'Версия справочников'
+        verbose_name_plural = 'Версии справочников'
+
+    def __str__(self):
+        return str(self.version)
+
+
 class Ingredient(models.Model):
     """Модель для хранения ингредиентов."""
 
@@ -60,12 +81,21 @@ class Ingredient(models.Model):
                 name='unique_name_ingredient_measurement_unit'
             )
         ]
+        indexes = [
+            # Класс операторов позволяет PostgreSQL использовать индекс
+            # для LIKE 'префикс%' при любой локали базы данных.
+            models.Index(
+                fields=['name'],
+                name='ingredient_name_pattern_idx',
+                opclasses=['varchar_pattern_ops']
+            ),
+        ]
 
     def __str__(self):
         return f'{self.name} ({self.measurement_unit})'
 
 
-class Recipe(models.Model):
+class Recipe(CounterFieldsMixin, models.Model):
     """Модель для хранения рецептов."""
 
     author = models.ForeignKey(
@@ -83,6 +113,11 @@ class Recipe(models.Model):
         default=None,
         verbose_name='Изображение'
     )
+    image_variants = models.JSONField(
+        default=dict,
+        editable=False,
+        verbose_name='Варианты изображения'
+    )
     ingredients = models.ManyToManyField(
         Ingredient,
         through='RecipeIngredient',
@@ -93,6 +128,10 @@ class Recipe(models.Model):
         auto_now_add=True,
         db_index=True
     )
+    updated_at = models.DateTimeField(
+        verbose_name='Дата изменения',
+        auto_now=True
+    )
     tags = models.ManyToManyField(
         Tag,
         verbose_name='Тэги'
@@ -113,10 +152,37 @@ class Recipe(models.Model):
         ]
     )
 
+    favorites_count = models.PositiveIntegerField(
+        'Количество добавлений в избранное',
+        default=0,
+        editable=False
+    )
+    in_carts_count = models.PositiveIntegerField(
+        'Количество добавлений в список покупок',
+        default=0,
+        editable=False
+    )
+
+    counter_fields = ('favorites_count', 'in_carts_count')
+
     class Meta:
-        ordering = ('-pub_date', )
+        ordering = ('-pub_date', '-id')
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
+        indexes = [
+            models.Index(
+                fields=['-favorites_count', '-pub_date', '-id'],
+                name='recipe_favorites_count_idx'
+            ),
+            models.Index(
+                fields=['-in_carts_count', '-pub_date', '-id'],
+                name='recipe_in_carts_count_idx'
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='recipe_author_pub_date_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -147,6 +213,12 @@ class RecipeIngredient(models.Model):
         verbose_name = 'количество ингредиента в рецепте'
         verbose_name_plural = 'количество ингредиентов в рецепте'
         default_related_name = 'recipe_ingredients'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recipe', 'ingredient'],
+                name='unique_recipe_ingredient'
+            )
+        ]
 
 
 class AbstractShoppingCartFavoriteModel(models.Model):
@@ -203,3 +275,93 @@ class ShoppingCart(AbstractShoppingCartFavoriteModel):
         return (
             f'{self.user} добавил рецепт {self.recipe} в список покупок '
         )
+
+
+class ShoppingListItem(models.Model):
+    """
+    Модель для хранения суммарного количества ингредиента в списке покупок.
+
+    Строки поддерживаются в актуальном состоянии при добавлении и удалении
+    рецептов из списка покупок и при изменении ингредиентов рецептов.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Пользователь'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        verbose_name='Ингредиент'
+    )
+    amount = models.PositiveIntegerField('Количество')
+
+    class Meta:
+        verbose_name = 'Ингредиент в списке покупок'
+        verbose_name_plural = 'Ингредиенты в списке покупок'
+        default_related_name = 'shopping_list'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'ingredient'],
+                name='unique_user_shopping_list_ingredient'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.user}: {self.ingredient} {self.amount}'
+
+
+class ShoppingListVersion(models.Model):
+    """
+    Модель для хранения версии списка покупок пользователя.
+
+    Версия увеличивается при каждом изменении списка покупок и
+    используется для ETag выгрузки без чтения всего списка.
+    """
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='shopping_list_version',
+        verbose_name='Пользователь'
+    )
+    version = models.PositiveBigIntegerField('Версия', default=0)
+
+    class Meta:
+        verbose_name = 'Версия списка покупок'
+        verbose_name_plural = 'Версии списков покупок'
+
+    def __str__(self):
+        return f'{self.user}: {self.version}'
+
+
+class RecipeImport(models.Model):
+    """
+    Модель для хранения хода пакетного импорта рецептов.
+
+    Позиция в файле обновляется в одной транзакции со вставкой очередной
+    пачки рецептов, поэтому прерванный импорт продолжается с первой
+    необработанной строки.
+    """
+
+    source = models.CharField('Файл импорта', max_length=255)
+    report = models.CharField('Отчёт об ошибках', max_length=255)
+    position = models.PositiveBigIntegerField('Обработано строк', default=0)
+    imported = models.PositiveIntegerField('Импортировано рецептов', default=0)
+    failed = models.PositiveIntegerField('Записей с ошибками', default=0)
+    created_at = models.DateTimeField('Дата создания', auto_now_add=True)
+    finished_at = models.DateTimeField(
+        'Дата завершения',
+        null=True,
+        blank=True
+    )
+
+    class Meta:
+        ordering = ('-created_at',)
+        verbose_name = 'Импорт рецептов'
+        verbose_name_plural = 'Импорт рецептов'
+
+    def __str__(self):
+        return f'{self.source}: {self.imported} рецептов'
@@ -0,0 +1,169 @@
+from django.db import connections, transaction
+
+from recipes import shopping_list
+from recipes.counters import adjust_counter
+from recipes.list_cache import RANKING_GROUP, recipe_list_cache
+from recipes.models import Favorite, Recipe, ShoppingCart
+from users.models import Follow, User
+
+CREATED = 'created'
+EXISTS = 'exists'
+DELETED = 'deleted'
+MISSING = 'missing'
+NOT_FOUND = 'not_found'
+INVALID = 'invalid'
+
+
+class Relation:
+    """
+    Добавление и удаление связей пользователя с объектами.
+
+    Связь — строка модели model с полями user и field. Добавление
+    выполняется одним INSERT ... SELECT ... ON CONFLICT DO NOTHING
+    RETURNING, удаление — одним DELETE ... RETURNING, поэтому
+    повторные и параллельные запросы не приводят к ошибкам целостности,
+    а затронутые строки известны точно. Сигналы моделей при этом не
+    отправляются, и счётчики со связанными данными обновляются здесь же.
+    """
+
+    exclude_self = False
+
+    def __init__(self, model, field, target_model, counter):
+        self.model = model
+        self.field = field
+        self.target_model = target_model
+        self.counter = counter
+
+    @property
+    def connection(self):
+        return connections[self.model.objects.db]
+
+    def execute(self, sql, params):
+        with self.connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return {row[0] for row in cursor.fetchall()}
+
+    def names(self):
+        quote = self.connection.ops.quote_name
+        return (
+            quote(self.model._meta.db_table),
+            quote(self.model._meta.get_field('user').column),
+            quote(self.model._meta.get_field(self.field).column),
+            quote(self.target_model._meta.db_table),
+            quote(self.target_model._meta.pk.column),
+        )
+
+    def insert(self, user_id, target_ids):
+        """Создаёт связи одним запросом; возвращает id новых связей."""
+        if not target_ids:
+            return set()
+        table, user, field, target_table, target_pk = self.names()
+        placeholders = ', '.join(['%s'] * len(target_ids))
+        condition = f' AND {target_pk} <> %s' if self.exclude_self else ''
+        params = [user_id, *target_ids]
+        if self.exclude_self:
+            params.append(user_id)
+        return self.execute(
+            f'INSERT INTO {table} ({user}, {field}) '
+            f'SELECT %s, {target_pk} FROM {target_table} '
+            f'WHERE {target_pk} IN ({placeholders}){condition} '
+            f'ORDER BY {target_pk} '
+            f'ON CONFLICT DO NOTHING RETURNING {field}',
+            params
+        )
+
+    def delete(self, user_id, target_ids):
+        """Удаляет связи одним запросом; возвращает id удалённых связей."""
+        if not target_ids:
+            return set()
+        table, user, field, _, _ = self.names()
+        placeholders = ', '.join(['%s'] * len(target_ids))
+        return self.execute(
+            f'DELETE FROM {table} '
+            f'WHERE {user} = %s AND {field} IN ({placeholders}) '
+            f'RETURNING {field}',
+            [user_id, *target_ids]
+        )
+
+    def found(self, target_ids):
+        """Id существующих целевых объектов из target_ids."""
+        if not target_ids:
+            return set()
+        return set(
+            self.target_model.objects.filter(
+                pk__in=target_ids
+            ).values_list('pk', flat=True)
+        )
+
+    def is_valid(self, user_id, target_id):
+        return not self.exclude_self or user_id != target_id
+
+    @transaction.atomic
+    def add(self, user_id, target_ids):
+        """Добавляет связи; возвращает словарь {id: статус}."""
+        target_ids = list(dict.fromkeys(target_ids))
+        created = self.insert(user_id, target_ids)
+        if created:
+            self.changed(user_id, created, 1)
+        found = self.found([pk for pk in target_ids if pk not in created])
+        return {
+            target_id: (
+                CREATED if target_id in created
+                else NOT_FOUND if target_id not in found
+                else INVALID if not self.is_valid(user_id, target_id)
+                else EXISTS
+            ) for target_id in target_ids
+        }
+
+    @transaction.atomic
+    def remove(self, user_id, target_ids):
+        """Удаляет связи; возвращает словарь {id: статус}."""
+        target_ids = list(dict.fromkeys(target_ids))
+        deleted = self.delete(user_id, target_ids)
+        if deleted:
+            self.changed(user_id, deleted, -1)
+        found = self.found([pk for pk in target_ids if pk not in deleted])
+        return {
+            target_id: (
+                DELETED if target_id in deleted
+                else MISSING if target_id in found
+                else NOT_FOUND
+            ) for target_id in target_ids
+        }
+
+    def changed(self, user_id, target_ids, delta):
+        """Обновляет счётчики после добавления или удаления связей."""
+        adjust_counter(
+            *self.counter,
+            {target_id: delta for target_id in target_ids}
+        )
+
+
+class RecipeRelation(Relation):
+
+    def changed(self, user_id, target_ids, delta):
+        super().changed(user_id, target_ids, delta)
+        recipe_list_cache.invalidate(RANKING_GROUP)
+
+
+class ShoppingCartRelation(RecipeRelation):
+
+    def changed(self, user_id, target_ids, delta):
+        super().changed(user_id, target_ids, delta)
+        shopping_list.add_recipes(user_id, target_ids, sign=delta)
+
+
+class FollowRelation(Relation):
+
+    exclude_self = True
+
+
+favorites = RecipeRelation(
+    Favorite, 'recipe', Recipe, (Recipe, 'favorites_count')
+)
+shopping_cart = ShoppingCartRelation(
+    ShoppingCart, 'recipe', Recipe, (Recipe, 'in_carts_count')
+)
+subscriptions = FollowRelation(
+    Follow, 'following', User, (User, 'followers_count')
+)
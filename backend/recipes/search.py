@@ -0,0 +1,114 @@
+import re
+
+from django.db import connections
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+from recipes.ingredient_index import normalize
+from recipes.models import Recipe
+
+POSTGRESQL_MATCH = (
+    '"recipes_recipe"."search_vector" @@ '
+    "websearch_to_tsquery('russian', %s) "
+    'OR %s <%% "recipes_recipe"."name"'
+)
+POSTGRESQL_RANK = (
+    'ts_rank("recipes_recipe"."search_vector", '
+    "websearch_to_tsquery('russian', %s)) "
+    '+ word_similarity(%s, "recipes_recipe"."name")'
+)
+SQLITE_WHERE = (
+    'recipes_recipe_fts.rowid = "recipes_recipe"."id"',
+    'recipes_recipe_fts MATCH %s',
+)
+SQLITE_RANK = '-bm25(recipes_recipe_fts, 10.0, 1.0)'
+SQLITE_REBUILD = (
+    'INSERT INTO recipes_recipe_fts (rowid, name, text) '
+    "SELECT id, replace(replace(name, 'ё', 'е'), 'Ё', 'Е'), "
+    "replace(replace(text, 'ё', 'е'), 'Ё', 'Е') FROM recipes_recipe"
+)
+
+
+def search_recipes(queryset, query):
+    """
+    Отбирает рецепты, подходящие под поисковый запрос, по релевантности.
+
+    В PostgreSQL используется поле search_vector, которое поддерживает
+    триггер, и триграммы pg_trgm для опечаток в названии. В SQLite
+    используется таблица FTS5 recipes_recipe_fts с поиском по префиксам
+    слов, ё и е в ней не различаются. Релевантность сохраняется
+    в аннотации search_rank.
+    """
+    words = re.findall(r'\w+', query)
+    if not words:
+        return queryset
+    vendor = connections[queryset.db].vendor
+    if vendor == 'postgresql':
+        params = (query, query)
+        match = RawSQL(POSTGRESQL_MATCH, params, BooleanField())
+        rank = RawSQL(POSTGRESQL_RANK, params, FloatField())
+    elif vendor == 'sqlite':
+        return queryset.extra(
+            select={'search_rank': SQLITE_RANK},
+            tables=['recipes_recipe_fts'],
+            where=SQLITE_WHERE,
+            params=[' '.join(f'"{normalize(word)}"*' for word in words)]
+        ).order_by('-search_rank', '-pub_date')
+    else:
+        condition = Q()
+        for word in words:
+            condition &= Q(name__icontains=word) | Q(text__icontains=word)
+        return queryset.filter(condition).annotate(
+            search_rank=Value(0.0, output_field=FloatField())
+        )
+    return queryset.annotate(search_match=match).filter(
+        search_match=True
+    ).annotate(search_rank=rank).order_by('-search_rank', '-pub_date')
+
+
+def update_search_index(recipes):
+    """
+    Обновляет поисковый индекс SQLite для переданных рецептов.
+
+    В PostgreSQL индекс поддерживает триггер, поэтому функция ничего не
+    делает.
+    """
+    connection = connections[Recipe.objects.db]
+    if connection.vendor != 'sqlite':
+        return
+    rows = [
+        (recipe.id, normalize(recipe.name), normalize(recipe.text))
+        for recipe in recipes
+    ]
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            'DELETE FROM recipes_recipe_fts WHERE rowid = %s',
+            [(row[0],) for row in rows]
+        )
+        cursor.executemany(
+            'INSERT INTO recipes_recipe_fts (rowid, name, text) '
+            'VALUES (%s, %s, %s)',
+            rows
+        )
+
+
+def remove_from_search_index(recipe_ids):
+    """Удаляет рецепты из поискового индекса SQLite."""
+    connection = connections[Recipe.objects.db]
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            'DELETE FROM recipes_recipe_fts WHERE rowid = %s',
+            [(recipe_id,) for recipe_id in recipe_ids]
+        )
+
+
+def rebuild_search_index():
+    """Полностью перестраивает поисковый индекс SQLite."""
+    connection = connections[Recipe.objects.db]
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('DELETE FROM recipes_recipe_fts')
+        cursor.execute(SQLITE_REBUILD)
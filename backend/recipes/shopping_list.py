@@ -0,0 +1,137 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import F, Sum
+
+from recipes.models import (RecipeIngredient, ShoppingCart, ShoppingListItem,
+                            ShoppingListVersion)
+from users.models import User
+
+
+def recipe_amounts(recipe_ids):
+    """Возвращает суммарное количество каждого ингредиента в рецептах."""
+    rows = RecipeIngredient.objects.filter(
+        recipe_id__in=recipe_ids
+    ).values('ingredient_id').annotate(total=Sum('amount')).order_by()
+    return {row['ingredient_id']: row['total'] for row in rows}
+
+
+def expected_items():
+    """Вычисляет списки покупок всех пользователей по их корзинам."""
+    return RecipeIngredient.objects.filter(
+        recipe__shopping_cart_recipe__isnull=False
+    ).values(
+        'recipe__shopping_cart_recipe__user', 'ingredient'
+    ).annotate(total=Sum('amount')).order_by()
+
+
+def bump_versions(user_ids=None):
+    """
+    Увеличивает версии списков покупок пользователей user_ids.
+
+    Без user_ids увеличиваются все версии. Недостающие версии
+    пользователей со списком покупок создаются.
+    """
+    versions = ShoppingListVersion.objects.all()
+    if user_ids is not None:
+        versions = versions.filter(user_id__in=user_ids)
+    updated = versions.update(version=F('version') + 1)
+    if user_ids is None:
+        user_ids = set(
+            ShoppingListItem.objects.values_list('user_id', flat=True)
+        )
+    elif updated == len(user_ids):
+        return
+    ShoppingListVersion.objects.bulk_create(
+        (ShoppingListVersion(user_id=user_id, version=1)
+         for user_id in user_ids),
+        ignore_conflicts=True
+    )
+
+
+def apply_changes(changes):
+    """
+    Прибавляет изменения количества к спискам покупок.
+
+    changes: словарь {(user_id, ingredient_id): изменение количества}.
+    Строки пользователей блокируются, чтобы параллельные изменения одного
+    списка покупок выполнялись последовательно; строки с нулевым
+    количеством удаляются, версии списков покупок увеличиваются.
+    """
+    changes = {key: delta for key, delta in changes.items() if delta}
+    if not changes:
+        return
+    user_ids = {user_id for user_id, _ in changes}
+    ingredient_ids = {ingredient_id for _, ingredient_id in changes}
+    with transaction.atomic():
+        list(
+            User.objects.select_for_update().filter(
+                pk__in=user_ids
+            ).order_by('pk').values_list('pk', flat=True)
+        )
+        existing = {
+            (item.user_id, item.ingredient_id): item
+            for item in ShoppingListItem.objects.filter(
+                user_id__in=user_ids,
+                ingredient_id__in=ingredient_ids
+            )
+        }
+        to_create, to_update, to_delete = [], [], []
+        for (user_id, ingredient_id), delta in changes.items():
+            item = existing.get((user_id, ingredient_id))
+            if item is None:
+                if delta > 0:
+                    to_create.append(ShoppingListItem(
+                        user_id=user_id,
+                        ingredient_id=ingredient_id,
+                        amount=delta
+                    ))
+                continue
+            item.amount += delta
+            if item.amount > 0:
+                to_update.append(item)
+            else:
+                to_delete.append(item.pk)
+        ShoppingListItem.objects.bulk_create(to_create)
+        ShoppingListItem.objects.bulk_update(to_update, ['amount'])
+        if to_delete:
+            ShoppingListItem.objects.filter(pk__in=to_delete).delete()
+        bump_versions(user_ids)
+
+
+def add_recipes(user_id, recipe_ids, sign=1):
+    """Добавляет ингредиенты рецептов в список покупок пользователя."""
+    apply_changes({
+        (user_id, ingredient_id): sign * amount
+        for ingredient_id, amount in recipe_amounts(recipe_ids).items()
+    })
+
+
+def remove_recipes(user_id, recipe_ids):
+    """Убирает ингредиенты рецептов из списка покупок пользователя."""
+    add_recipes(user_id, recipe_ids, sign=-1)
+
+
+def recipe_ingredients_changed(recipe_id, old_amounts, new_amounts):
+    """
+    Переносит изменение ингредиентов рецепта в списки покупок.
+
+    old_amounts и new_amounts: словари {ingredient_id: количество}
+    до и после изменения, например из recipe_amounts.
+    """
+    deltas = {
+        ingredient_id: (
+            new_amounts.get(ingredient_id, 0)
+            - old_amounts.get(ingredient_id, 0)
+        ) for ingredient_id in old_amounts.keys() | new_amounts.keys()
+    }
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    changes = defaultdict(int)
+    for user_id in ShoppingCart.objects.filter(
+        recipe_id=recipe_id
+    ).values_list('user_id', flat=True):
+        for ingredient_id, delta in deltas.items():
+            changes[user_id, ingredient_id] += delta
+    apply_changes(changes)
@@ -0,0 +1,133 @@
+from django.core.signals import request_finished, request_started
+from django.db import transaction
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+
+from recipes import shopping_list
+from recipes.catalog import bump_catalog_version
+from recipes.counters import adjust_counter
+from recipes.images import schedule_recipe_image
+from recipes.ingredient_index import ingredient_index
+from recipes.list_cache import RANKING_GROUP, recipe_list_cache
+from recipes.models import Favorite, Ingredient, Recipe, ShoppingCart, Tag
+from recipes.search import remove_from_search_index, update_search_index
+from users.models import User
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def update_catalog_version(**kwargs):
+    bump_catalog_version()
+
+
+@receiver(request_started)
+def start_ingredient_index_request(**kwargs):
+    ingredient_index.start_request()
+
+
+@receiver(request_finished)
+def finish_ingredient_index_request(**kwargs):
+    ingredient_index.finish_request()
+
+
+@receiver(post_save, sender=Recipe)
+def index_recipe(instance, **kwargs):
+    update_search_index([instance])
+
+
+@receiver(post_save, sender=Recipe)
+def schedule_image_variants(instance, **kwargs):
+    if (
+        instance.image
+        and instance.image_variants.get('source') != instance.image.name
+    ):
+        transaction.on_commit(lambda: schedule_recipe_image(instance.id))
+
+
+@receiver(post_delete, sender=Recipe)
+def unindex_recipe(instance, **kwargs):
+    remove_from_search_index([instance.id])
+
+
+@receiver(post_save, sender=ShoppingCart)
+def add_to_shopping_list(instance, created, **kwargs):
+    if created:
+        shopping_list.add_recipes(instance.user_id, [instance.recipe_id])
+
+
+@receiver(pre_delete, sender=ShoppingCart)
+def remove_from_shopping_list(instance, **kwargs):
+    shopping_list.remove_recipes(instance.user_id, [instance.recipe_id])
+
+
+@receiver(post_save, sender=Recipe)
+def count_recipe(instance, created, **kwargs):
+    if created:
+        adjust_counter(User, 'recipes_count', {instance.author_id: 1})
+
+
+@receiver(post_delete, sender=Recipe)
+def uncount_recipe(instance, **kwargs):
+    adjust_counter(User, 'recipes_count', {instance.author_id: -1})
+
+
+@receiver(post_save, sender=Favorite)
+def count_favorite(instance, created, **kwargs):
+    if created:
+        adjust_counter(Recipe, 'favorites_count', {instance.recipe_id: 1})
+
+
+@receiver(post_delete, sender=Favorite)
+def uncount_favorite(instance, **kwargs):
+    adjust_counter(Recipe, 'favorites_count', {instance.recipe_id: -1})
+
+
+@receiver(post_save, sender=ShoppingCart)
+def count_in_cart(instance, created, **kwargs):
+    if created:
+        adjust_counter(Recipe, 'in_carts_count', {instance.recipe_id: 1})
+
+
+@receiver(post_delete, sender=ShoppingCart)
+def uncount_in_cart(instance, **kwargs):
+    adjust_counter(Recipe, 'in_carts_count', {instance.recipe_id: -1})
+
+
+@receiver(post_save, sender=Recipe)
+def invalidate_recipe_pages(instance, **kwargs):
+    recipe_list_cache.invalidate_recipe(instance)
+
+
+@receiver(pre_delete, sender=Recipe)
+def invalidate_deleted_recipe_pages(instance, **kwargs):
+    recipe_list_cache.invalidate_recipe(
+        instance,
+        tags=list(instance.tags.values_list('slug', flat=True))
+    )
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def invalidate_recipe_tag_pages(instance, action, pk_set, **kwargs):
+    if action == 'pre_clear':
+        recipe_list_cache.invalidate_recipe(
+            instance,
+            tags=list(instance.tags.values_list('slug', flat=True))
+        )
+    elif action in ('post_add', 'post_remove'):
+        recipe_list_cache.invalidate_recipe(
+            instance,
+            tags=Tag.objects.filter(pk__in=pk_set).values_list(
+                'slug', flat=True
+            )
+        )
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_delete, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_delete, sender=ShoppingCart)
+def invalidate_ranked_pages(**kwargs):
+    recipe_list_cache.invalidate(RANKING_GROUP)
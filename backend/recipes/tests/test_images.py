@@ -0,0 +1,54 @@
+import io
+import tempfile
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import SimpleTestCase, override_settings
+from PIL import Image
+
+from api.fields import ImageSrcsetField
+from recipes.images import generate_variants
+
+
+class ImageVariantsTests(SimpleTestCase):
+    """Уменьшенные копии изображений рецептов и их srcset."""
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings = override_settings(MEDIA_ROOT=media.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def save_image(self, width, height):
+        buffer = io.BytesIO()
+        Image.new('RGB', (width, height), (255, 0, 0)).save(buffer, 'PNG')
+        name = default_storage.save(
+            'images/source.png', ContentFile(buffer.getvalue())
+        )
+        return default_storage.open(name)
+
+    def test_small_source_is_not_duplicated(self):
+        variants = generate_variants(self.save_image(50, 40))['variants']
+        self.assertEqual(list(variants), ['thumbnail'])
+        self.assertEqual(variants['thumbnail']['width'], 50)
+
+    def test_medium_source_keeps_distinct_widths(self):
+        variants = generate_variants(self.save_image(600, 400))['variants']
+        self.assertEqual(
+            {name: variant['width'] for name, variant in variants.items()},
+            {'thumbnail': 100, 'card': 480, 'full': 600}
+        )
+
+    def test_srcset_skips_repeated_widths(self):
+        value = {'variants': {
+            name: {
+                'width': 50,
+                'webp': f'images/variants/source_{name}.webp',
+                'jpeg': f'images/variants/source_{name}.jpeg',
+            } for name in ('thumbnail', 'card', 'full')
+        }}
+        srcset = ImageSrcsetField().to_representation(value)
+        self.assertEqual(
+            srcset['webp'], '/media/images/variants/source_thumbnail.webp 50w'
+        )
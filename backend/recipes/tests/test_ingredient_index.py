@@ -0,0 +1,180 @@
+import tempfile
+
+from django.core.cache import cache
+from django.db.models import F
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from api.constants import CATALOG_VERSION_PK
+from recipes.catalog import catalog_version
+from recipes.ingredient_index import IngredientIndex, ingredient_index
+from recipes.models import CatalogVersion, Ingredient, Recipe, RecipeIngredient
+from users.models import User
+
+FILE_BASED = 'django.core.cache.backends.filebased.FileBasedCache'
+
+
+def use_shared_cache(test):
+    location = tempfile.TemporaryDirectory()
+    test.addCleanup(location.cleanup)
+    caches = override_settings(CACHES={'default': {
+        'BACKEND': FILE_BASED, 'LOCATION': location.name
+    }})
+    caches.enable()
+    test.addCleanup(caches.disable)
+
+
+class IngredientIndexTests(TestCase):
+    """Поиск ингредиентов по префиксу через процессный индекс."""
+
+    @classmethod
+    def setUpTestData(cls):
+        # Как в data/ingredients.csv: одно название с разными единицами.
+        Ingredient.objects.bulk_create([
+            Ingredient(name='пекарский порошок', measurement_unit='г'),
+            Ingredient(name='пекарский порошок', measurement_unit='ч. л.'),
+            Ingredient(name='Пекарский порошок', measurement_unit='шт.'),
+            Ingredient(name='стейк сёмги', measurement_unit='шт.'),
+            Ingredient(name='стейк семги', measurement_unit='г'),
+        ])
+
+    def setUp(self):
+        cache.clear()
+        ingredient_index.invalidate()
+
+    def test_build_with_duplicate_normalized_names(self):
+        index = IngredientIndex()
+        index.build()
+        found = index.search('пе')
+        self.assertEqual(len(found), 3)
+        self.assertEqual(
+            [ingredient.pk for ingredient in found],
+            sorted(ingredient.pk for ingredient in found)
+        )
+        self.assertEqual(len(index.search('стейк сем')), 2)
+
+    def test_search_endpoint_with_duplicate_normalized_names(self):
+        response = APIClient().get('/api/ingredients/', {'name': 'пе'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            {item['measurement_unit'] for item in response.json()},
+            {'г', 'ч. л.', 'шт.'}
+        )
+
+    def test_rebuild_after_ttl(self):
+        index = IngredientIndex()
+        with self.settings(INGREDIENT_INDEX_TTL=3600):
+            index.build()
+            Ingredient.objects.bulk_create([
+                Ingredient(name='перец', measurement_unit='г')
+            ])
+            self.assertEqual(len(index.search('пе')), 3)
+        with self.settings(INGREDIENT_INDEX_TTL=0):
+            self.assertEqual(len(index.search('пе')), 4)
+
+    def test_other_process_sees_catalog_change(self):
+        # Без общего кэша версия берётся из CatalogVersion: изменение
+        # каталога в другом процессе видно, хотя его кэш не тронут.
+        index = IngredientIndex()
+        with self.settings(INGREDIENT_INDEX_TTL=3600):
+            index.build()
+            Ingredient.objects.bulk_create([
+                Ingredient(name='перец', measurement_unit='г')
+            ])
+            CatalogVersion.objects.filter(pk=CATALOG_VERSION_PK).update(
+                version=F('version') + 1
+            )
+            self.assertEqual(len(index.search('пе')), 4)
+
+    def test_other_instance_sees_invalidation_in_shared_cache(self):
+        use_shared_cache(self)
+        first, second = IngredientIndex(), IngredientIndex()
+        with self.settings(INGREDIENT_INDEX_TTL=3600):
+            first.build()
+            second.build()
+            Ingredient.objects.bulk_create([
+                Ingredient(name='перец', measurement_unit='г')
+            ])
+            first.invalidate()
+            self.assertEqual(len(second.search('пе')), 4)
+
+
+class IngredientSearchValidatorsTests(TestCase):
+    """Версия справочников и ETag подсказок."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            email='author@example.com',
+            username='author',
+            first_name='Автор',
+            last_name='Тестовый',
+            password='Pa55word!'
+        )
+        cls.salt = Ingredient.objects.create(name='соль', measurement_unit='г')
+        cls.sugar = Ingredient.objects.create(
+            name='сахар', measurement_unit='г'
+        )
+
+    def setUp(self):
+        cache.clear()
+        ingredient_index.invalidate()
+
+    def search(self, **extra):
+        return APIClient().get('/api/ingredients/', {'name': 'с'}, **extra)
+
+    def test_repeated_search_in_shared_cache_does_not_query_database(self):
+        use_shared_cache(self)
+        self.search()
+        with self.assertNumQueries(0):
+            response = self.search()
+        self.assertEqual(response.status_code, 200)
+        with self.assertNumQueries(0):
+            catalog_version()
+
+    def test_process_local_cache_checks_version_once_per_request(self):
+        self.search()
+        with self.assertNumQueries(1):
+            response = self.search()
+        self.assertEqual(response.status_code, 200)
+        with self.assertNumQueries(1):
+            catalog_version()
+
+    def test_etag_follows_popularity(self):
+        response = self.search()
+        etag = response['ETag']
+        self.assertNotIn('Last-Modified', response)
+        self.assertEqual(
+            self.search(HTTP_IF_NONE_MATCH=etag).status_code, 304
+        )
+        recipe = Recipe.objects.create(
+            author=self.author, name='Рецепт', text='Описание', cooking_time=5
+        )
+        RecipeIngredient.objects.create(
+            recipe=recipe, ingredient=self.sugar, amount=10
+        )
+        with self.settings(INGREDIENT_INDEX_TTL=0):
+            response = self.search(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()[0]['name'], 'сахар')
+
+    def test_catalog_write_invalidates_version(self):
+        version = catalog_version().version
+        self.salt.name = 'соль морская'
+        self.salt.save()
+        self.assertEqual(catalog_version().version, version + 1)
+
+    def test_shared_cache_is_invalidated_after_commit(self):
+        use_shared_cache(self)
+        other = IngredientIndex()
+        other.build()
+        version = other.catalog.version
+        with self.captureOnCommitCallbacks(execute=True):
+            self.salt.name = 'соль морская'
+            self.salt.save()
+            # До фиксации другой процесс не должен перестроить индекс по
+            # старым строкам под новой версией.
+            self.assertFalse(other.is_stale())
+        self.assertTrue(other.is_stale())
+        self.assertEqual(other.catalog.version, version + 1)
@@ -0,0 +1,72 @@
+import tempfile
+
+from django.core.checks import run_checks
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from recipes.list_cache import recipe_list_cache
+from recipes.models import Recipe
+from users.models import User
+
+LOCMEM = 'django.core.cache.backends.locmem.LocMemCache'
+FILE_BASED = 'django.core.cache.backends.filebased.FileBasedCache'
+
+
+class RecipeListCacheTests(TestCase):
+    """Кэш списка рецептов для анонимных пользователей."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            email='author@example.com',
+            username='author',
+            first_name='Автор',
+            last_name='Тестовый',
+            password='Pa55word!'
+        )
+        Recipe.objects.create(
+            author=cls.author, name='Рецепт', text='Описание', cooking_time=5
+        )
+
+    def use_cache(self, backend):
+        location = tempfile.TemporaryDirectory()
+        self.addCleanup(location.cleanup)
+        # Таймаут по умолчанию, который settings.py выбирает для кэша.
+        caches = override_settings(
+            CACHES={'default': {
+                'BACKEND': backend, 'LOCATION': location.name
+            }},
+            RECIPE_LIST_CACHE_TIMEOUT=0 if backend == LOCMEM else 60
+        )
+        caches.enable()
+        self.addCleanup(caches.disable)
+
+    def test_shared_cache_serves_pages(self):
+        self.use_cache(FILE_BASED)
+        self.assertTrue(recipe_list_cache.enabled)
+        client = APIClient()
+        client.get('/api/recipes/')
+        with self.assertNumQueries(0):
+            response = client.get('/api/recipes/')
+        self.assertEqual(response.json()['count'], 1)
+        self.assertNotIn(
+            'api.W001', [message.id for message in run_checks()]
+        )
+
+    def test_process_local_cache_is_disabled(self):
+        self.use_cache(LOCMEM)
+        self.assertFalse(recipe_list_cache.enabled)
+        client = APIClient()
+        client.get('/api/recipes/')
+        with self.assertNumQueries(4):
+            client.get('/api/recipes/')
+        # Таймаут по умолчанию для кэша процесса равен 0 и предупреждения
+        # нет; оно выводится, только если кэш включён явно.
+        self.assertNotIn(
+            'api.W001', [message.id for message in run_checks()]
+        )
+        with self.settings(RECIPE_LIST_CACHE_TIMEOUT=60):
+            self.assertFalse(recipe_list_cache.enabled)
+            self.assertIn(
+                'api.W001', [message.id for message in run_checks()]
+            )
@@ -0,0 +1,113 @@
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from recipes.models import Recipe
+from recipes.search import rebuild_search_index, search_recipes
+from users.models import User
+
+
+class SearchTestsMixin:
+    """Общие проверки поиска рецептов для обеих баз данных."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            email='author@example.com',
+            username='author',
+            first_name='Автор',
+            last_name='Тестовый',
+            password='Pa55word!'
+        )
+        cls.borscht = cls.create('Борщ украинский', 'Свекла, капуста')
+        cls.soup = cls.create('Суп дня', 'Подаётся как борщ, со сметаной')
+        cls.pie = cls.create('Шарлотка', 'Яблоки и мука')
+
+    @classmethod
+    def create(cls, name, text):
+        return Recipe.objects.create(
+            author=cls.author, name=name, text=text, cooking_time=30
+        )
+
+    def search(self, query):
+        return list(
+            search_recipes(Recipe.objects.all(), query).values_list(
+                'id', flat=True
+            )
+        )
+
+    def test_name_match_ranks_first(self):
+        self.assertEqual(
+            self.search('борщ'), [self.borscht.pk, self.soup.pk]
+        )
+
+    def test_endpoint_orders_by_relevance(self):
+        response = APIClient().get('/api/recipes/', {'search': 'борщ'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [recipe['id'] for recipe in response.json()['results']],
+            [self.borscht.pk, self.soup.pk]
+        )
+
+    def test_query_without_words_returns_everything(self):
+        self.assertEqual(len(self.search('!?')), 3)
+
+    def test_index_follows_create_update_and_delete(self):
+        recipe = self.create('Окрошка', 'Квас и овощи')
+        self.assertEqual(self.search('окрошка'), [recipe.pk])
+        recipe.name = 'Холодник'
+        recipe.save()
+        self.assertEqual(self.search('окрошка'), [])
+        self.assertEqual(self.search('холодник'), [recipe.pk])
+        recipe.delete()
+        self.assertEqual(self.search('холодник'), [])
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Поиск FTS5 есть только в SQLite')
+class SQLiteSearchTests(SearchTestsMixin, TestCase):
+    """Поиск через таблицу FTS5 recipes_recipe_fts."""
+
+    def test_prefix_and_yo_folding(self):
+        self.assertEqual(self.search('шарл'), [self.pie.pk])
+        self.assertEqual(self.search('подается'), [self.soup.pk])
+        self.assertEqual(self.search('свёкла'), [self.borscht.pk])
+
+    def test_rebuild_index(self):
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM recipes_recipe_fts')
+        self.assertEqual(self.search('борщ'), [])
+        rebuild_search_index()
+        self.assertEqual(
+            self.search('борщ'), [self.borscht.pk, self.soup.pk]
+        )
+
+
+@skipUnless(
+    connection.vendor == 'postgresql',
+    'Полнотекстовый поиск и pg_trgm проверяются только на PostgreSQL'
+)
+class PostgreSQLSearchTests(SearchTestsMixin, TestCase):
+    """Поиск по search_vector, websearch_to_tsquery и pg_trgm."""
+
+    def test_morphology(self):
+        self.assertEqual(self.search('яблоко'), [self.pie.pk])
+
+    def test_typo_in_name(self):
+        self.assertEqual(self.search('шарлтка'), [self.pie.pk])
+
+    def test_websearch_syntax(self):
+        self.assertEqual(self.search('борщ -сметана'), [self.borscht.pk])
+
+    def test_indexes(self):
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(
+                cursor, Recipe._meta.db_table
+            )
+        for name in (
+            'recipes_recipe_search_vector_idx',
+            'recipes_recipe_name_trgm_idx',
+        ):
+            with self.subTest(name):
+                self.assertEqual(constraints[name]['type'], 'gin')
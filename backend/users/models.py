@@ -6,7 +6,36 @@ from users.validators import (username_not_me_validator,
                               username_symbols_validator)
 
 
-class User(AbstractUser):
+class CounterFieldsMixin:
+    """
+    Примесь для моделей со счётчиками из counter_fields.
+
+    Счётчики изменяются только запросами UPDATE ... SET field = field + n
+    (adjust_counter, recount), а значение в загруженном объекте могло
+    устареть. Поэтому при сохранении существующего объекта они не
+    записываются: save() передаёт update_fields без них.
+    """
+
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and not kwargs.get('force_insert'):
+            update_fields = kwargs.get('update_fields')
+            if update_fields is None:
+                deferred = self.get_deferred_fields()
+                update_fields = [
+                    field.name for field in self._meta.concrete_fields
+                    if not field.primary_key
+                    and field.attname not in deferred
+                ]
+            kwargs['update_fields'] = [
+                name for name in update_fields
+                if name not in self.counter_fields
+            ]
+        super().save(*args, **kwargs)
+
+
+class User(CounterFieldsMixin, AbstractUser):
     """Модель пользователя."""
 
     USERNAME_FIELD = 'email'
@@ -33,6 +62,18 @@ class User(AbstractUser):
         'Пароль',
         max_length=USERS_NAME_EMAIL_PASS_MAX_LENGTH
     )
+    recipes_count = models.PositiveIntegerField(
+        'Количество рецептов',
+        default=0,
+        editable=False
+    )
+    followers_count = models.PositiveIntegerField(
+        'Количество подписчиков',
+        default=0,
+        editable=False
+    )
+
+    counter_fields = ('recipes_count', 'followers_count')
 
     class Meta:
         verbose_name = 'Пользователь'
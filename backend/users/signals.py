@@ -0,0 +1,44 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from api.authentication import token_cache
+from recipes.counters import adjust_counter
+from recipes.list_cache import GLOBAL_GROUP, recipe_list_cache
+from users.models import Follow, User
+
+
+@receiver(post_save, sender=Follow)
+def count_follower(instance, created, **kwargs):
+    if created:
+        adjust_counter(User, 'followers_count', {instance.following_id: 1})
+
+
+@receiver(post_delete, sender=Follow)
+def uncount_follower(instance, **kwargs):
+    adjust_counter(User, 'followers_count', {instance.following_id: -1})
+
+
+@receiver(post_save, sender=User)
+def invalidate_author_pages(instance, created, update_fields, **kwargs):
+    if created or not instance.recipes_count:
+        return
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    recipe_list_cache.invalidate(GLOBAL_GROUP)
+
+
+@receiver(post_delete, sender=Token)
+@receiver(post_delete, sender=User)
+def invalidate_token_cache(**kwargs):
+    transaction.on_commit(token_cache.invalidate)
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_tokens(instance, created, update_fields, **kwargs):
+    if created:
+        return
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    transaction.on_commit(token_cache.invalidate)
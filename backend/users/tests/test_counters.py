@@ -0,0 +1,56 @@
+from django.test import TestCase
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from recipes.counters import recount
+from recipes.models import Favorite, Recipe
+from users.models import User
+
+
+class CounterFieldsTests(TestCase):
+    """Сохранение объектов не перезаписывает счётчики."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='author@example.com',
+            username='author',
+            first_name='Автор',
+            last_name='Тестовый',
+            password='Pa55word!'
+        )
+        cls.token = Token.objects.create(user=cls.user)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_set_password_keeps_recipes_count(self):
+        # Первый запрос загружает пользователя с recipes_count = 0.
+        self.assertEqual(self.client.get('/api/users/me/').status_code, 200)
+        Recipe.objects.create(
+            author=self.user, name='Рецепт', text='Описание', cooking_time=5
+        )
+        self.assertEqual(
+            User.objects.get(pk=self.user.pk).recipes_count, 1
+        )
+        response = self.client.post('/api/users/set_password/', {
+            'current_password': 'Pa55word!',
+            'new_password': 'N3w-Pa55word!',
+        })
+        self.assertEqual(response.status_code, 204)
+        user = User.objects.get(pk=self.user.pk)
+        self.assertTrue(user.check_password('N3w-Pa55word!'))
+        self.assertEqual(user.recipes_count, 1)
+        self.assertFalse(any(recount(check_only=True).values()))
+
+    def test_recipe_save_keeps_favorites_count(self):
+        recipe = Recipe.objects.create(
+            author=self.user, name='Рецепт', text='Описание', cooking_time=5
+        )
+        Favorite.objects.create(user=self.user, recipe=recipe)
+        recipe.name = 'Новое название'
+        recipe.save()
+        recipe = Recipe.objects.get(pk=recipe.pk)
+        self.assertEqual(recipe.name, 'Новое название')
+        self.assertEqual(recipe.favorites_count, 1)